@@ -1,5 +1,15 @@
-"""The nqrduck_measurement package provides classes for performing single frequency magnetic resonance measurements."""
+"""The nqrduck_measurement package provides classes for performing single frequency magnetic resonance measurements.
 
-from .measurement import Measurement as Module
+The nqrduck module is only imported when it is accessed, so the headless service (see service) can be used without importing Qt widgets or matplotlib.
+"""
 
 __all__ = ["Module"]
+
+
+def __getattr__(name: str):
+    """Import the nqrduck module on first access."""
+    if name == "Module":
+        from .measurement import Measurement as Module
+
+        return Module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
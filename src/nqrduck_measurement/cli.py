@@ -0,0 +1,385 @@
+"""Command-line batch processing of measurement files.
+
+Every file is loaded, optionally apodized and fitted, and optionally saved again in a worker pool, see process_file.
+The fit parameters of all files are written as CSV and the time spent on every file is reported.
+
+Example:
+    nqrduck-measurement-batch "data/**/*.meas" --apodization fid --parameter T2star=20 --fit "T2*" --output-dir processed --results fits.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from quackseq.functions import CustomFunction, Function, GaussianFunction
+
+from . import storage
+from .fitting import fit_descriptors
+from .processing import FIDFunction
+from .service import MeasurementService
+
+logger = logging.getLogger(__name__)
+
+APODIZATION_FUNCTIONS = {
+    "fid": FIDFunction,
+    "gaussian": GaussianFunction,
+    "custom": CustomFunction,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the parser of the command-line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="nqrduck-measurement-batch",
+        description="Apodize, fit and export many measurement files.",
+    )
+    parser.add_argument(
+        "patterns",
+        nargs="+",
+        help="Measurement files or glob patterns, ** matches subdirectories.",
+    )
+    parser.add_argument(
+        "--recipe",
+        help="JSON file with the processing recipe. Options given on the command line take precedence.",
+    )
+    parser.add_argument(
+        "--apodization",
+        choices=APODIZATION_FUNCTIONS,
+        help="Apodization function applied before fitting.",
+    )
+    parser.add_argument(
+        "--parameter",
+        action="append",
+        default=[],
+        metavar="SYMBOL=VALUE",
+        help="Parameter of the apodization function, can be given several times.",
+    )
+    parser.add_argument(
+        "--expression",
+        help="Expression in x of the custom apodization function.",
+    )
+    parser.add_argument(
+        "--fit",
+        choices=[descriptor.name for descriptor in fit_descriptors()],
+        help="Fit type.",
+    )
+    parser.add_argument(
+        "--fit-all",
+        action="store_true",
+        help="Fit every dataset instead of only the last one.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Directory the processed measurements are saved to.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=storage.FILE_FORMATS,
+        default=storage.BINARY_FORMAT,
+        help="File format of the processed measurements.",
+    )
+    parser.add_argument(
+        "--results",
+        help="CSV file for the fit parameters. Defaults to standard output.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes. Defaults to the number of cores.",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable debug output.")
+    return parser
+
+
+def build_recipe(args: argparse.Namespace) -> dict:
+    """Build the processing recipe from the command-line arguments.
+
+    A recipe is a JSON-compatible dict with the apodization function (see Function.to_json), the name of the fit type and whether every dataset is fitted.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        dict: The recipe.
+
+    Raises:
+        ValueError: If a parameter is malformed or the apodization function has no such parameter.
+    """
+    recipe = {"apodization": None, "fit": None, "fit_all": False}
+    if args.recipe:
+        with open(args.recipe) as f:
+            recipe.update(json.load(f))
+
+    if args.apodization:
+        function = APODIZATION_FUNCTIONS[args.apodization]()
+        if args.expression:
+            function.expr = args.expression
+        recipe["apodization"] = function.to_json()
+
+    if args.parameter:
+        if recipe["apodization"] is None:
+            raise ValueError("Parameters require an apodization function.")
+
+        function = Function.from_json(recipe["apodization"])
+        symbols = {
+            str(parameter.symbol): parameter for parameter in function.parameters
+        }
+        for assignment in args.parameter:
+            symbol, _, value = assignment.partition("=")
+            if symbol not in symbols or not value:
+                raise ValueError(f"Invalid parameter: {assignment}")
+            symbols[symbol].value = float(value)
+        recipe["apodization"] = function.to_json()
+
+    if args.fit:
+        recipe["fit"] = args.fit
+    if args.fit_all:
+        recipe["fit_all"] = True
+
+    return recipe
+
+
+def find_files(patterns: list) -> list:
+    """Expand glob patterns to measurement files.
+
+    Args:
+        patterns (list): File names or glob patterns.
+
+    Returns:
+        list: The sorted file names without duplicates.
+    """
+    file_names = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        file_names.update(match for match in matches if os.path.isfile(match))
+    return sorted(file_names)
+
+
+def output_file_names(file_names: list, output_dir: str) -> list:
+    """Names of the processed files in the output directory.
+
+    The directory structure below the common directory of the input files is kept, so files with the same name in different directories do not overwrite each other.
+
+    Args:
+        file_names (list): Paths to the measurement files.
+        output_dir (str): The output directory.
+
+    Returns:
+        list: The paths of the processed files.
+    """
+    paths = [os.path.abspath(file_name) for file_name in file_names]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [os.path.join(output_dir, os.path.relpath(path, root)) for path in paths]
+
+
+def process_file(
+    file_name: str,
+    recipe: dict,
+    output_file: str | None = None,
+    file_format: str | None = None,
+) -> dict:
+    """Process one measurement file according to a recipe.
+
+    This runs in the worker processes.
+
+    Args:
+        file_name (str): Path to the measurement file.
+        recipe (dict): The processing recipe, see build_recipe.
+        output_file (str, optional): Path the processed measurement is saved to. Defaults to None, which does not save it.
+        file_format (str, optional): File format of the processed measurement. Defaults to None, which uses the binary format.
+
+    Returns:
+        dict: The file name, the rows of fit parameters (one per fitted dataset), the processing time in seconds and the error message if the file could not be processed.
+    """
+    start = time.perf_counter()
+    result = {"file": file_name, "rows": [], "seconds": None, "error": None}
+    service = MeasurementService(spectrometer=None)
+    service.file_format = file_format or storage.BINARY_FORMAT
+
+    try:
+        measurement = service.load_measurement(file_name)
+        if recipe.get("apodization"):
+            function = Function.from_json(recipe["apodization"])
+            measurement = service.apodize(measurement, function)
+
+        if recipe.get("fit") and recipe.get("fit_all"):
+            table = service.fit_all(measurement, recipe["fit"], max_workers=1)
+            names = [key for key in table if key != "covariance"]
+            result["rows"] = [
+                {name: table[name][i] for name in names}
+                for i in range(len(table["dataset"]))
+            ]
+        elif recipe.get("fit"):
+            fit = service.fit(measurement, recipe["fit"])
+            row = {"dataset": measurement.tdy.shape[1] - 1}
+            row.update(
+                (name, value)
+                for name, value in fit.parameters.items()
+                if name != "covariance"
+            )
+            result["rows"] = [row]
+
+        if output_file:
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            service.save_measurement(measurement, output_file)
+    except (
+        OSError,
+        KeyError,
+        ValueError,
+        RuntimeError,
+        TypeError,
+        zipfile.BadZipFile,
+    ) as e:
+        # JSONDecodeError is a ValueError, curve_fit raises a RuntimeError if a fit does not converge
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def write_results(results: list, f) -> None:
+    """Write the fit parameters of all files as CSV.
+
+    Args:
+        results (list): The results of process_file.
+        f: The file object.
+    """
+    columns = ["file"]
+    for result in results:
+        for row in result["rows"]:
+            columns.extend(name for name in row if name not in columns)
+
+    writer = csv.DictWriter(f, fieldnames=columns, restval="")
+    writer.writeheader()
+    for result in results:
+        for row in result["rows"]:
+            writer.writerow({"file": result["file"], **row})
+
+
+def run(
+    file_names: list,
+    recipe: dict,
+    output_dir: str | None = None,
+    file_format: str | None = None,
+    max_workers: int | None = None,
+    report=None,
+) -> list:
+    """Process files in a process pool.
+
+    Args:
+        file_names (list): Paths to the measurement files.
+        recipe (dict): The processing recipe, see build_recipe.
+        output_dir (str, optional): Directory the processed measurements are saved to. Defaults to None.
+        file_format (str, optional): File format of the processed measurements. Defaults to None.
+        max_workers (int, optional): Number of worker processes. Defaults to None, which uses the number of cores.
+        report (Callable, optional): Called with the result of every file as soon as it is finished. Defaults to None.
+
+    Returns:
+        list: The results of process_file in the order of the files.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(min(max_workers, len(file_names)), 1)
+
+    if output_dir:
+        output_files = output_file_names(file_names, output_dir)
+    else:
+        output_files = [None] * len(file_names)
+
+    jobs = [
+        (file_name, recipe, output_file, file_format)
+        for file_name, output_file in zip(file_names, output_files)
+    ]
+    results = [None] * len(file_names)
+    if max_workers == 1:
+        for index, job in enumerate(jobs):
+            results[index] = process_file(*job)
+            if report is not None:
+                report(results[index])
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_file, *job): index for index, job in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if report is not None:
+                report(results[futures[future]])
+
+    return results
+
+
+def main(argv: list | None = None) -> int:
+    """Entry point of nqrduck-measurement-batch.
+
+    Args:
+        argv (list, optional): The command-line arguments. Defaults to None, which uses sys.argv.
+
+    Returns:
+        int: The exit code, 1 if a file could not be processed.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    try:
+        recipe = build_recipe(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    file_names = find_files(args.patterns)
+    if not file_names:
+        parser.error("No measurement files found.")
+
+    def report(result: dict) -> None:
+        milliseconds = result["seconds"] * 1e3
+        if result["error"]:
+            print(
+                f"{result['file']}: failed after {milliseconds:.1f} ms: {result['error']}",
+                file=sys.stderr,
+            )
+        else:
+            print(f"{result['file']}: {milliseconds:.1f} ms", file=sys.stderr)
+
+    start = time.perf_counter()
+    results = run(
+        file_names,
+        recipe,
+        output_dir=args.output_dir,
+        file_format=args.format,
+        max_workers=args.workers,
+        report=report,
+    )
+    elapsed = time.perf_counter() - start
+
+    if recipe["fit"]:
+        if args.results:
+            with open(args.results, "w", newline="") as f:
+                write_results(results, f)
+        else:
+            write_results(results, sys.stdout)
+
+    failed = sum(1 for result in results if result["error"])
+    print(
+        f"Processed {len(results) - failed} of {len(results)} files in {elapsed:.2f} s "
+        f"({len(results) / elapsed:.1f} files/s).",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
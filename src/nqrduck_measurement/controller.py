@@ -2,13 +2,28 @@
 
 import logging
 import json
+import zipfile
 from PyQt6.QtCore import pyqtSlot, pyqtSignal
-from PyQt6.QtWidgets import QApplication
 
 from nqrduck.module.module_controller import ModuleController
 from quackseq.measurement import Measurement
+from quackseq.functions import Function
 
 from .signalprocessing_options import Apodization, Fitting
+from .measurement_options import Sweep
+from . import storage, processing, fit_models
+from .fitting import FitPreviewCache, fit_descriptor
+from .service import MeasurementService, sweep_frequencies
+from .pipeline import Pipeline
+from .jobs import (
+    MeasurementJob,
+    FitJob,
+    FitAllJob,
+    FitBatchJob,
+    ImportJob,
+    SpillJob,
+    start_in_thread,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +39,10 @@ class MeasurementController(ModuleController):
     Attributes:
         set_frequency_failure (pyqtSignal): Signal emitted when setting the frequency fails.
         set_averages_failure (pyqtSignal): Signal emitted when setting the averages fails.
+        measurement_job (MeasurementJob): The job of the running measurement, None if no measurement is running.
+        pending_fits (list): Processed measurements whose pipeline fits start once the measurement job is over.
+        service (MeasurementService): Loads and saves measurements and keeps the parameters of previous fits to warm-start later fits.
+        fit_previews (FitPreviewCache): Memoized fit results shown by the fitting dialog.
 
     Signals:
         set_frequency_failure: Signal emitted when setting the frequency fails.
@@ -36,6 +55,17 @@ class MeasurementController(ModuleController):
     def __init__(self, module):
         """Initialize the controller."""
         super().__init__(module)
+        self.measurement_job = None
+        self.pending_fits = []
+        # The measurements themselves are run by the spectrometer module, so the service has no spectrometer
+        self.service = MeasurementService(
+            None, on_measurement=self.module.model.add_measurement
+        )
+        self.fit_previews = FitPreviewCache()
+        # Data is spilled to disk in a worker thread instead of blocking the GUI
+        self.module.model.store.spill_handler = self.spill_in_background
+        # Fits of models from other packages can only be restored once their entry points are loaded
+        fit_models.registered_fit_models()
 
     @pyqtSlot(bool, str)
     def set_frequency(self, state: bool, value: str) -> None:
@@ -93,19 +123,145 @@ class MeasurementController(ModuleController):
         logger.debug("View mode changed to: " + self.module.model.view_mode)
 
     def start_measurement(self) -> None:
-        """Emit the start measurement signal."""
+        """Start a measurement with the current measurement parameters."""
         logger.debug("Start measurement clicked")
+        self.start_measurements([self.module.model.measurement_frequency])
+
+    def start_sweep(self, start: float, stop: float, step: float) -> None:
+        """Start a frequency sweep.
+
+        Args:
+            start (float): First frequency in MHz.
+            stop (float): Last frequency in MHz.
+            step (float): Distance between two frequencies in MHz.
+        """
+        frequencies = sweep_frequencies(start, stop, step)
+        logger.debug("Starting sweep with %s frequencies.", len(frequencies))
+        self.start_measurements([frequency * 1e6 for frequency in frequencies])
+
+    def start_measurements(self, frequencies: list) -> None:
+        """Start a measurement job that runs measurements at the given frequencies back-to-back.
+
+        The measurements are run by the spectrometer module, the job pushes the parameters and collects the data of every measurement.
+
+        Args:
+            frequencies (list): The measurement frequencies in Hz.
+        """
+        if self.measurement_job is not None:
+            logger.debug("A measurement is already running.")
+            return
+
+        self.module.model.reset_running_average()
         self.module.view.measurement_dialog.show()
-        QApplication.processEvents()
 
-        # Set the measurement parameters again in case the user switches spectrometer
+        job = MeasurementJob(frequencies, self.module.model.averages)
+        job.request.connect(self.module.nqrduck_signal)
+        job.progress.connect(self.module.view.measurement_dialog.set_progress)
+        job.result_ready.connect(self.on_measurement_result)
+        job.skipped.connect(self.on_measurement_skipped)
+        job.error.connect(self.on_measurement_error)
+        job.done.connect(self.on_measurement_job_done)
+
+        self.measurement_job = job
+        job.start()
+
+    @pyqtSlot()
+    def stop_measurement(self) -> None:
+        """Stop the running measurement.
+
+        If partial measurements have been received, their running average is kept as the result of the measurement.
+        """
+        logger.debug("Stop measurement clicked")
+        if self.measurement_job is not None:
+            self.measurement_job.cancel()
+        self.module.view.measurement_dialog.hide()
+
+        running_average = self.module.model.running_average
+        self.module.model.reset_running_average()
+        if running_average is not None:
+            logger.debug("Keeping running average as measurement.")
+            self.module.model.add_measurement(running_average)
+
+    @pyqtSlot()
+    def cancel_measurement(self) -> None:
+        """Cancel the running measurement and discard all data received so far."""
+        logger.debug("Cancel measurement clicked")
+        if self.measurement_job is not None:
+            self.measurement_job.cancel()
+        self.module.view.measurement_dialog.hide()
+        self.module.model.reset_running_average()
+
+    @pyqtSlot(object)
+    def on_measurement_result(self, measurement: Measurement) -> None:
+        """Add the measurement delivered by the measurement job.
+
+        Args:
+            measurement (Measurement): The measurement.
+        """
+        logger.debug("Received single measurement.")
+        self.module.model.reset_running_average()
+
+        if self.module.model.auto_process and self.module.model.pipeline:
+            self.process_measurement(measurement)
+        else:
+            self.module.model.add_measurement(measurement)
+
+    @pyqtSlot(float)
+    def on_measurement_skipped(self, frequency: float) -> None:
+        """Report a measurement that was skipped because the spectrometer could not set its frequency.
+
+        Args:
+            frequency (float): The frequency of the measurement in Hz.
+        """
+        logger.debug("Skipped measurement at %s Hz.", frequency)
+        self.module.model.reset_running_average()
         self.module.nqrduck_signal.emit(
-            "set_frequency", str(self.module.model.measurement_frequency)
+            "notification",
+            [
+                "Warning",
+                f"Could not set the frequency to {frequency * 1e-6} MHz, the measurement was skipped.",
+            ],
         )
-        self.module.nqrduck_signal.emit("set_averages", str(self.module.model.averages))
-        QApplication.processEvents()
 
-        self.module.nqrduck_signal.emit("start_measurement", None)
+    @pyqtSlot(str)
+    def on_measurement_error(self, message: str) -> None:
+        """Show the error reported by the measurement job.
+
+        Args:
+            message (str): The error message.
+        """
+        logger.debug("Received measurement error.")
+        self.module.model.reset_running_average()
+        self.module.nqrduck_signal.emit("notification", ["Error", message])
+
+    @pyqtSlot()
+    def on_measurement_job_done(self) -> None:
+        """Forget the measurement job once it is over."""
+        logger.debug("Measurement job done.")
+        self.measurement_job = None
+        self.module.view.measurement_dialog.hide()
+        self.fit_pending_measurements()
+
+    def show_sweep_dialog(self) -> None:
+        """Show frequency sweep dialog."""
+        logger.debug("Showing sweep dialog.")
+        dialog = Sweep(
+            self.module.model.measurement_frequency * 1e-6, parent=self.module.view
+        )
+        result = dialog.exec()
+
+        logger.debug("Dialog result: %s", result)
+        if not result:
+            return
+
+        start, stop, step = dialog.get_sweep()
+        dialog.deleteLater()
+
+        try:
+            self.start_sweep(start, stop, step)
+        except ValueError as e:
+            logger.debug("Invalid sweep: %s", e)
+            self.module.nqrduck_signal.emit("notification", ["Error", str(e)])
 
     def toggle_start_button(self) -> None:
         """Based on wether the Validators for frequency and averages are in an acceptable state, the start button is enabled or disabled."""
@@ -113,48 +269,48 @@ class MeasurementController(ModuleController):
         logger.debug(self.module.model.averages_valid)
         if self.module.model.frequency_valid and self.module.model.averages_valid:
             self.module.view._ui_form.buttonStart.setEnabled(True)
+            self.module.view._ui_form.sweepButton.setEnabled(True)
         else:
             self.module.view._ui_form.buttonStart.setEnabled(False)
+            self.module.view._ui_form.sweepButton.setEnabled(False)
 
     def process_signals(self, key: str, value: object) -> None:
         """Process incoming signal from the nqrduck module.
 
+        Spectrometers can send partial results of long averaging runs with the 'partial_measurement_data' key.
+        The value is a tuple of a measurement holding the average of a chunk of scans and the number of scans in that chunk.
+
         Args:
             key (str): The key of the signal.
             value (object): The value of the signal.
         """
-        logger.debug(
-            "Measurement Dialog is visible: "
-            + str(self.module.view.measurement_dialog.isVisible())
-        )
+        logger.debug("Measurement running: " + str(self.measurement_job is not None))
+
+        if key == "measurement_data" and self.measurement_job is not None:
+            self.measurement_job.receive_data(value)
+
+        elif key == "partial_measurement_data" and self.measurement_job is not None:
+            measurement, averages = value
+            logger.debug("Received partial measurement with %s averages.", averages)
+            self.module.model.fold_partial_measurement(measurement, averages)
+            self.measurement_job.receive_partial(averages)
 
-        if (
-            key == "measurement_data"
-            and self.module.view.measurement_dialog.isVisible()
-        ):
-            logger.debug("Received single measurement.")
-            self.module.model.add_measurement(value)
-            self.module.view.measurement_dialog.hide()
-
-        elif (
-            key == "measurement_error"
-            and self.module.view.measurement_dialog.isVisible()
-        ):
-            logger.debug("Received measurement error.")
-            self.module.view.measurement_dialog.hide()
-            self.module.nqrduck_signal.emit("notification", ["Error", value])
-
-        elif (
-            key == "failure_set_frequency"
-            and self.module.view._ui_form.frequencyEdit.text() == value
-        ):
-            logger.debug("Received set frequency failure.")
-            self.set_frequency_failure.emit()
-
-        elif (
-            key == "failure_set_averages"
-            and self.module.view._ui_form.averagesEdit.text() == value
-        ):
+        elif key == "measurement_error" and self.measurement_job is not None:
+            self.measurement_job.receive_error(value)
+
+        elif key == "failure_set_frequency":
+            # During a measurement the job may have requested a different frequency than the one entered
+            if (
+                self.measurement_job is not None
+                and self.measurement_job.receive_frequency_failure(value)
+            ):
+                return
+
+            if str(self.module.model.measurement_frequency) == value:
+                logger.debug("Received set frequency failure.")
+                self.set_frequency_failure.emit()
+
+        elif key == "failure_set_averages" and str(self.module.model.averages) == value:
             logger.debug("Received set averages failure.")
             self.set_averages_failure.emit()
         elif key == "active_spectrometer_changed":
@@ -165,6 +321,8 @@ class MeasurementController(ModuleController):
     def save_measurement(self, file_name: str) -> None:
         """Save measurement to file.
 
+        The measurement is saved in the file format selected in the model.
+
         Args:
             file_name (str): Path to file.
         """
@@ -173,35 +331,395 @@ class MeasurementController(ModuleController):
             logger.debug("No measurement to save.")
             return
 
-        measurement = self.module.model.measurements[-1].to_json()
-
-        with open(file_name, "w") as f:
-            json.dump(measurement, f)
+        self.service.save_measurement(
+            self.module.model.measurements[-1],
+            file_name,
+            self.module.model.file_format,
+        )
 
     def load_measurement(self, file_name: str) -> None:
         """Load measurement from file.
 
+        The file format (JSON or binary) is detected automatically.
+        If lazy loading is enabled, the data of binary files is memory-mapped.
+
         Args:
             file_name (str): Path to file.
         """
         logger.debug("Loading measurement.")
 
         try:
-            with open(file_name) as f:
-                measurement = Measurement.from_json(json.load(f))
-                self.module.model.add_measurement(measurement)
-                self.module.model.displayed_measurement = measurement
+            measurement = self.service.load_measurement(
+                file_name, lazy=self.module.model.lazy_loading
+            )
+            self.module.model.displayed_measurement = measurement
         except FileNotFoundError:
             logger.debug("File not found.")
             self.module.nqrduck_signal.emit(
                 "notification", ["Error", "File not found."]
             )
-        except (json.JSONDecodeError, KeyError):
+        except (json.JSONDecodeError, KeyError, ValueError, zipfile.BadZipFile):
             logger.debug("File is not a valid measurement file.")
             self.module.nqrduck_signal.emit(
                 "notification", ["Error", "File is not a valid measurement file."]
             )
 
+    def load_measurements(self, file_names: list) -> ImportJob:
+        """Load many measurement files in the background.
+
+        The files are parsed in a worker pool and all loaded measurements are added to the model at once.
+
+        Args:
+            file_names (list): Paths to the files.
+
+        Returns:
+            ImportJob: The job of the import.
+        """
+        logger.debug("Loading %s measurements.", len(file_names))
+        job = ImportJob(file_names, lazy=self.module.model.lazy_loading)
+        progress_dialog = self.module.view.create_progress_dialog(
+            "Importing", f"Importing {len(file_names)} files...", len(file_names)
+        )
+
+        job.progress.connect(progress_dialog.setValue)
+        job.result_ready.connect(self.on_import_result)
+        job.done.connect(progress_dialog.reset)
+        job.done.connect(progress_dialog.deleteLater)
+        progress_dialog.canceled.connect(lambda: job.cancel())
+
+        start_in_thread(job)
+        return job
+
+    def load_directory(self, directory: str) -> ImportJob:
+        """Load all measurement files of a directory in the background.
+
+        Args:
+            directory (str): Path to the directory.
+
+        Returns:
+            ImportJob: The job of the import, None if there are no measurement files in the directory.
+        """
+        file_names = storage.list_measurement_files(
+            directory, self.module.model.FILE_EXTENSION
+        )
+        if not file_names:
+            logger.debug("No measurement files in %s.", directory)
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", "No measurement files found."]
+            )
+            return None
+
+        return self.load_measurements(file_names)
+
+    @pyqtSlot(object, object)
+    def on_import_result(self, measurements: list, failed: list) -> None:
+        """Add imported measurements to the model.
+
+        Args:
+            measurements (list): The loaded measurements.
+            failed (list): The names of the files that could not be loaded.
+        """
+        logger.debug(
+            "Imported %s measurements, %s files failed.", len(measurements), len(failed)
+        )
+        self.module.model.add_measurements(measurements)
+
+        if failed:
+            self.module.nqrduck_signal.emit(
+                "notification",
+                [
+                    "Error",
+                    f"{len(failed)} files are not valid measurement files.",
+                ],
+            )
+
+    def save_session(self, file_name: str) -> None:
+        """Save all measurements to a session file.
+
+        Args:
+            file_name (str): Path to the session file.
+        """
+        logger.debug("Saving session.")
+        measurements = self.module.model.measurements
+        if not measurements:
+            logger.debug("No measurements to save.")
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", "No measurements to save."]
+            )
+            return
+
+        displayed_measurement = self.module.model.displayed_measurement
+        displayed_index = next(
+            (
+                index
+                for index, measurement in enumerate(measurements)
+                if measurement is displayed_measurement
+            ),
+            None,
+        )
+
+        try:
+            self.service.save_session(file_name, measurements, displayed_index)
+        except (OSError, ValueError) as e:
+            logger.debug("Could not save session: %s", e)
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", f"Could not save session: {e}"]
+            )
+
+    def load_session(self, file_name: str) -> None:
+        """Load all measurements of a session file.
+
+        The measurements are added to the loaded measurements and the measurement that was displayed when the session was saved is displayed.
+
+        Args:
+            file_name (str): Path to the session file.
+        """
+        logger.debug("Loading session.")
+
+        try:
+            with self.module.model.batch():
+                measurements, displayed_index = self.service.load_session(file_name)
+                if displayed_index is not None:
+                    self.module.model.displayed_measurement = measurements[
+                        displayed_index
+                    ]
+        except FileNotFoundError:
+            logger.debug("File not found.")
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", "File not found."]
+            )
+            return
+        except (json.JSONDecodeError, KeyError, ValueError, zipfile.BadZipFile):
+            logger.debug("File is not a valid session file.")
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", "File is not a valid session file."]
+            )
+            return
+
+    @pyqtSlot(str)
+    def set_file_format(self, file_format: str) -> None:
+        """Set the file format used for saving measurements.
+
+        Args:
+            file_format (str): Either storage.JSON_FORMAT or storage.BINARY_FORMAT.
+        """
+        logger.debug("Setting file format to: %s", file_format)
+        self.module.model.file_format = file_format
+
+    @pyqtSlot(bool)
+    def set_lazy_loading(self, state: bool) -> None:
+        """Enable or disable lazy loading of binary measurement files.
+
+        Args:
+            state (bool): True if binary files should be memory-mapped.
+        """
+        logger.debug("Setting lazy loading to: %s", state)
+        self.module.model.lazy_loading = state
+
+    @pyqtSlot(int)
+    def set_memory_budget(self, megabytes: int) -> None:
+        """Set the memory budget for measurement data.
+
+        Args:
+            megabytes (int): The budget in megabytes, 0 disables the limit.
+        """
+        logger.debug("Setting memory budget to: %s MB", megabytes)
+        self.module.model.memory_budget = megabytes * 1024**2 if megabytes else None
+
+    @pyqtSlot(bool)
+    def set_auto_process(self, state: bool) -> None:
+        """Enable or disable running the pipeline on every new measurement.
+
+        Args:
+            state (bool): True if new measurements should be processed.
+        """
+        logger.debug("Setting auto processing to: %s", state)
+        self.module.model.auto_process = state
+
+    @pyqtSlot(bool)
+    def set_keep_raw(self, state: bool) -> None:
+        """Enable or disable keeping the unprocessed measurements next to the processed ones.
+
+        Args:
+            state (bool): True if the unprocessed measurements should be kept.
+        """
+        logger.debug("Setting keep raw to: %s", state)
+        self.module.model.keep_raw = state
+
+    @pyqtSlot()
+    def capture_pipeline(self) -> None:
+        """Capture the processing steps and fits of the displayed measurement as pipeline."""
+        measurement = self.module.model.displayed_measurement
+        if not measurement:
+            logger.debug("No measurement to capture a pipeline from.")
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", "No measurement to capture a pipeline from."]
+            )
+            return
+
+        pipeline = Pipeline.from_measurement(measurement)
+        logger.debug("Captured pipeline with %s steps.", len(pipeline))
+        if not pipeline:
+            self.module.nqrduck_signal.emit(
+                "notification",
+                ["Error", "The displayed measurement has not been processed."],
+            )
+            return
+
+        self.module.model.pipeline = pipeline
+        self.module.nqrduck_signal.emit(
+            "notification", ["Info", f"Captured pipeline with {len(pipeline)} steps."]
+        )
+
+    def save_pipeline(self, file_name: str) -> None:
+        """Save the pipeline to a file.
+
+        Args:
+            file_name (str): Path to the file.
+        """
+        logger.debug("Saving pipeline to %s.", file_name)
+        try:
+            self.module.model.pipeline.save(file_name)
+        except OSError as e:
+            logger.debug("Could not save pipeline: %s", e)
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", f"Could not save pipeline: {e}"]
+            )
+
+    def load_pipeline(self, file_name: str) -> None:
+        """Load the pipeline from a file.
+
+        Args:
+            file_name (str): Path to the file.
+        """
+        logger.debug("Loading pipeline from %s.", file_name)
+        try:
+            self.module.model.pipeline = Pipeline.load(file_name)
+        except (OSError, KeyError, ValueError, AttributeError) as e:
+            # JSONDecodeError is a ValueError
+            logger.debug("Could not load pipeline: %s", e)
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", "File is not a valid pipeline file."]
+            )
+
+    def process_measurement(self, measurement: Measurement) -> Measurement:
+        """Run the pipeline on a new measurement.
+
+        The data steps are run right away and the processed measurement is added to the model, in place of the measurement unless raw measurements are kept.
+        The fits of the pipeline are collected and run in one batch once the measurement job is over, see fit_pending_measurements.
+
+        Args:
+            measurement (Measurement): The measurement.
+
+        Returns:
+            Measurement: The processed measurement.
+        """
+        pipeline = self.module.model.pipeline
+        logger.debug("Processing %s with %s steps.", measurement.name, len(pipeline))
+        try:
+            processed = pipeline.process(measurement)
+        except (KeyError, ValueError, TypeError) as e:
+            logger.debug("Pipeline failed: %s", e)
+            self.module.model.add_measurement(measurement)
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", f"Processing failed: {e}"]
+            )
+            return measurement
+
+        with self.module.model.batch():
+            if self.module.model.keep_raw or processed is measurement:
+                self.module.model.add_measurement(measurement)
+            if processed is not measurement:
+                self.module.model.add_measurement(processed)
+
+        if pipeline.fit_types:
+            self.pending_fits.append(processed)
+        return processed
+
+    def fit_pending_measurements(self) -> FitBatchJob:
+        """Run the fits of the pipeline on the measurements processed during the last measurement job.
+
+        All measurements are fitted in one background job with a single progress dialog. Failed fits are reported in one notification once the job is over.
+
+        Returns:
+            FitBatchJob: The job of the fits, None if there is nothing to fit.
+        """
+        measurements, self.pending_fits = self.pending_fits, []
+        if not measurements:
+            return None
+
+        try:
+            fit_classes = [
+                fit_descriptor(fit_type).fit_class
+                for fit_type in self.module.model.pipeline.fit_types
+            ]
+        except ValueError as e:
+            logger.debug("Pipeline failed: %s", e)
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", f"Processing failed: {e}"]
+            )
+            return None
+
+        # The first measurement starts from previous fits, the others from the fit before them
+        initial_guesses = {
+            fit_class: self.service.initial_guess(measurements[0], fit_class)
+            for fit_class in fit_classes
+        }
+        job = FitBatchJob(fit_classes, measurements, initial_guesses)
+        n_fits = len(fit_classes) * len(measurements)
+        progress_dialog = self.module.view.create_progress_dialog(
+            "Fitting", f"Fitting {len(measurements)} measurements...", n_fits
+        )
+
+        job.progress.connect(progress_dialog.setValue)
+        job.result_ready.connect(self.on_fit_batch_result)
+        job.done.connect(progress_dialog.reset)
+        job.done.connect(progress_dialog.deleteLater)
+        progress_dialog.canceled.connect(lambda: job.cancel())
+
+        start_in_thread(job)
+        return job
+
+    @pyqtSlot(object, object)
+    def on_fit_batch_result(self, fits: list, failed: list) -> None:
+        """Add the fits of a batch to their measurements.
+
+        Args:
+            fits (list): The (measurement, fit) tuples.
+            failed (list): The (measurement, error message) tuples of the failed fits.
+        """
+        logger.debug("Fitted %s measurements, %s fits failed.", len(fits), len(failed))
+        for measurement, fit in fits:
+            self.service.add_fit(measurement, fit)
+            self.fit_previews.set(measurement, fit)
+
+        displayed_measurement = self.module.model.displayed_measurement
+        if any(measurement is displayed_measurement for measurement, _ in fits):
+            self.module.view.update_displayed_measurement()
+
+        if failed:
+            self.module.nqrduck_signal.emit(
+                "notification",
+                [
+                    "Error",
+                    f"{len(failed)} of {len(fits) + len(failed)} fits failed: {failed[0][1]}",
+                ],
+            )
+
+    @pyqtSlot()
+    def apply_baseline_correction(self) -> None:
+        """Subtract the baseline from the displayed measurement."""
+        measurement = self.module.model.displayed_measurement
+        if not measurement:
+            logger.debug("No measurement to correct.")
+            self.module.nqrduck_signal.emit(
+                "notification", ["Error", "No measurement to correct."]
+            )
+            return
+
+        logger.debug("Correcting baseline of %s.", measurement.name)
+        self.module.model.add_measurement(processing.correct_baseline(measurement))
+
     def show_apodization_dialog(self) -> None:
         """Show apodization dialog."""
         logger.debug("Showing apodization dialog.")
@@ -226,12 +744,30 @@ class MeasurementController(ModuleController):
 
         logger.debug("Apodization function: %s", function)
 
-        apodized_measurement = measurement.apodization(function)
+        measurements = [measurement]
+        if dialog.get_apply_to_selected():
+            measurements = self.module.view.selected_measurements() or measurements
 
         dialog.deleteLater()
 
-        self.module.model.displayed_measurement = apodized_measurement
-        self.module.model.add_measurement(apodized_measurement)
+        self.apodize_measurements(measurements, function)
+
+    def apodize_measurements(self, measurements: list, function: Function) -> list:
+        """Apply an apodization function to several measurements.
+
+        The window is evaluated once and applied to all datasets of all measurements. The apodized measurements are added to the model in one go.
+
+        Args:
+            measurements (list): The measurements to apodize.
+            function (Function): The apodization function.
+
+        Returns:
+            list: The apodized measurements.
+        """
+        logger.debug("Apodizing %s measurements.", len(measurements))
+        apodized_measurements = processing.batch_apodization(measurements, function)
+        self.module.model.add_measurements(apodized_measurements)
+        return apodized_measurements
 
     def show_fitting_dialog(self) -> None:
         """Show fitting dialog."""
@@ -246,22 +782,139 @@ class MeasurementController(ModuleController):
 
         measurement = self.module.model.displayed_measurement
 
-        dialog = Fitting(measurement, parent=self.module.view)
+        dialog = Fitting(measurement, self.fit_previews, parent=self.module.view)
         result = dialog.exec()
 
         logger.debug("Dialog result: %s", result)
         if not result:
             return
 
-        fit = dialog.get_fit()[1]
+        fit_class = dialog.get_fit()[1].fit_class
+        fit_all = dialog.get_fit_all()
+        warm_start = dialog.get_warm_start()
 
-        logger.debug("Fitting function: %s", fit)
+        logger.debug("Fitting function: %s", fit_class)
 
-        measurement.add_fit(fit)
+        dialog.deleteLater()
 
-        self.module.view.update_displayed_measurement()
+        if fit_all:
+            self.start_fit_all(measurement, fit_class, warm_start)
+        else:
+            self.start_fit(measurement, fit_class, warm_start)
 
-        dialog.deleteLater()
+    def start_fit(
+        self, measurement: Measurement, fit_class: type, warm_start: bool = True
+    ) -> FitJob:
+        """Fit a measurement in the background.
+
+        A progress dialog is shown while the fit is running. The fit is added to the measurement once it has finished, unless it was cancelled.
+
+        Args:
+            measurement (Measurement): The measurement to fit.
+            fit_class (type): The fit class, e.g. T2StarFit.
+            warm_start (bool, optional): Use the parameters of a previous fit as initial guess. Defaults to True.
+
+        Returns:
+            FitJob: The job of the fit.
+        """
+        initial_guess = None
+        if warm_start:
+            initial_guess = self.service.initial_guess(measurement, fit_class)
+            # A preview of the same fit is the best guess there is
+            preview = self.fit_previews.get(measurement, fit_class)
+            if preview is not None:
+                initial_guess = preview[1]
+
+        job = FitJob(fit_class, measurement, initial_guess)
+        progress_dialog = self.module.view.create_progress_dialog(
+            "Fitting", f"Fitting {measurement.name}..."
+        )
+
+        job.result_ready.connect(self.on_fit_result)
+        job.error.connect(self.on_fit_error)
+        job.done.connect(progress_dialog.reset)
+        job.done.connect(progress_dialog.deleteLater)
+        # The job is busy until the fit has finished, so it is cancelled directly instead of through its event loop.
+        progress_dialog.canceled.connect(lambda: job.cancel())
+
+        start_in_thread(job)
+        return job
+
+    def start_fit_all(
+        self, measurement: Measurement, fit_class: type, warm_start: bool = True
+    ) -> FitAllJob:
+        """Fit every dataset of a measurement in the background.
+
+        The datasets are fitted in parallel and the fit parameters are shown in a table once all datasets have been fitted.
+
+        Args:
+            measurement (Measurement): The measurement to fit.
+            fit_class (type): The fit class, e.g. T2StarFit.
+            warm_start (bool, optional): Use the parameters of a previous fit as initial guess. Defaults to True.
+
+        Returns:
+            FitAllJob: The job of the fits.
+        """
+        initial_guess = None
+        if warm_start:
+            initial_guess = self.service.initial_guess(measurement, fit_class, 0)
+
+        job = FitAllJob(fit_class, measurement, initial_guess)
+        progress_dialog = self.module.view.create_progress_dialog(
+            "Fitting", f"Fitting {measurement.name}...", measurement.tdy.shape[1]
+        )
+
+        job.progress.connect(progress_dialog.setValue)
+        job.result_ready.connect(self.on_fit_table_result)
+        job.done.connect(progress_dialog.reset)
+        job.done.connect(progress_dialog.deleteLater)
+        progress_dialog.canceled.connect(lambda: job.cancel())
+
+        start_in_thread(job)
+        return job
+
+    @pyqtSlot(object, object, object)
+    def on_fit_table_result(
+        self, measurement: Measurement, fit_class: type, table: dict
+    ) -> None:
+        """Show the fit parameters of all datasets of a measurement.
+
+        Args:
+            measurement (Measurement): The fitted measurement.
+            fit_class (type): The fit class.
+            table (dict): The table of the fits.
+        """
+        logger.debug("Fitted all datasets of %s.", measurement.name)
+        self.service.add_fit_table(measurement, fit_class, table)
+        self.module.view.show_fit_table(measurement.name, table)
+
+    @pyqtSlot(object, object)
+    def on_fit_result(self, measurement: Measurement, fit) -> None:
+        """Add a finished fit to its measurement.
+
+        Args:
+            measurement (Measurement): The fitted measurement.
+            fit (Fit): The fit.
+        """
+        logger.debug("Fit %s of %s finished.", fit.name, measurement.name)
+        self.service.add_fit(measurement, fit)
+        self.fit_previews.set(measurement, fit)
+
+        # The operator might have switched to another measurement in the meantime
+        if measurement is self.module.model.displayed_measurement:
+            self.module.view.update_displayed_measurement()
+
+    @pyqtSlot(str)
+    def on_fit_error(self, message: str) -> None:
+        """Notify the user about a failed fit.
+
+        Args:
+            message (str): The error message.
+        """
+        logger.debug("Fit failed: %s", message)
+        self.module.nqrduck_signal.emit(
+            "notification", ["Error", f"Fit failed: {message}"]
+        )
 
     @pyqtSlot(Measurement)
     def change_displayed_measurement(self, measurement) -> None:
@@ -276,7 +929,7 @@ class MeasurementController(ModuleController):
         if not self.module.model.measurements:
             logger.debug("No measurements to display.")
             return
-        
+
         self.module.model.displayed_measurement = measurement
 
         # Adjust the min and max value of the selection box
@@ -305,6 +958,39 @@ class MeasurementController(ModuleController):
 
         self.module.view.update_displayed_measurement()
 
+    def spill_in_background(self, spills: list) -> None:
+        """Write the cache files of spilled measurements in a worker thread.
+
+        Args:
+            spills (list): The spills prepared by the measurement store, see store.MeasurementStore.
+        """
+        logger.debug("Spilling %s measurements in the background.", len(spills))
+        job = SpillJob(spills)
+        job.result_ready.connect(self.on_spill_result)
+        job.error.connect(self.on_spill_error)
+        start_in_thread(job)
+
+    @pyqtSlot(object)
+    def on_spill_result(self, spill: tuple) -> None:
+        """Memory-map the data of a spilled measurement and drop its plot data.
+
+        Args:
+            spill (tuple): The spill whose cache file has been written.
+        """
+        if self.module.model.store.finish_spill(*spill):
+            # The plot data may reference the arrays that have just been spilled
+            self.module.view.plot_cache.invalidate(spill[0])
+
+    @pyqtSlot(object, str)
+    def on_spill_error(self, measurement: Measurement, file_name: str) -> None:
+        """Keep the data of a measurement in memory because it could not be spilled.
+
+        Args:
+            measurement (Measurement): The measurement.
+            file_name (str): Path to the cache file.
+        """
+        self.module.model.store.abort_spill(measurement, file_name)
+
     @pyqtSlot(Measurement)
     def delete_measurement(self, measurement: Measurement) -> None:
         """Delete a measurement.
@@ -316,6 +1002,7 @@ class MeasurementController(ModuleController):
         """
         logger.debug("Deleting measurement.")
         self.module.model.remove_measurement(measurement)
+        self.module.view.plot_cache.invalidate(measurement)
 
         if measurement == self.module.model.displayed_measurement:
             if self.module.model.measurements:
@@ -325,6 +1012,17 @@ class MeasurementController(ModuleController):
             else:
                 self.module.model.displayed_measurement = None
 
+    def delete_measurements(self, measurements: list) -> None:
+        """Delete several measurements at once.
+
+        Args:
+            measurements (list): The measurements to delete.
+        """
+        logger.debug("Deleting %s measurements.", len(measurements))
+        with self.module.model.batch():
+            for measurement in measurements:
+                self.delete_measurement(measurement)
+
     def edit_measurement(
         self, old_measurement: Measurement, new_measurement: Measurement
     ) -> None:
@@ -335,9 +1033,10 @@ class MeasurementController(ModuleController):
             new_measurement (Measurement): The new measurement.
         """
         logger.debug("Editing measurement.")
-        # Delete the old measurement
-        self.delete_measurement(old_measurement)
+        # Replacing the measurement only updates the view once
+        with self.module.model.batch():
+            # Delete the old measurement
+            self.delete_measurement(old_measurement)
 
-        # Add the new measurement
-        self.module.model.add_measurement(new_measurement)
-        self.module.model.displayed_measurement = new_measurement
+            # Add the new measurement
+            self.module.model.add_measurement(new_measurement)
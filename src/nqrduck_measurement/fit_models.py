@@ -0,0 +1,405 @@
+"""Registry of fit models with vectorized model functions and analytic Jacobians.
+
+A fit model describes a line shape or decay: its parameters, a vectorized model function, the analytic Jacobian of the model function and a data-driven initial guess.
+The least-squares fit uses the analytic Jacobian instead of finite differences.
+
+Every model gets a quackseq Fit subclass (see FitModel.fit_class), so fits of registered models are stored and restored like the built-in T2* and Lorentzian fits.
+
+Other packages can register further models with an entry point in the ``nqrduck_measurement.fit_models`` group, e.g. in their pyproject.toml::
+
+    [project.entry-points."nqrduck_measurement.fit_models"]
+    my-line-shape = "my_package.fits:MY_LINE_SHAPE"
+
+The entry point has to refer to a FitModel instance or to a FitModel subclass that can be created without arguments.
+"""
+
+import logging
+import re
+from functools import cache
+from importlib.metadata import entry_points
+
+import numpy as np
+from quackseq.measurement import Fit
+from scipy.optimize import curve_fit
+from scipy.signal import find_peaks, peak_widths
+from scipy.special import wofz
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "nqrduck_measurement.fit_models"
+
+# Ratio of the full width at half maximum and the standard deviation of a Gaussian.
+FWHM_PER_SIGMA = 2 * np.sqrt(2 * np.log(2))
+
+
+class FitModel:
+    """Base class of the fit models.
+
+    Subclasses set the class attributes and implement function, jacobian and initial_guess.
+
+    Attributes:
+        name (str): The name of the model shown to the operator.
+        domain (str): The domain of the fitted data, "time" or "frequency".
+        description (str): A short description of the model.
+        parameter_names (tuple): The names of the parameters in the order of the model function.
+    """
+
+    name = None
+    domain = None
+    description = ""
+    parameter_names = ()
+
+    def function(self, x: np.array, *parameters) -> np.array:
+        """The vectorized model function.
+
+        Args:
+            x (np.array): The x values.
+            *parameters: The parameter values.
+
+        Returns:
+            np.array: The model values.
+        """
+        raise NotImplementedError
+
+    def jacobian(self, x: np.array, *parameters) -> np.array:
+        """The analytic Jacobian of the model function.
+
+        Args:
+            x (np.array): The x values.
+            *parameters: The parameter values.
+
+        Returns:
+            np.array: The derivatives with one row per x value and one column per parameter.
+        """
+        raise NotImplementedError
+
+    def initial_guess(self, x: np.array, y: np.array) -> list:
+        """Initial guess of the parameters estimated from the data.
+
+        Args:
+            x (np.array): The x values.
+            y (np.array): The absolute values of the data.
+
+        Returns:
+            list: The initial guess.
+        """
+        raise NotImplementedError
+
+    @property
+    def class_name(self) -> str:
+        """Name of the Fit subclass of the model."""
+        words = re.findall(r"[A-Za-z0-9]+", self.name)
+        return "".join(word[0].upper() + word[1:] for word in words) + "Fit"
+
+    @property
+    def fit_class(self) -> type:
+        """The quackseq Fit subclass that fits this model."""
+        return _fit_class(self)
+
+
+class ModelFit(Fit):
+    """Fit of a FitModel.
+
+    The fit classes of the models are created by FitModel.fit_class and set the model class attribute.
+    """
+
+    model = None
+
+    def __init__(self, measurement, name: str | None = None) -> None:
+        """Initializes (and thereby performs) the fit."""
+        super().__init__(name or self.model.name, self.model.domain, measurement)
+
+    def fit(self) -> None:
+        """Fits the measurement data with the analytic Jacobian of the model."""
+        x, y = self.data()
+        values, self.covariance = curve_fit(
+            self.fit_function,
+            x,
+            y,
+            p0=self.initial_guess(),
+            jac=self.model.jacobian,
+        )
+
+        self.x = x
+        self.y = self.fit_function(x, *values)
+        self.parameters = dict(zip(self.model.parameter_names, values))
+        self.parameters["covariance"] = self.covariance
+
+    def data(self) -> tuple[np.array, np.array]:
+        """The x values and the absolute values of the last dataset in the domain of the fit."""
+        if self.domain == "time":
+            x, y = self.measurement.tdx, self.measurement.tdy[:, -1]
+        else:
+            x, y = self.measurement.fdx, self.measurement.fdy[:, -1]
+        return np.asarray(x, dtype=float), np.abs(y)
+
+    def fit_function(self, x: np.array, *parameters) -> np.array:
+        """The model function used for curve fitting."""
+        return self.model.function(x, *parameters)
+
+    def initial_guess(self) -> list:
+        """Initial guess estimated from the measurement data."""
+        return self.model.initial_guess(*self.data())
+
+
+_fit_classes = {}
+
+
+def _fit_class(model: FitModel) -> type:
+    """Create the Fit subclass of a model once."""
+    fit_class = _fit_classes.get(model.class_name)
+    if fit_class is None:
+        # The class is reachable as an attribute of this module (see __getattr__), so it can be pickled for the worker processes.
+        fit_class = type(
+            model.class_name,
+            (ModelFit,),
+            {"model": model, "__module__": __name__, "__doc__": model.description},
+        )
+        _fit_classes[model.class_name] = fit_class
+    return fit_class
+
+
+def __getattr__(name: str) -> type:
+    """Look up the Fit subclasses of the registered models."""
+    registered_fit_models()
+    if name in _fit_classes:
+        return _fit_classes[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _half_maximum_width(x: np.array, y: np.array) -> float:
+    """Estimate the full width at half maximum of the highest peak."""
+    above = x[y >= y.max() / 2]
+    width = above.max() - above.min() if len(above) > 1 else 0
+    if width <= 0:
+        width = (x.max() - x.min()) / 10
+    return width
+
+
+class GaussianModel(FitModel):
+    """Gaussian line shape A * exp(-(x - x0)^2 / (2 sigma^2))."""
+
+    name = "Gaussian"
+    domain = "frequency"
+    description = "Gaussian line in the frequency domain."
+    parameter_names = ("A", "x0", "sigma")
+
+    def function(self, x: np.array, A: float, x0: float, sigma: float) -> np.array:
+        """The Gaussian line."""
+        return A * np.exp(-((x - x0) ** 2) / (2 * sigma**2))
+
+    def jacobian(self, x: np.array, A: float, x0: float, sigma: float) -> np.array:
+        """Derivatives of the Gaussian line."""
+        d = x - x0
+        e = np.exp(-(d**2) / (2 * sigma**2))
+        g = A * e
+        return np.column_stack([e, g * d / sigma**2, g * d**2 / sigma**3])
+
+    def initial_guess(self, x: np.array, y: np.array) -> list:
+        """Height and position of the highest point and the half maximum width."""
+        return [y.max(), x[np.argmax(y)], _half_maximum_width(x, y) / FWHM_PER_SIGMA]
+
+
+class VoigtModel(FitModel):
+    """Voigt line shape, the convolution of a Gaussian and a Lorentzian line.
+
+    The profile is A * Re(w(z)) / (sigma sqrt(2 pi)) with the Faddeeva function w and z = (x - x0 + i gamma) / (sigma sqrt(2)).
+    A is the area of the line, sigma the standard deviation of the Gaussian and gamma the half width of the Lorentzian.
+    """
+
+    name = "Voigt"
+    domain = "frequency"
+    description = (
+        "Voigt line (Gaussian and Lorentzian broadening) in the frequency domain."
+    )
+    parameter_names = ("A", "x0", "sigma", "gamma")
+
+    def function(
+        self, x: np.array, A: float, x0: float, sigma: float, gamma: float
+    ) -> np.array:
+        """The Voigt line."""
+        z = (x - x0 + 1j * gamma) / (sigma * np.sqrt(2))
+        return A * wofz(z).real / (sigma * np.sqrt(2 * np.pi))
+
+    def jacobian(
+        self, x: np.array, A: float, x0: float, sigma: float, gamma: float
+    ) -> np.array:
+        """Derivatives of the Voigt line, using w'(z) = -2 z w(z) + 2i / sqrt(pi)."""
+        s = sigma * np.sqrt(2)
+        z = (x - x0 + 1j * gamma) / s
+        w = wofz(z)
+        dw = -2 * z * w + 2j / np.sqrt(np.pi)
+        norm = 1 / (sigma * np.sqrt(2 * np.pi))
+        return np.column_stack(
+            [
+                w.real * norm,
+                A * norm * (-dw / s).real,
+                A * norm * ((-dw * z).real - w.real) / sigma,
+                A * norm * (1j * dw / s).real,
+            ]
+        )
+
+    def initial_guess(self, x: np.array, y: np.array) -> list:
+        """Split the half maximum width evenly between both broadenings."""
+        width = _half_maximum_width(x, y)
+        sigma = width / 2 / FWHM_PER_SIGMA
+        gamma = width / 4
+        area = y.max() * width * np.pi / 2
+        return [area, x[np.argmax(y)], sigma, gamma]
+
+
+class MultiExponentialModel(FitModel):
+    """Sum of exponential decays A_i * exp(-t / T_i).
+
+    Args:
+        components (int): Number of exponential decays.
+    """
+
+    domain = "time"
+
+    def __init__(self, components: int) -> None:
+        """Initializes the model."""
+        self.components = components
+        self.name = f"{components}-exponential"
+        self.description = (
+            f"Sum of {components} exponential decays of the time domain signal."
+        )
+        self.parameter_names = tuple(
+            name for i in range(components) for name in (f"A{i}", f"T{i}")
+        )
+
+    @property
+    def class_name(self) -> str:
+        """Name of the Fit subclass of the model."""
+        return f"MultiExponential{self.components}Fit"
+
+    def function(self, t: np.array, *parameters) -> np.array:
+        """The sum of the decays."""
+        A, T = np.reshape(parameters, (-1, 2)).T
+        return np.exp(-t[:, None] / T) @ A
+
+    def jacobian(self, t: np.array, *parameters) -> np.array:
+        """Derivatives of the sum of the decays."""
+        A, T = np.reshape(parameters, (-1, 2)).T
+        e = np.exp(-t[:, None] / T)
+        jacobian = np.empty((len(t), len(parameters)))
+        jacobian[:, 0::2] = e
+        jacobian[:, 1::2] = A * e * t[:, None] / T**2
+        return jacobian
+
+    def initial_guess(self, t: np.array, y: np.array) -> list:
+        """Equal amplitudes and time constants spread logarithmically over the time axis."""
+        span = t.max() - t.min()
+        amplitude = y[0] / self.components
+        constants = np.geomspace(span / 3, span / 100, self.components)
+        return [value for T in constants for value in (amplitude, T)]
+
+
+class MultiLorentzianModel(FitModel):
+    """Sum of Lorentzian lines A_i / (1 + ((f - f_i) / gamma_i)^2), e.g. for quadrupole multiplets.
+
+    Args:
+        components (int): Number of lines.
+    """
+
+    domain = "frequency"
+
+    def __init__(self, components: int) -> None:
+        """Initializes the model."""
+        self.components = components
+        self.name = f"{components}-Lorentzian multiplet"
+        self.description = (
+            f"Sum of {components} Lorentzian lines in the frequency domain."
+        )
+        self.parameter_names = tuple(
+            name for i in range(components) for name in (f"A{i}", f"f{i}", f"gamma{i}")
+        )
+
+    @property
+    def class_name(self) -> str:
+        """Name of the Fit subclass of the model."""
+        return f"MultiLorentzian{self.components}Fit"
+
+    def function(self, f: np.array, *parameters) -> np.array:
+        """The sum of the lines."""
+        A, f0, gamma = np.reshape(parameters, (-1, 3)).T
+        u = (f[:, None] - f0) / gamma
+        return (1 / (1 + u**2)) @ A
+
+    def jacobian(self, f: np.array, *parameters) -> np.array:
+        """Derivatives of the sum of the lines."""
+        A, f0, gamma = np.reshape(parameters, (-1, 3)).T
+        u = (f[:, None] - f0) / gamma
+        lorentzian = 1 / (1 + u**2)
+        jacobian = np.empty((len(f), len(parameters)))
+        jacobian[:, 0::3] = lorentzian
+        jacobian[:, 1::3] = A * 2 * u * lorentzian**2 / gamma
+        jacobian[:, 2::3] = A * 2 * u**2 * lorentzian**2 / gamma
+        return jacobian
+
+    def initial_guess(self, f: np.array, y: np.array) -> list:
+        """Positions and widths of the highest peaks of the data."""
+        peaks, _ = find_peaks(y)
+        peaks = peaks[np.argsort(y[peaks])[::-1][: self.components]]
+        if not len(peaks):
+            peaks = np.array([np.argmax(y)])
+        # If there are not enough peaks, several lines start at the same peak
+        peaks = np.sort(np.resize(peaks, self.components))
+
+        df = abs(f[1] - f[0])
+        widths = peak_widths(y, peaks)[0] * df / 2
+        widths = np.where(widths > 0, widths, df)
+        return [
+            value
+            for peak, width in zip(peaks, widths)
+            for value in (y[peak], f[peak], width)
+        ]
+
+
+# Models that are always available.
+BUILTIN_FIT_MODELS = [
+    GaussianModel(),
+    VoigtModel(),
+    MultiExponentialModel(2),
+    MultiExponentialModel(3),
+    MultiLorentzianModel(2),
+    MultiLorentzianModel(3),
+]
+
+# The fit classes of the built-in models exist as soon as the module is imported, so their fits can be restored from JSON.
+for _model in BUILTIN_FIT_MODELS:
+    _fit_class(_model)
+
+
+@cache
+def registered_fit_models() -> dict:
+    """The built-in fit models and the models registered by entry points.
+
+    Entry points that can not be loaded are skipped.
+
+    Returns:
+        dict: The fit models by name.
+    """
+    models = {model.name: model for model in BUILTIN_FIT_MODELS}
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            model = entry_point.load()
+            if isinstance(model, type):
+                model = model()
+        except Exception:
+            logger.warning(
+                "Could not load fit model %s.", entry_point.name, exc_info=True
+            )
+            continue
+
+        if not isinstance(model, FitModel):
+            logger.warning("Entry point %s is not a fit model.", entry_point.name)
+            continue
+
+        logger.debug("Registered fit model %s.", model.name)
+        models[model.name] = model
+
+    # The fit classes have to exist before fits are restored from JSON
+    for model in models.values():
+        _fit_class(model)
+    return models
@@ -0,0 +1,582 @@
+"""Fitting of measurements and of all datasets of a measurement.
+
+Fits can be warm-started: the fitted parameters of a previous fit of the same measurement, or of a measurement it was derived from, are used as the initial guess of the next one.
+Neighbouring datasets usually have nearly identical parameters, so this saves optimizer iterations and makes convergence more robust.
+"""
+
+import logging
+import multiprocessing
+import os
+import weakref
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import cache
+from itertools import pairwise
+
+import numpy as np
+from quackseq.measurement import Fit, LorentzianFit, Measurement, T2StarFit
+
+from .fit_models import registered_fit_models
+
+logger = logging.getLogger(__name__)
+
+# Number of chunks per worker process when fitting all datasets.
+CHUNKS_PER_WORKER = 8
+
+
+class WarmStartedFit:
+    """Mixin for fits that start from a given initial guess instead of the default initial guess of the fit class.
+
+    The warm-started class of a fit class is created by warm_started_class.
+
+    Args:
+        measurement (Measurement): The measurement to fit.
+        initial_guess (list): The initial guess of the fit parameters.
+        **kwargs: Further arguments of the fit class.
+
+    Attributes:
+        start_values (list): The initial guess of the fit parameters.
+    """
+
+    def __init__(self, measurement: Measurement, initial_guess: list, **kwargs) -> None:
+        """Initializes (and thereby performs) the fit."""
+        # The fit is performed in __init__, so the guess has to be in place before.
+        self.start_values = [float(value) for value in initial_guess]
+        super().__init__(measurement, **kwargs)
+
+    def initial_guess(self) -> list:
+        """The given initial guess."""
+        return self.start_values
+
+
+@cache
+def warm_started_class(fit_class: type) -> type:
+    """The subclass of a fit class that starts from a given initial guess.
+
+    The subclass has the name of the fit class, so its fits are saved as fits of the fit class and restored as such.
+
+    Args:
+        fit_class (type): The fit class, e.g. T2StarFit.
+
+    Returns:
+        type: The subclass, see WarmStartedFit.
+    """
+    return type(
+        fit_class.__name__,
+        (WarmStartedFit, fit_class),
+        {"fit_class": fit_class, "__module__": __name__},
+    )
+
+
+class RestoredFit:
+    """Mixin for fits whose parameters are restored from a file instead of being fitted again.
+
+    The restored class of a fit class is created by restored_class.
+
+    Args:
+        measurement (Measurement): The fitted measurement.
+        stored (dict): The fit in the JSON-compatible format of fit_to_json.
+        **kwargs: Further arguments of the fit class.
+
+    Attributes:
+        stored (dict): The stored fit.
+    """
+
+    def __init__(self, measurement: Measurement, stored: dict, **kwargs) -> None:
+        """Initializes the fit with the stored parameters."""
+        # The fit is performed in __init__, so the parameters have to be in place before.
+        self.stored = stored
+        super().__init__(measurement, **kwargs)
+
+    def fit(self) -> None:
+        """Sets the stored parameters and covariance instead of fitting the data."""
+        if self.domain == "time":
+            x = self.measurement.tdx
+        elif self.domain == "frequency":
+            x = self.measurement.fdx
+        else:
+            raise ValueError("Domain not recognized.")
+
+        values = np.asarray(self.stored["values"], dtype=float)
+        self.covariance = np.asarray(self.stored["covariance"], dtype=float)
+        if self.stored["names"] is None:
+            self.parameters = values
+        else:
+            self.parameters = dict(zip(self.stored["names"], values))
+            self.parameters["covariance"] = self.covariance
+
+        self.x = x
+        self.y = self.fit_function(x, *values)
+
+
+@cache
+def restored_class(fit_class: type) -> type:
+    """The subclass of a fit class that restores stored parameters.
+
+    Like the warm-started class, the subclass has the name of the fit class.
+
+    Args:
+        fit_class (type): The fit class, e.g. T2StarFit.
+
+    Returns:
+        type: The subclass, see RestoredFit.
+    """
+    return type(
+        fit_class.__name__,
+        (RestoredFit, fit_class),
+        {"fit_class": fit_class, "__module__": __name__},
+    )
+
+
+def fit_class_of(fit: Fit) -> type:
+    """The fit class of a fit, which is the class that was warm-started or restored for such fits.
+
+    Args:
+        fit (Fit): The fit.
+
+    Returns:
+        type: The fit class.
+    """
+    if isinstance(fit, (WarmStartedFit, RestoredFit)):
+        return type(fit).fit_class
+    return type(fit)
+
+
+def fit_class_named(name: str) -> type:
+    """Look up a fit class by the class name stored with its fits.
+
+    Args:
+        name (str): The name of the class.
+
+    Returns:
+        type: The fit class.
+
+    Raises:
+        ValueError: If there is no fit class with the name.
+    """
+    for subclass in Fit.subclasses:
+        if subclass.__name__ == name and not issubclass(
+            subclass, (WarmStartedFit, RestoredFit)
+        ):
+            return subclass
+    raise ValueError(f"Subclass {name} not found.")
+
+
+def fit_to_json(fit: Fit) -> dict:
+    """Converts a fit to a JSON-compatible format that includes its parameters.
+
+    Args:
+        fit (Fit): The fit.
+
+    Returns:
+        dict: The fit in the format of Fit.to_json with the parameter names, values and covariance.
+    """
+    names, values, covariance = fit_values(fit)
+    data = fit.to_json()
+    data["names"] = names if isinstance(fit.parameters, dict) else None
+    data["values"] = values.tolist()
+    data["covariance"] = covariance.tolist()
+    return data
+
+
+def fit_from_json(data: dict, measurement: Measurement) -> Fit:
+    """Converts the format of fit_to_json to a fit without fitting the data again.
+
+    Fits stored by Fit.to_json have no parameters, they are fitted again.
+
+    Args:
+        data (dict): The fit in JSON-compatible format.
+        measurement (Measurement): The fitted measurement.
+
+    Returns:
+        Fit: The fit.
+
+    Raises:
+        ValueError: If there is no fit class with the stored name.
+    """
+    if "values" not in data:
+        return Fit.from_json(data, measurement)
+
+    fit_class = fit_class_named(data["class"])
+    return restored_class(fit_class)(measurement, data, name=data["name"])
+
+
+def create_fit(
+    fit_class: type, measurement: Measurement, initial_guess: list | None = None
+) -> Fit:
+    """Create (and thereby perform) a fit.
+
+    If the fit does not converge from the given initial guess, it is repeated with the default initial guess of the fit class.
+
+    Args:
+        fit_class (type): The fit class, e.g. T2StarFit.
+        measurement (Measurement): The measurement to fit.
+        initial_guess (list, optional): The initial guess of the fit parameters. Defaults to None, which uses the default initial guess of the fit class.
+
+    Returns:
+        Fit: The fit.
+    """
+    if initial_guess is not None:
+        try:
+            return warm_started_class(fit_class)(measurement, initial_guess)
+        except RuntimeError as e:
+            logger.debug("Warm-started fit failed, starting from scratch: %s", e)
+
+    return fit_class(measurement)
+
+
+def fit_values(fit: Fit) -> tuple[list, np.array, np.array]:
+    """Get the fitted parameters of a fit.
+
+    Args:
+        fit (Fit): The fit.
+
+    Returns:
+        tuple[list, np.array, np.array]: The names of the parameters, their values and the covariance matrix.
+    """
+    if isinstance(fit.parameters, dict):
+        names = [name for name in fit.parameters if name != "covariance"]
+        values = [fit.parameters[name] for name in names]
+    else:
+        values = list(fit.parameters)
+        names = [f"p{i}" for i in range(len(values))]
+
+    return names, np.asarray(values, dtype=float), np.asarray(fit.covariance)
+
+
+def fit_datasets(
+    fit_class: type,
+    tdx: np.array,
+    tdy: np.array,
+    target_frequency: float,
+    frequency_shift: float = 0,
+    IF_frequency: float = 0,
+    initial_guess: list | None = None,
+) -> list:
+    """Fit consecutive datasets, each one warm-started with the parameters of the one before.
+
+    This runs in the worker processes, so only the arrays of the datasets are sent instead of the whole measurement.
+
+    Args:
+        fit_class (type): The fit class, e.g. T2StarFit.
+        tdx (np.array): Time axis of the datasets.
+        tdy (np.array): Time domain data with one column per dataset.
+        target_frequency (float): Target frequency of the measurement.
+        frequency_shift (float, optional): Frequency shift of the measurement. Defaults to 0.
+        IF_frequency (float, optional): Intermediate frequency of the measurement. Defaults to 0.
+        initial_guess (list, optional): Initial guess of the first dataset. Defaults to None.
+
+    Returns:
+        list: The names, values and covariance of every dataset, None for datasets that could not be fitted.
+    """
+    results = []
+    for index in range(tdy.shape[1]):
+        measurement = Measurement(
+            "dataset",
+            tdx,
+            tdy[:, index],
+            target_frequency,
+            frequency_shift=frequency_shift,
+            IF_frequency=IF_frequency,
+        )
+        try:
+            result = fit_values(create_fit(fit_class, measurement, initial_guess))
+        except (RuntimeError, ValueError, TypeError) as e:
+            logger.debug("Fit of dataset %s failed: %s", index, e)
+            result = None
+        else:
+            initial_guess = result[1]
+        results.append(result)
+
+    return results
+
+
+def fit_all_datasets(
+    fit_class: type,
+    measurement: Measurement,
+    max_workers: int | None = None,
+    progress: Callable | None = None,
+    is_cancelled: Callable | None = None,
+    initial_guess: list | None = None,
+) -> dict:
+    """Fit every dataset of a measurement in a process pool.
+
+    The datasets are split into consecutive chunks. Every chunk is fitted in a worker process, warm-starting each dataset with the parameters of the one before.
+    Datasets that can not be fitted get NaN values in the table.
+
+    Args:
+        fit_class (type): The fit class, e.g. T2StarFit.
+        measurement (Measurement): The measurement.
+        max_workers (int, optional): Number of worker processes. Defaults to None, which uses the number of cores.
+        progress (Callable, optional): Called with the number of finished and the total number of datasets. Defaults to None.
+        is_cancelled (Callable, optional): Returns True if the remaining fits should be skipped. Defaults to None.
+        initial_guess (list, optional): Initial guess of the first dataset of every chunk. Defaults to None.
+
+    Returns:
+        dict: The table of the fits. 'dataset' holds the dataset indices, every fit parameter has a column with its values and 'covariance' holds the covariance matrices.
+    """
+    n_datasets = measurement.tdy.shape[1]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(min(max_workers, n_datasets), 1)
+
+    # Serially, every dataset is its own chunk, so the progress is updated after every fit.
+    n_chunks = n_datasets if max_workers == 1 else max_workers * CHUNKS_PER_WORKER
+    bounds = np.linspace(0, n_datasets, min(n_chunks, n_datasets) + 1, dtype=int)
+
+    def arguments(start: int, stop: int, guess: list) -> tuple:
+        return (
+            fit_class,
+            measurement.tdx,
+            np.asarray(measurement.tdy[:, start:stop]),
+            measurement.target_frequency,
+            measurement.frequency_shift,
+            measurement.IF_frequency,
+            guess,
+        )
+
+    results = [None] * n_datasets
+    finished = 0
+
+    def collect(start: int, chunk_results: list) -> None:
+        nonlocal finished
+        results[start : start + len(chunk_results)] = chunk_results
+        finished += len(chunk_results)
+        if progress is not None:
+            progress(finished, n_datasets)
+
+    logger.debug(
+        "Fitting %s datasets in %s chunks with %s workers.",
+        n_datasets,
+        len(bounds) - 1,
+        max_workers,
+    )
+    if max_workers == 1:
+        guess = initial_guess
+        for start, stop in pairwise(bounds):
+            if is_cancelled is not None and is_cancelled():
+                break
+            chunk_results = fit_datasets(*arguments(start, stop, guess))
+            collect(start, chunk_results)
+            if chunk_results[-1] is not None:
+                guess = chunk_results[-1][1]
+    else:
+        # Forking the multithreaded GUI process (Qt, BLAS) can deadlock the workers, so they are spawned.
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                executor.submit(
+                    fit_datasets, *arguments(start, stop, initial_guess)
+                ): start
+                for start, stop in pairwise(bounds)
+            }
+            for future in as_completed(futures):
+                if is_cancelled is not None and is_cancelled():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                collect(futures[future], future.result())
+
+    return fit_table(results)
+
+
+def fit_table(results: list) -> dict:
+    """Collect the results of fit_datasets into a table.
+
+    Args:
+        results (list): The results per dataset, None for failed fits.
+
+    Returns:
+        dict: The table of the fits, see fit_all_datasets.
+    """
+    names = next((result[0] for result in results if result is not None), [])
+    n_parameters = len(names)
+
+    table = {"dataset": np.arange(len(results))}
+    values = np.full((len(results), n_parameters), np.nan)
+    covariance = np.full((len(results), n_parameters, n_parameters), np.nan)
+    for index, result in enumerate(results):
+        if result is not None:
+            values[index] = result[1]
+            covariance[index] = result[2]
+
+    for i, name in enumerate(names):
+        table[name] = values[:, i]
+    table["covariance"] = covariance
+
+    return table
+
+
+class FitGuessCache:
+    """Fitted parameters per measurement, dataset and fit class.
+
+    The parameters are used as initial guesses of later fits of the same measurement or of measurements derived from it. The cache only holds weak references to the measurements.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the cache."""
+        self._entries = weakref.WeakKeyDictionary()
+
+    def get(self, measurement: Measurement, dataset: int, fit_class: type) -> list:
+        """Get the initial guess of a fit.
+
+        If the dataset has not been fitted with the fit class yet, the parameters of the closest fitted dataset are returned.
+        If the measurement has not been fitted with the fit class at all, the measurements it was derived from are searched, see processing.DerivedMeasurement.
+
+        Args:
+            measurement (Measurement): The measurement.
+            dataset (int): The index of the dataset.
+            fit_class (type): The fit class.
+
+        Returns:
+            list: The initial guess, None if neither the measurement nor its sources have been fitted with the fit class yet.
+        """
+        while measurement is not None:
+            guesses = {
+                index: values
+                for (index, cls), values in self._entries.get(measurement, {}).items()
+                if cls is fit_class
+            }
+            if guesses:
+                return guesses[min(guesses, key=lambda index: abs(index - dataset))]
+            measurement = getattr(measurement, "source", None)
+        return None
+
+    def set(
+        self, measurement: Measurement, dataset: int, fit_class: type, values: list
+    ) -> None:
+        """Store the fitted parameters of a dataset.
+
+        Args:
+            measurement (Measurement): The measurement.
+            dataset (int): The index of the dataset.
+            fit_class (type): The fit class.
+            values (list): The fitted parameter values.
+        """
+        self._entries.setdefault(measurement, {})[(dataset, fit_class)] = list(values)
+
+    def set_table(self, measurement: Measurement, fit_class: type, table: dict) -> None:
+        """Store the fitted parameters of all datasets of a table.
+
+        Args:
+            measurement (Measurement): The measurement.
+            fit_class (type): The fit class.
+            table (dict): The table of the fits, see fit_all_datasets.
+        """
+        names = [key for key in table if key not in ("dataset", "covariance")]
+        if not names:
+            return
+
+        values = np.column_stack([table[name] for name in names])
+        for dataset, row in zip(table["dataset"], values):
+            if not np.isnan(row).any():
+                self.set(measurement, int(dataset), fit_class, row)
+
+
+class FitDescriptor:
+    """Describes a fit type without performing a fit.
+
+    Fits are performed when they are created, so the fitting dialog only offers descriptors and the fit is created once the operator has chosen one.
+
+    Args:
+        name (str): The name of the fit type shown to the operator.
+        fit_class (type): The fit class, e.g. T2StarFit.
+        description (str, optional): A short description of the fit. Defaults to "".
+
+    Attributes:
+        name (str): The name of the fit type.
+        fit_class (type): The fit class.
+        description (str): A short description of the fit.
+    """
+
+    def __init__(self, name: str, fit_class: type, description: str = "") -> None:
+        """Initializes the descriptor."""
+        self.name = name
+        self.fit_class = fit_class
+        self.description = description
+
+    def create(
+        self, measurement: Measurement, initial_guess: list | None = None
+    ) -> Fit:
+        """Create (and thereby perform) a fit of this type, see create_fit.
+
+        Args:
+            measurement (Measurement): The measurement to fit.
+            initial_guess (list, optional): The initial guess of the fit parameters. Defaults to None.
+
+        Returns:
+            Fit: The fit.
+        """
+        return create_fit(self.fit_class, measurement, initial_guess)
+
+
+# The built-in fit types of quackseq.
+FIT_DESCRIPTORS = [
+    FitDescriptor("T2*", T2StarFit, "Exponential decay of the time domain signal."),
+    FitDescriptor(
+        "Lorentzian", LorentzianFit, "Lorentzian line in the frequency domain."
+    ),
+]
+
+
+def fit_descriptors() -> list:
+    """The fit types offered by the fitting dialog.
+
+    Returns:
+        list: The descriptors of the built-in fits followed by those of the registered fit models, see fit_models.
+    """
+    return FIT_DESCRIPTORS + [
+        FitDescriptor(model.name, model.fit_class, model.description)
+        for model in registered_fit_models().values()
+    ]
+
+
+def fit_descriptor(fit_type: str) -> FitDescriptor:
+    """Look up a fit type by its name.
+
+    Args:
+        fit_type (str): The name of the fit type, e.g. "T2*".
+
+    Returns:
+        FitDescriptor: The descriptor of the fit type.
+
+    Raises:
+        ValueError: If there is no fit type with the name.
+    """
+    for descriptor in fit_descriptors():
+        if descriptor.name == fit_type:
+            return descriptor
+    raise ValueError(f"Unknown fit type: {fit_type}")
+
+
+class FitPreviewCache:
+    """Memoized fit results per measurement and fit class.
+
+    A preview holds the names, values and covariance of the fitted parameters of the last dataset, see fit_values.
+    Reopening the fitting dialog on the same measurement shows the preview without fitting again. The cache only holds weak references to the measurements.
+    """
+
+    def __init__(self) -> None:
+        """Initializes the cache."""
+        self._entries = weakref.WeakKeyDictionary()
+
+    def get(self, measurement: Measurement, fit_class: type) -> tuple:
+        """Get the memoized preview of a fit.
+
+        Args:
+            measurement (Measurement): The measurement.
+            fit_class (type): The fit class.
+
+        Returns:
+            tuple: The names, values and covariance of the parameters, None if the measurement has not been fitted with the fit class yet.
+        """
+        return self._entries.get(measurement, {}).get(fit_class)
+
+    def set(self, measurement: Measurement, fit: Fit) -> None:
+        """Memoize the result of a fit.
+
+        Args:
+            measurement (Measurement): The fitted measurement.
+            fit (Fit): The fit.
+        """
+        self._entries.setdefault(measurement, {})[fit_class_of(fit)] = fit_values(fit)
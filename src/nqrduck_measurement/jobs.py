@@ -0,0 +1,480 @@
+"""Jobs that run the work of the measurement module outside of the GUI thread.
+
+The measurement job is the exception, it only coordinates the measurements run by the spectrometer module.
+"""
+
+import logging
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+from .fitting import create_fit, fit_all_datasets, fit_values
+from .storage import load_measurements
+from .store import write_cache_file
+
+logger = logging.getLogger(__name__)
+
+# Threads and their jobs are referenced here until the threads are finished, so they are not garbage collected while running.
+_running_threads = {}
+
+
+class MeasurementJob(QObject):
+    """Lifecycle of a single measurement or a queue of measurements at different frequencies.
+
+    The measurements themselves are run by the spectrometer module, which handles the nqrduck signals requested by the job in the GUI thread.
+    The job only keeps track of the queued frequencies and the progress, so it lives in the GUI thread as well.
+    Every measurement, including the first one, is started from the event loop, so the measurement dialog is shown and the GUI processes events between the measurements of a queue.
+    While the spectrometer module runs a measurement, the GUI thread is blocked. Stop and Cancel take effect once the running measurement has returned.
+    If the spectrometer can not set the frequency of a measurement, the measurement is skipped.
+
+    Args:
+        frequencies (list): The measurement frequencies in Hz.
+        averages (int): The number of averages of every measurement.
+
+    Signals:
+        request: Emitted with the key and value of an nqrduck signal that should be sent to the other modules.
+        progress: Emitted with the number of finished averages and the total number of averages.
+        result_ready: Emitted with the measurement once it has been retrieved.
+        skipped: Emitted with the frequency in Hz of a measurement that was skipped because the spectrometer could not set the frequency.
+        error: Emitted with an error message if the measurement failed.
+        done: Emitted when the job is over, no matter if it succeeded, failed or was cancelled.
+    """
+
+    request = pyqtSignal(str, object)
+    progress = pyqtSignal(int, int)
+    result_ready = pyqtSignal(object)
+    skipped = pyqtSignal(float)
+    error = pyqtSignal(str)
+    done = pyqtSignal()
+
+    def __init__(self, frequencies: list, averages: int) -> None:
+        """Initialize the job."""
+        super().__init__()
+        self.frequencies = list(frequencies)
+        self.averages = averages
+        self.total_averages = averages * len(self.frequencies)
+        self.index = 0
+        self.finished_averages = 0
+        self.frequency_failed = False
+        self.cancelled = False
+
+    @property
+    def current_frequency(self) -> float:
+        """Frequency in Hz of the running measurement, None if all measurements are finished."""
+        if self.index < len(self.frequencies):
+            return self.frequencies[self.index]
+        return None
+
+    def start(self) -> None:
+        """Start the first measurement once the event loop is reached again."""
+        self.progress.emit(0, self.total_averages)
+        # The caller shows the measurement dialog first, which has to be painted before the spectrometer blocks the GUI thread.
+        QTimer.singleShot(0, self.start_next)
+
+    @pyqtSlot()
+    def start_next(self) -> None:
+        """Push the measurement parameters of the next frequency and start the measurement."""
+        if self.cancelled:
+            return
+
+        frequency = self.frequencies[self.index]
+        logger.debug(
+            "Starting measurement %s of %s at %s Hz.",
+            self.index + 1,
+            len(self.frequencies),
+            frequency,
+        )
+        # The parameters are set again in case the user switched the spectrometer
+        self.frequency_failed = False
+        self.request.emit("set_frequency", str(frequency))
+        if self.frequency_failed:
+            self.skip()
+            return
+
+        self.request.emit("set_averages", str(self.averages))
+        self.request.emit("start_measurement", None)
+
+    def receive_data(self, measurement) -> None:
+        """Deliver the retrieved measurement and start the next one.
+
+        Args:
+            measurement (Measurement): The measurement sent by the spectrometer.
+        """
+        if self.cancelled:
+            logger.debug("Ignoring data of cancelled measurement job.")
+            return
+
+        if self.frequency_failed:
+            logger.debug("Ignoring data measured at the wrong frequency.")
+            self.skip()
+            return
+
+        self.result_ready.emit(measurement)
+        self.advance()
+
+    def receive_frequency_failure(self, value: str) -> bool:
+        """Skip the running measurement if the spectrometer could not set its frequency.
+
+        If the measurement has already been started, its data is discarded when it arrives.
+
+        Args:
+            value (str): The frequency the spectrometer could not set, as sent with the 'set_frequency' request.
+
+        Returns:
+            bool: True if the failure concerns the running measurement.
+        """
+        if self.cancelled or value != str(self.current_frequency):
+            return False
+
+        logger.debug("Could not set the frequency to %s Hz.", value)
+        self.frequency_failed = True
+        return True
+
+    def skip(self) -> None:
+        """Skip the running measurement and start the next one."""
+        self.frequency_failed = False
+        self.skipped.emit(self.current_frequency)
+        self.advance()
+
+    def advance(self) -> None:
+        """Count the running measurement as finished and start the next one."""
+        self.index += 1
+        self.finished_averages = self.index * self.averages
+        self.progress.emit(self.finished_averages, self.total_averages)
+
+        if self.index == len(self.frequencies):
+            self.done.emit()
+        else:
+            # The spectrometer may deliver the data while the start request is still being handled, so the next measurement is not started from here.
+            QTimer.singleShot(0, self.start_next)
+
+    def receive_partial(self, averages: int) -> None:
+        """Update the progress with a partial measurement.
+
+        Args:
+            averages (int): Number of averages in the partial measurement.
+        """
+        # A measurement can not report more averages than it is made of.
+        self.finished_averages = min(
+            self.finished_averages + averages, (self.index + 1) * self.averages
+        )
+        self.progress.emit(self.finished_averages, self.total_averages)
+
+    def receive_error(self, message: str) -> None:
+        """Report a failed measurement.
+
+        Args:
+            message (str): The error message sent by the spectrometer.
+        """
+        if self.cancelled:
+            return
+
+        self.error.emit(message)
+        self.done.emit()
+
+    def cancel(self) -> None:
+        """Discard the data of the running measurement and do not start the queued ones.
+
+        The spectrometer module offers no way to interrupt a measurement, so the running measurement continues until the spectrometer delivers its data.
+        """
+        logger.debug("Cancelling measurement job.")
+        self.cancelled = True
+        self.done.emit()
+
+
+class FitJob(QObject):
+    """Fit of a measurement.
+
+    The fit classes of quackseq fit the data when they are created, which can take a while for long or noisy data.
+    The job creates the fit in its own QThread and hands it to the GUI thread through a signal.
+
+    Args:
+        fit_class (type): The fit class, e.g. T2StarFit.
+        measurement (Measurement): The measurement to fit.
+        initial_guess (list, optional): Initial guess of the fit parameters. Defaults to None.
+
+    Signals:
+        result_ready: Emitted with the measurement and the fit once the fit has finished.
+        error: Emitted with an error message if the fit failed.
+        done: Emitted when the job is over, no matter if it succeeded, failed or was cancelled.
+    """
+
+    result_ready = pyqtSignal(object, object)
+    error = pyqtSignal(str)
+    done = pyqtSignal()
+
+    def __init__(
+        self, fit_class: type, measurement, initial_guess: list | None = None
+    ) -> None:
+        """Initialize the job."""
+        super().__init__()
+        self.fit_class = fit_class
+        self.measurement = measurement
+        self.initial_guess = initial_guess
+        self.cancelled = False
+
+    @pyqtSlot()
+    def run(self) -> None:
+        """Fit the measurement."""
+        logger.debug(
+            "Fitting %s with %s.", self.measurement.name, self.fit_class.__name__
+        )
+        try:
+            fit = create_fit(self.fit_class, self.measurement, self.initial_guess)
+        except (RuntimeError, ValueError, TypeError) as e:
+            # curve_fit raises a RuntimeError if the fit does not converge
+            if not self.cancelled:
+                self.error.emit(str(e))
+        else:
+            if self.cancelled:
+                logger.debug("Discarding result of cancelled fit.")
+            else:
+                self.result_ready.emit(self.measurement, fit)
+
+        self.done.emit()
+
+    def cancel(self) -> None:
+        """Discard the result of the fit.
+
+        The fit itself can not be interrupted. This is called directly from the GUI thread, because the thread of the job is busy until the fit has finished.
+        """
+        logger.debug("Cancelling fit job.")
+        self.cancelled = True
+
+
+class FitAllJob(QObject):
+    """Fit of every dataset of a measurement.
+
+    The datasets are fitted in a process pool, the job waits for the results in its own QThread.
+
+    Args:
+        fit_class (type): The fit class, e.g. T2StarFit.
+        measurement (Measurement): The measurement to fit.
+        initial_guess (list, optional): Initial guess of the fit parameters. Defaults to None.
+
+    Signals:
+        progress: Emitted with the number of fitted datasets and the total number of datasets.
+        result_ready: Emitted with the measurement, the fit class and the table of the fits once all datasets have been fitted.
+        done: Emitted when the job is over, no matter if it succeeded or was cancelled.
+    """
+
+    progress = pyqtSignal(int, int)
+    result_ready = pyqtSignal(object, object, object)
+    done = pyqtSignal()
+
+    def __init__(
+        self, fit_class: type, measurement, initial_guess: list | None = None
+    ) -> None:
+        """Initialize the job."""
+        super().__init__()
+        self.fit_class = fit_class
+        self.measurement = measurement
+        self.initial_guess = initial_guess
+        self.cancelled = False
+
+    @pyqtSlot()
+    def run(self) -> None:
+        """Fit all datasets of the measurement."""
+        table = fit_all_datasets(
+            self.fit_class,
+            self.measurement,
+            progress=self.progress.emit,
+            is_cancelled=lambda: self.cancelled,
+            initial_guess=self.initial_guess,
+        )
+
+        if self.cancelled:
+            logger.debug("Discarding results of cancelled fits.")
+        else:
+            self.result_ready.emit(self.measurement, self.fit_class, table)
+
+        self.done.emit()
+
+    def cancel(self) -> None:
+        """Skip the remaining fits and discard the results.
+
+        This is called directly from the GUI thread, because the thread of the job is busy until the fits have finished.
+        """
+        logger.debug("Cancelling fit job.")
+        self.cancelled = True
+
+
+class FitBatchJob(QObject):
+    """Fits of many measurements, e.g. of the points of a sweep.
+
+    The measurements are fitted one after another in the order they were measured. Every fit starts from the parameters of the previous fit of the same class, neighbouring points of a sweep usually have similar parameters.
+    Fits that fail are collected instead of interrupting the job.
+
+    Args:
+        fit_classes (list): The fit classes, every measurement is fitted with each of them.
+        measurements (list): The measurements to fit.
+        initial_guesses (dict, optional): Initial guess of the first fit per fit class. Defaults to None.
+
+    Signals:
+        progress: Emitted with the number of finished and the total number of fits.
+        result_ready: Emitted with the (measurement, fit) tuples and the (measurement, error message) tuples of the failed fits once all fits are over.
+        done: Emitted when the job is over, no matter if it succeeded or was cancelled.
+    """
+
+    progress = pyqtSignal(int, int)
+    result_ready = pyqtSignal(object, object)
+    done = pyqtSignal()
+
+    def __init__(
+        self, fit_classes: list, measurements: list, initial_guesses: dict | None = None
+    ) -> None:
+        """Initialize the job."""
+        super().__init__()
+        self.fit_classes = list(fit_classes)
+        self.measurements = list(measurements)
+        self.initial_guesses = dict(initial_guesses or {})
+        self.cancelled = False
+
+    @pyqtSlot()
+    def run(self) -> None:
+        """Fit the measurements."""
+        n_fits = len(self.fit_classes) * len(self.measurements)
+        logger.debug("Fitting %s measurements.", len(self.measurements))
+        guesses = dict(self.initial_guesses)
+        fits = []
+        failed = []
+        for measurement in self.measurements:
+            for fit_class in self.fit_classes:
+                if self.cancelled:
+                    break
+                try:
+                    fit = create_fit(fit_class, measurement, guesses.get(fit_class))
+                except (RuntimeError, ValueError, TypeError) as e:
+                    # curve_fit raises a RuntimeError if the fit does not converge
+                    failed.append((measurement, str(e)))
+                else:
+                    fits.append((measurement, fit))
+                    guesses[fit_class] = fit_values(fit)[1]
+                self.progress.emit(len(fits) + len(failed), n_fits)
+
+        if self.cancelled:
+            logger.debug("Discarding results of cancelled fits.")
+        else:
+            self.result_ready.emit(fits, failed)
+
+        self.done.emit()
+
+    def cancel(self) -> None:
+        """Skip the remaining fits and discard the results.
+
+        This is called directly from the GUI thread, because the thread of the job is busy until the fits have finished.
+        """
+        logger.debug("Cancelling fit job.")
+        self.cancelled = True
+
+
+class ImportJob(QObject):
+    """Import of many measurement files.
+
+    The files are parsed in a worker pool, the job waits for the results in its own QThread.
+
+    Args:
+        file_names (list): Paths to the files.
+        lazy (bool, optional): Memory-map the time domain data of binary files. Defaults to False.
+
+    Signals:
+        progress: Emitted with the number of loaded and the total number of files.
+        result_ready: Emitted with the loaded measurements and the names of the files that could not be loaded.
+        done: Emitted when the job is over, no matter if it succeeded or was cancelled.
+    """
+
+    progress = pyqtSignal(int, int)
+    result_ready = pyqtSignal(object, object)
+    done = pyqtSignal()
+
+    def __init__(self, file_names: list, lazy: bool = False) -> None:
+        """Initialize the job."""
+        super().__init__()
+        self.file_names = list(file_names)
+        self.lazy = lazy
+        self.cancelled = False
+
+    @pyqtSlot()
+    def run(self) -> None:
+        """Load the files."""
+        measurements, failed = load_measurements(
+            self.file_names,
+            lazy=self.lazy,
+            progress=self.progress.emit,
+            is_cancelled=lambda: self.cancelled,
+        )
+
+        if self.cancelled:
+            logger.debug("Discarding cancelled import.")
+        else:
+            self.result_ready.emit(measurements, failed)
+
+        self.done.emit()
+
+    def cancel(self) -> None:
+        """Skip the remaining files and discard the loaded measurements.
+
+        This is called directly from the GUI thread, because the thread of the job is busy until the files are loaded.
+        """
+        logger.debug("Cancelling import job.")
+        self.cancelled = True
+
+
+class SpillJob(QObject):
+    """Writing of the cache files of measurements whose data is spilled from memory, see store.MeasurementStore.
+
+    Args:
+        spills (list): The (measurement, file name, tdy, fdy) tuples prepared by the store.
+
+    Signals:
+        result_ready: Emitted with a tuple of spills once its cache file has been written.
+        error: Emitted with the measurement and the file name if the cache file could not be written.
+        done: Emitted when all cache files have been written.
+    """
+
+    result_ready = pyqtSignal(object)
+    error = pyqtSignal(object, str)
+    done = pyqtSignal()
+
+    def __init__(self, spills: list) -> None:
+        """Initialize the job."""
+        super().__init__()
+        self.spills = spills
+
+    @pyqtSlot()
+    def run(self) -> None:
+        """Write the cache files."""
+        for spill in self.spills:
+            measurement, file_name, tdy, fdy = spill
+            try:
+                write_cache_file(file_name, tdy, fdy)
+            except OSError as e:
+                logger.debug("Could not spill %s: %s", measurement.name, e)
+                self.error.emit(measurement, file_name)
+            else:
+                self.result_ready.emit(spill)
+
+        self.done.emit()
+
+
+def start_in_thread(job: QObject) -> QThread:
+    """Move a job to a new QThread and start it.
+
+    The job needs a run slot and a done signal. The thread is quit and both objects are deleted once the job is done.
+    References to the thread and the job are kept until the thread has finished.
+
+    Args:
+        job (QObject): The job to run.
+
+    Returns:
+        QThread: The thread the job is running in.
+    """
+    thread = QThread()
+    job.moveToThread(thread)
+    thread.started.connect(job.run)
+    job.done.connect(thread.quit)
+    job.done.connect(job.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.finished.connect(lambda: _running_threads.pop(thread, None))
+    _running_threads[thread] = job
+    thread.start()
+    return thread
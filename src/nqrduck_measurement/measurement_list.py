@@ -0,0 +1,247 @@
+"""Model and delegate for the list of measurements."""
+
+import logging
+
+from nqrduck.assets.icons import Logos
+from PyQt6.QtCore import (
+    QAbstractListModel,
+    QEvent,
+    QModelIndex,
+    QRect,
+    QSize,
+    Qt,
+    pyqtSignal,
+)
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate
+
+logger = logging.getLogger(__name__)
+
+
+class MeasurementListModel(QAbstractListModel):
+    """List model of the measurements of the measurement module.
+
+    The model follows the list of measurements of the MeasurementModel. Appended and removed measurements are inserted and removed as single rows, so the view does not have to be rebuilt.
+    An index from measurement identity to row is kept up to date, so the row of a measurement is found in constant time.
+
+    Attributes:
+        MeasurementRole (int): Item data role that returns the measurement of a row.
+    """
+
+    MeasurementRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None) -> None:
+        """Initialize the list model."""
+        super().__init__(parent)
+        self._measurements = []
+        # Maps id(measurement) to its row. The model holds references to all measurements, so their ids can not be reused.
+        self._rows = {}
+
+    def rowCount(self, parent: QModelIndex = None) -> int:
+        """Number of measurements in the list."""
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self._measurements)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        """Data of a row.
+
+        Args:
+            index (QModelIndex): The index of the row.
+            role (int, optional): The item data role. Defaults to DisplayRole.
+
+        Returns:
+            object: The name of the measurement for display and tooltip role, the measurement itself for MeasurementRole.
+        """
+        if not index.isValid() or index.row() >= len(self._measurements):
+            return None
+
+        measurement = self._measurements[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return measurement.name
+        elif role == self.MeasurementRole:
+            return measurement
+        return None
+
+    def measurement(self, row: int):
+        """Measurement of a row.
+
+        Args:
+            row (int): The row.
+
+        Returns:
+            Measurement: The measurement.
+        """
+        return self._measurements[row]
+
+    def row_of(self, measurement) -> int:
+        """Row of a measurement.
+
+        Args:
+            measurement (Measurement): The measurement.
+
+        Returns:
+            int: The row of the measurement or -1 if it is not in the list.
+        """
+        return self._rows.get(id(measurement), -1)
+
+    def _index_rows(self, start: int = 0) -> None:
+        """Update the row index for all rows from start on.
+
+        Args:
+            start (int, optional): First row that changed. Defaults to 0.
+        """
+        if start == 0:
+            self._rows = {}
+        for row in range(start, len(self._measurements)):
+            self._rows[id(self._measurements[row])] = row
+
+    def set_measurements(self, measurements: list) -> None:
+        """Follow a change of the list of measurements.
+
+        Appending measurements and removing a single measurement are applied as row insertions and removals.
+        Any other change resets the model.
+
+        Args:
+            measurements (list): The new list of measurements.
+        """
+        old = self._measurements
+        new = list(measurements)
+
+        if len(new) >= len(old) and all(a is b for a, b in zip(old, new)):
+            if len(new) > len(old):
+                self.beginInsertRows(QModelIndex(), len(old), len(new) - 1)
+                self._measurements = new
+                self._index_rows(len(old))
+                self.endInsertRows()
+            else:
+                # Same measurements, but names might have been edited
+                self._measurements = new
+                self.dataChanged.emit(self.index(0), self.index(len(new) - 1))
+            return
+
+        if len(new) == len(old) - 1:
+            row = next(
+                (i for i, (a, b) in enumerate(zip(old, new)) if a is not b), len(new)
+            )
+            if all(a is b for a, b in zip(old[row + 1 :], new[row:])):
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[id(old[row])]
+                self._measurements = new
+                self._index_rows(row)
+                self.endRemoveRows()
+                return
+
+        logger.debug("Resetting measurement list model.")
+        self.beginResetModel()
+        self._measurements = new
+        self._index_rows()
+        self.endResetModel()
+
+
+class MeasurementItemDelegate(QStyledItemDelegate):
+    """Delegate that paints a measurement with an edit button, its (elided) name and a delete button.
+
+    Signals:
+        edit_clicked: Emitted with the measurement when the edit button is clicked.
+        delete_clicked: Emitted with the measurement when the delete button is clicked.
+        display_clicked: Emitted with the measurement when its name is clicked.
+
+    Clicks with Ctrl or Shift held only change the selection of the list.
+    """
+
+    edit_clicked = pyqtSignal(object)
+    delete_clicked = pyqtSignal(object)
+    display_clicked = pyqtSignal(object)
+
+    # Size of the button icons and the margin around them
+    ICON_SIZE = 12
+    MARGIN = 6
+
+    def __init__(self, parent=None) -> None:
+        """Initialize the delegate."""
+        super().__init__(parent)
+        self.edit_icon = Logos.Pen12x12()
+        self.delete_icon = Logos.Garbage12x12()
+
+    def _edit_rect(self, rect: QRect) -> QRect:
+        """Area of the edit button in an item."""
+        return QRect(
+            rect.left() + self.MARGIN,
+            rect.center().y() - self.ICON_SIZE // 2,
+            self.ICON_SIZE,
+            self.ICON_SIZE,
+        )
+
+    def _delete_rect(self, rect: QRect) -> QRect:
+        """Area of the delete button in an item."""
+        return QRect(
+            rect.right() - self.MARGIN - self.ICON_SIZE,
+            rect.center().y() - self.ICON_SIZE // 2,
+            self.ICON_SIZE,
+            self.ICON_SIZE,
+        )
+
+    def _name_rect(self, rect: QRect) -> QRect:
+        """Area of the name in an item."""
+        left = rect.left() + 2 * self.MARGIN + self.ICON_SIZE
+        right = rect.right() - 2 * self.MARGIN - self.ICON_SIZE
+        return QRect(left, rect.top(), max(right - left, 0), rect.height())
+
+    def paint(self, painter, option, index: QModelIndex) -> None:
+        """Paint a measurement item."""
+        self.initStyleOption(option, index)
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+
+        # Background and selection highlight
+        style.drawPrimitive(
+            QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, widget
+        )
+
+        self.edit_icon.paint(painter, self._edit_rect(option.rect))
+        self.delete_icon.paint(painter, self._delete_rect(option.rect))
+
+        name_rect = self._name_rect(option.rect)
+        name = option.fontMetrics.elidedText(
+            index.data(), Qt.TextElideMode.ElideRight, name_rect.width()
+        )
+
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.setPen(option.palette.highlightedText().color())
+        else:
+            painter.setPen(option.palette.text().color())
+        painter.drawText(
+            name_rect,
+            Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft,
+            name,
+        )
+        painter.restore()
+
+    def sizeHint(self, option, index: QModelIndex) -> QSize:
+        """Size of a measurement item."""
+        height = max(option.fontMetrics.height(), self.ICON_SIZE) + self.MARGIN
+        return QSize(option.rect.width(), height)
+
+    def editorEvent(self, event, model, option, index: QModelIndex) -> bool:
+        """Handle clicks on the buttons and the name of an item."""
+        if event.type() != QEvent.Type.MouseButtonRelease:
+            return super().editorEvent(event, model, option, index)
+
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        if event.modifiers() & (
+            Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier
+        ):
+            return False
+
+        measurement = index.data(MeasurementListModel.MeasurementRole)
+        position = event.position().toPoint()
+        if self._edit_rect(option.rect).contains(position):
+            self.edit_clicked.emit(measurement)
+        elif self._delete_rect(option.rect).contains(position):
+            self.delete_clicked.emit(measurement)
+        else:
+            self.display_clicked.emit(measurement)
+        return True
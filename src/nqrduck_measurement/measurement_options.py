@@ -0,0 +1,59 @@
+"""Measurement options."""
+
+import logging
+
+from nqrduck.helpers.formbuilder import DuckFormBuilder, DuckFormFloatField
+
+logger = logging.getLogger(__name__)
+
+
+class Sweep(DuckFormBuilder):
+    """Frequency sweep parameter.
+
+    This parameter is used to queue measurements at a range of frequencies.
+    The measurements are run back-to-back with the number of averages set in the measurement settings.
+    """
+
+    def __init__(self, frequency: float, parent=None) -> None:
+        """Frequency sweep parameter.
+
+        Args:
+            frequency (float): The current measurement frequency in MHz, used as the default start frequency.
+            parent (QWidget, optional): The parent widget. Defaults to None.
+        """
+        super().__init__("Frequency Sweep", parent=parent)
+
+        start_field = DuckFormFloatField(
+            "Start (MHz)",
+            "First frequency of the sweep.",
+            default=frequency,
+            min_value=20.0,
+            max_value=1000.0,
+        )
+        stop_field = DuckFormFloatField(
+            "Stop (MHz)",
+            "Last frequency of the sweep.",
+            default=frequency + 1.0,
+            min_value=20.0,
+            max_value=1000.0,
+        )
+        step_field = DuckFormFloatField(
+            "Step (MHz)",
+            "Distance between two frequencies of the sweep.",
+            default=0.1,
+            min_value=1e-6,
+            max_value=1000.0,
+        )
+
+        self.add_field(start_field)
+        self.add_field(stop_field)
+        self.add_field(step_field)
+
+    def get_sweep(self) -> tuple:
+        """Get the sweep parameters.
+
+        Returns:
+            tuple: Start, stop and step of the sweep in MHz.
+        """
+        start, stop, step = self.get_values()
+        return start, stop, step
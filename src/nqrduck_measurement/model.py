@@ -1,9 +1,14 @@
 """Model for the measurement module."""
 
 import logging
+from contextlib import contextmanager
 from PyQt6.QtCore import pyqtSignal
 from quackseq.measurement import Measurement
 from nqrduck.module.module_model import ModuleModel
+from .storage import JSON_FORMAT
+from .store import MeasurementStore
+from .service import FILE_EXTENSION, SESSION_FILE_EXTENSION
+from .pipeline import PIPELINE_FILE_EXTENSION, Pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +20,11 @@ class MeasurementModel(ModuleModel):
 
     Attributes:
         FILE_EXTENSION (str): The file extension of the measurement files.
+        SESSION_FILE_EXTENSION (str): The file extension of the session files.
+        PIPELINE_FILE_EXTENSION (str): The file extension of the pipeline files.
         FFT_VIEW (str): The view mode for the FFT view.
         TIME_VIEW (str): The view mode for the time view.
+        DEFAULT_MEMORY_BUDGET (int): Default memory budget for measurement data in bytes.
 
         displayed_measurement_changed (pyqtSignal): Signal emitted when the displayed measurement changes.
         measurements_changed (pyqtSignal): Signal emitted when the list of measurements changes.
@@ -24,12 +32,22 @@ class MeasurementModel(ModuleModel):
 
         measurement_frequency_changed (pyqtSignal): Signal emitted when the measurement frequency changes.
         averages_changed (pyqtSignal): Signal emitted when the number of averages changes.
+        running_average_changed (pyqtSignal): Signal emitted when a partial measurement has been folded into the running average.
 
         view_mode (str): The view mode of the measurement view.
         measurements (list): List of measurements.
         displayed_measurement (Measurement): The displayed measurement data.
         measurement_frequency (float): The measurement frequency.
         averages (int): The number of averages.
+        file_format (str): The file format used for saving measurements.
+        lazy_loading (bool): Whether binary measurement files are memory-mapped when they are loaded.
+        pipeline (Pipeline): The processing pipeline that is run on new measurements.
+        auto_process (bool): Whether the pipeline is run on every new measurement.
+        keep_raw (bool): Whether the unprocessed measurements are kept next to the processed ones.
+        running_average (Measurement): Running average of the partial measurements of the current measurement.
+        running_average_count (int): Number of averages in the running average.
+        store (MeasurementStore): Keeps the data of the recently displayed measurements in memory and spills the rest to disk.
+        memory_budget (int): Memory budget for measurement data in bytes, None if there is no limit.
 
         validator_measurement_frequency (DuckFloatValidator): Validator for the measurement frequency.
         validator_averages (DuckIntValidator): Validator for the number of averages.
@@ -41,9 +59,13 @@ class MeasurementModel(ModuleModel):
 
         measurement_frequency_changed: Signal emitted when the measurement frequency changes.
         averages_changed: Signal emitted when the number of averages changes.
+        running_average_changed: Signal emitted when a partial measurement has been folded into the running average.
     """
 
-    FILE_EXTENSION = "meas"
+    FILE_EXTENSION = FILE_EXTENSION
+    DEFAULT_MEMORY_BUDGET = 2 * 1024**3
+    SESSION_FILE_EXTENSION = SESSION_FILE_EXTENSION
+    PIPELINE_FILE_EXTENSION = PIPELINE_FILE_EXTENSION
     # This constants are used to determine which view is currently displayed.
     FFT_VIEW = "frequency"
     TIME_VIEW = "time"
@@ -55,10 +77,16 @@ class MeasurementModel(ModuleModel):
 
     measurement_frequency_changed = pyqtSignal(float)
     averages_changed = pyqtSignal(int)
+    running_average_changed = pyqtSignal()
 
     def __init__(self, module) -> None:
         """Initialize the model."""
         super().__init__(module)
+        self.store = MeasurementStore(self.DEFAULT_MEMORY_BUDGET)
+        self._batch_depth = 0
+        self._measurements_changed_pending = False
+        self._displayed_measurement_pending = False
+
         self.view_mode = self.TIME_VIEW
         self.measurements = []
         self._displayed_measurement = None
@@ -67,6 +95,15 @@ class MeasurementModel(ModuleModel):
         self.averages = 1
         self.dataset_index = 0
 
+        self.file_format = JSON_FORMAT
+        self.lazy_loading = False
+
+        self.pipeline = Pipeline()
+        self.auto_process = False
+        self.keep_raw = True
+
+        self.reset_running_average()
+
         self.frequency_valid = False
         self.averages_valid = False
 
@@ -93,21 +130,120 @@ class MeasurementModel(ModuleModel):
     @measurements.setter
     def measurements(self, value: list[Measurement]):
         self._measurements = value
-        self.measurements_changed.emit(value)
+        self._emit_measurements_changed()
 
     def add_measurement(self, measurement: Measurement):
         """Add a measurement to the list of measurements."""
         self.measurements.append(measurement)
         # Change the maximum value of the selectionBox.
-        self.measurements_changed.emit(self.measurements)
+        self._emit_measurements_changed()
         self.displayed_measurement = measurement
-        self.displayed_measurement_changed.emit(measurement)
+        self._emit_displayed_measurement_changed(measurement)
+
+    def add_measurements(self, measurements: list):
+        """Add several measurements to the list of measurements at once.
+
+        The signals are only emitted once and the last measurement is displayed.
+        """
+        with self.batch():
+            for measurement in measurements:
+                self.add_measurement(measurement)
 
     def remove_measurement(self, measurement: Measurement):
         """Remove a measurement from the list of measurements."""
         self.measurements.remove(measurement)
+        self.store.discard(measurement)
         # Change the maximum value of the selectionBox.
-        self.measurements_changed.emit(self.measurements)
+        self._emit_measurements_changed()
+
+    @contextmanager
+    def batch(self):
+        """Context manager that defers the signals about the measurements until it is left.
+
+        Within a batch, measurements_changed and displayed_measurement_changed are emitted at most once each, when the outermost batch is left.
+        This way several changes to the list of measurements only cause one update of the view.
+
+        Example:
+            with model.batch():
+                model.remove_measurement(old_measurement)
+                model.add_measurement(new_measurement)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._emit_batched_signals()
+
+    def _emit_measurements_changed(self) -> None:
+        """Emit measurements_changed, or defer it if a batch is running."""
+        if self._batch_depth:
+            self._measurements_changed_pending = True
+        else:
+            self.measurements_changed.emit(self.measurements)
+
+    def _emit_displayed_measurement_changed(self, measurement: Measurement) -> None:
+        """Emit displayed_measurement_changed, or defer it if a batch is running."""
+        if self._batch_depth:
+            self._displayed_measurement_pending = True
+        else:
+            self.displayed_measurement_changed.emit(measurement)
+
+    def _emit_batched_signals(self) -> None:
+        """Emit the signals that were deferred during a batch."""
+        measurements_changed = self._measurements_changed_pending
+        displayed_measurement_changed = self._displayed_measurement_pending
+        self._measurements_changed_pending = False
+        self._displayed_measurement_pending = False
+
+        if measurements_changed:
+            self.measurements_changed.emit(self.measurements)
+        if displayed_measurement_changed:
+            self.displayed_measurement_changed.emit(self.displayed_measurement)
+
+    def reset_running_average(self) -> None:
+        """Discard the running average of the partial measurements."""
+        self._average_sum = None
+        self._average_template = None
+        self._running_average = None
+        self.running_average_count = 0
+
+    def fold_partial_measurement(self, measurement: Measurement, averages: int) -> None:
+        """Fold a partial measurement into the running average.
+
+        Args:
+            measurement (Measurement): The average of a chunk of scans.
+            averages (int): The number of scans in the chunk.
+        """
+        if self._average_sum is None:
+            self._average_sum = measurement.tdy * averages
+        else:
+            self._average_sum += measurement.tdy * averages
+
+        self._average_template = measurement
+        self.running_average_count += averages
+        # The measurement is only created again when it is requested.
+        self._running_average = None
+        self.running_average_changed.emit()
+
+    @property
+    def running_average(self) -> Measurement:
+        """Running average of the partial measurements.
+
+        This is None if no partial measurement has been received yet.
+        """
+        if self._running_average is None and self._average_sum is not None:
+            template = self._average_template
+            self._running_average = Measurement(
+                template.name,
+                template.tdx,
+                self._average_sum / self.running_average_count,
+                target_frequency=template.target_frequency,
+                frequency_shift=template.frequency_shift,
+                IF_frequency=template.IF_frequency,
+            )
+        return self._running_average
 
     @property
     def displayed_measurement(self):
@@ -121,6 +257,9 @@ class MeasurementModel(ModuleModel):
     @displayed_measurement.setter
     def displayed_measurement(self, value: Measurement):
         self._displayed_measurement = value
+        # Reads spilled data back into memory and spills other data if needed
+        if value is not None:
+            self.store.touch(value)
 
     @property
     def measurement_frequency(self):
@@ -174,3 +313,74 @@ class MeasurementModel(ModuleModel):
     @dataset_index.setter
     def dataset_index(self, value: int):
         self._dataset_index = value
+
+    @property
+    def file_format(self) -> str:
+        """File format used for saving measurements.
+
+        Can be either "json" or "binary". Loading detects the format automatically.
+        """
+        return self._file_format
+
+    @file_format.setter
+    def file_format(self, value: str):
+        self._file_format = value
+
+    @property
+    def memory_budget(self) -> int:
+        """Memory budget for measurement data in bytes.
+
+        If the data of all measurements exceeds the budget, the data of the least recently displayed measurements is spilled to disk.
+        None disables the limit.
+        """
+        return self.store.memory_budget
+
+    @memory_budget.setter
+    def memory_budget(self, value: int):
+        self.store.memory_budget = value
+        self.store.enforce_budget()
+
+    @property
+    def lazy_loading(self) -> bool:
+        """Whether binary measurement files are loaded lazily.
+
+        If enabled, the time domain data is memory-mapped and only the displayed dataset is read from disk.
+        """
+        return self._lazy_loading
+
+    @lazy_loading.setter
+    def lazy_loading(self, value: bool):
+        self._lazy_loading = value
+
+    @property
+    def pipeline(self) -> Pipeline:
+        """The processing pipeline that is run on new measurements."""
+        return self._pipeline
+
+    @pipeline.setter
+    def pipeline(self, value: Pipeline):
+        self._pipeline = value
+
+    @property
+    def auto_process(self) -> bool:
+        """Whether the pipeline is run on every new measurement.
+
+        Only the results of measurements are processed, imported measurements are not.
+        """
+        return self._auto_process
+
+    @auto_process.setter
+    def auto_process(self, value: bool):
+        self._auto_process = value
+
+    @property
+    def keep_raw(self) -> bool:
+        """Whether the unprocessed measurements are kept next to the processed ones.
+
+        If not, only the result of the pipeline is added to the measurements.
+        """
+        return self._keep_raw
+
+    @keep_raw.setter
+    def keep_raw(self, value: bool):
+        self._keep_raw = value
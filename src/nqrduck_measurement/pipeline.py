@@ -0,0 +1,162 @@
+"""Recorded, replayable processing pipelines.
+
+A pipeline is an ordered list of JSON-compatible processing steps. Data steps (apodization, baseline correction, see processing.rederive) derive a new measurement from the previous one, fit steps fit the measurement produced by all data steps.
+The spectrum of every measurement is computed when it is created, so there is no separate FFT step.
+
+Pipelines are captured from the lineage and the fits of a measurement that was processed interactively, saved as JSON and run again on new measurements.
+"""
+
+import json
+import logging
+
+from quackseq.measurement import Measurement
+
+from . import processing
+from .fitting import create_fit, fit_class_of, fit_descriptor, fit_descriptors
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_FILE_EXTENSION = "pipeline"
+
+# Type of the fit steps, the other step types are the ones of the derived measurements.
+FIT = "fit"
+
+DATA_STEP_TYPES = (processing.APODIZATION, processing.BASELINE)
+
+
+class Pipeline:
+    """An ordered list of processing steps.
+
+    Args:
+        steps (list, optional): The steps. Defaults to None, which creates an empty pipeline.
+
+    Attributes:
+        steps (list): The steps, every step is a dict with a 'type' key.
+    """
+
+    def __init__(self, steps: list | None = None) -> None:
+        """Initializes the pipeline."""
+        self.steps = []
+        for step in steps or []:
+            self.append(step)
+
+    def __len__(self) -> int:
+        """Number of steps."""
+        return len(self.steps)
+
+    def append(self, step: dict) -> None:
+        """Append a step.
+
+        Args:
+            step (dict): The step.
+
+        Raises:
+            ValueError: If the type of the step is not known.
+        """
+        if step.get("type") not in DATA_STEP_TYPES + (FIT,):
+            raise ValueError(f"Unknown processing step: {step.get('type')}")
+        self.steps.append(step)
+
+    @property
+    def fit_types(self) -> list:
+        """Names of the fit types of the fit steps."""
+        return [step["fit"] for step in self.steps if step["type"] == FIT]
+
+    def process(self, measurement: Measurement) -> Measurement:
+        """Run the data steps of the pipeline.
+
+        Args:
+            measurement (Measurement): The measurement.
+
+        Returns:
+            Measurement: The processed measurement, the measurement itself if the pipeline has no data steps.
+        """
+        for step in self.steps:
+            if step["type"] != FIT:
+                measurement = processing.rederive(measurement, step)
+        return measurement
+
+    def run(self, measurement: Measurement) -> Measurement:
+        """Run all steps of the pipeline.
+
+        Args:
+            measurement (Measurement): The measurement.
+
+        Returns:
+            Measurement: The processed measurement with the fits of the fit steps.
+        """
+        measurement = self.process(measurement)
+        for fit_type in self.fit_types:
+            fit_class = fit_descriptor(fit_type).fit_class
+            measurement.add_fit(create_fit(fit_class, measurement))
+        return measurement
+
+    @classmethod
+    def from_measurement(cls, measurement: Measurement) -> "Pipeline":
+        """Capture the steps that produced a measurement and its fits.
+
+        Fits whose type is not offered by the fitting dialog are skipped.
+
+        Args:
+            measurement (Measurement): The processed measurement.
+
+        Returns:
+            Pipeline: The pipeline.
+        """
+        steps = []
+        if isinstance(measurement, processing.DerivedMeasurement):
+            steps.extend(measurement.lineage)
+
+        names = {
+            descriptor.fit_class: descriptor.name for descriptor in fit_descriptors()
+        }
+        for fit in measurement.fits:
+            fit_class = fit_class_of(fit)
+            if fit_class in names:
+                steps.append({"type": FIT, "fit": names[fit_class]})
+            else:
+                logger.debug("Skipping fit %s of unknown type.", fit.name)
+
+        return cls(steps)
+
+    def to_json(self) -> dict:
+        """Converts the pipeline to a JSON-compatible format.
+
+        Returns:
+            dict: The pipeline in JSON-compatible format.
+        """
+        return {"steps": self.steps}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Pipeline":
+        """Converts the JSON format to a pipeline.
+
+        Args:
+            data (dict): The pipeline in JSON-compatible format.
+
+        Returns:
+            Pipeline: The pipeline.
+        """
+        return cls(data["steps"])
+
+    def save(self, file_name: str) -> None:
+        """Save the pipeline as JSON.
+
+        Args:
+            file_name (str): Path to the file.
+        """
+        with open(file_name, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    @classmethod
+    def load(cls, file_name: str) -> "Pipeline":
+        """Load a pipeline saved with save.
+
+        Args:
+            file_name (str): Path to the file.
+
+        Returns:
+            Pipeline: The pipeline.
+        """
+        with open(file_name) as f:
+            return cls.from_json(json.load(f))
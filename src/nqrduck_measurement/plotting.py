@@ -0,0 +1,169 @@
+"""Helpers for plotting measurement data."""
+
+import logging
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIME_DOMAIN = "time"
+FREQUENCY_DOMAIN = "frequency"
+
+
+class PlotData:
+    """The arrays that are plotted for one dataset of a measurement.
+
+    Args:
+        x (np.array): The x values. For the frequency domain they are already shifted to the target frequency in MHz.
+        y (np.array): The complex y values.
+
+    Attributes:
+        x (np.array): The x values.
+        real (np.array): Real part of the y values.
+        imag (np.array): Imaginary part of the y values.
+        magnitude (np.array): Magnitude of the y values.
+    """
+
+    __slots__ = ("imag", "magnitude", "real", "x")
+
+    def __init__(self, x: np.array, y: np.array) -> None:
+        """Initializes the plot data."""
+        y = np.asarray(y)
+        self.x = np.asarray(x)
+        self.real = y.real
+        self.imag = y.imag
+        self.magnitude = np.abs(y)
+
+
+def frequency_axis(measurement) -> np.array:
+    """Frequency axis of a measurement shifted to the target frequency.
+
+    Args:
+        measurement (Measurement): The measurement.
+
+    Returns:
+        np.array: The frequency axis in MHz.
+    """
+    return (
+        measurement.fdx
+        + float(measurement.target_frequency - measurement.IF_frequency) * 1e-6
+    )
+
+
+def compute_plot_data(measurement, index: int, domain: str) -> PlotData:
+    """Compute the plot data of one dataset of a measurement.
+
+    Args:
+        measurement (Measurement): The measurement.
+        index (int): The index of the dataset.
+        domain (str): Either TIME_DOMAIN or FREQUENCY_DOMAIN.
+
+    Returns:
+        PlotData: The plot data.
+    """
+    if domain == FREQUENCY_DOMAIN:
+        return PlotData(frequency_axis(measurement), measurement.fdy[:, index])
+    return PlotData(measurement.tdx, measurement.tdy[:, index])
+
+
+def decimate(
+    x: np.array, y: np.array, n_bins: int, x_range: tuple | None = None
+) -> tuple[np.array, np.array]:
+    """Reduce the number of points of a line with min/max decimation.
+
+    The points are split into n_bins bins and only the minimum and the maximum of every bin are kept, in their original order.
+    This way peaks are never lost, no matter how far the line is reduced.
+
+    Args:
+        x (np.array): The x values in ascending order.
+        y (np.array): The (real) y values.
+        n_bins (int): Number of bins, e.g. the width of the plot in pixels.
+        x_range (tuple, optional): Only decimate the points in this x range (plus one point on every side). Defaults to None, which uses all points.
+
+    Returns:
+        tuple[np.array, np.array]: The decimated x and y values.
+    """
+    if x_range is not None:
+        start = max(np.searchsorted(x, min(x_range), side="left") - 1, 0)
+        stop = np.searchsorted(x, max(x_range), side="right") + 1
+        x = x[start:stop]
+        y = y[start:stop]
+
+    n_points = len(y)
+    if n_points <= 2 * n_bins:
+        return x, y
+
+    bin_size = -(-n_points // n_bins)
+    n_full = n_points // bin_size
+
+    body = y[: n_full * bin_size].reshape(n_full, bin_size)
+    argmin = body.argmin(axis=1)
+    argmax = body.argmax(axis=1)
+    offsets = np.arange(n_full) * bin_size
+
+    indices = np.empty(2 * n_full, dtype=np.intp)
+    indices[0::2] = np.minimum(argmin, argmax) + offsets
+    indices[1::2] = np.maximum(argmin, argmax) + offsets
+
+    # The remaining points do not fill a whole bin
+    tail = y[n_full * bin_size :]
+    if len(tail):
+        tail_indices = np.sort([tail.argmin(), tail.argmax()]) + n_full * bin_size
+        indices = np.concatenate((indices, tail_indices))
+
+    return x[indices], y[indices]
+
+
+class PlotDataCache:
+    """Cache of the plot data per measurement, dataset and domain.
+
+    The cache only holds weak references to the measurements and keeps the most recently used entries.
+    Measurements that are replaced (e.g. by apodization) are new objects and therefore get new entries.
+    Entries of measurements whose data changes in place have to be removed with invalidate.
+
+    Args:
+        max_entries (int, optional): Maximum number of cached entries. Defaults to 64.
+    """
+
+    def __init__(self, max_entries: int = 64) -> None:
+        """Initializes the cache."""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, measurement, index: int, domain: str) -> PlotData:
+        """Get the plot data of one dataset of a measurement.
+
+        Args:
+            measurement (Measurement): The measurement.
+            index (int): The index of the dataset.
+            domain (str): Either TIME_DOMAIN or FREQUENCY_DOMAIN.
+
+        Returns:
+            PlotData: The plot data.
+        """
+        key = (weakref.ref(measurement), index, domain)
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+
+        data = compute_plot_data(measurement, index, domain)
+        self._entries[key] = data
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def invalidate(self, measurement=None) -> None:
+        """Remove cached plot data.
+
+        Args:
+            measurement (Measurement, optional): Only remove the entries of this measurement. Defaults to None, which clears the whole cache.
+        """
+        if measurement is None:
+            self._entries.clear()
+            return
+
+        for key in [key for key in self._entries if key[0]() is measurement]:
+            del self._entries[key]
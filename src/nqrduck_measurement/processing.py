@@ -0,0 +1,305 @@
+"""Vectorized processing of measurement data."""
+
+import logging
+import weakref
+from collections.abc import Callable
+from functools import lru_cache
+
+import numpy as np
+import sympy
+from quackseq.functions import Function
+from quackseq.measurement import Measurement
+
+from .storage import LazySpectrum
+
+logger = logging.getLogger(__name__)
+
+# Number of compiled expressions and evaluated windows that are kept.
+WINDOW_CACHE_SIZE = 32
+
+# Types of the processing steps of derived measurements.
+APODIZATION = "apodization"
+BASELINE = "baseline"
+
+# Fraction of the end of the FID the baseline is estimated from.
+BASELINE_FRACTION = 0.25
+
+
+def evaluate_window(function: Function, n_points: int) -> np.array:
+    """Evaluate an apodization function on the time grid of a measurement.
+
+    The function is sampled with n_points between its start_x and end_x, which maps it onto the whole time axis of the measurement.
+    Windows are cached, so evaluating the same function with the same parameters and grid again returns the cached array.
+    The cache is keyed by the expression and the parameter values, so it works with any Function without subclassing it.
+
+    Args:
+        function (Function): The apodization function.
+        n_points (int): Number of points of the time axis.
+
+    Returns:
+        np.array: The (read-only) window with n_points values.
+    """
+    symbols = tuple(str(parameter.symbol) for parameter in function.parameters)
+    # Parameter values edited in the dialog are strings
+    values = tuple(
+        float(sympy.sympify(parameter.value)) for parameter in function.parameters
+    )
+    return _evaluate_window(
+        function.expr, symbols, values, function.start_x, function.end_x, n_points
+    )
+
+
+@lru_cache(maxsize=WINDOW_CACHE_SIZE)
+def _evaluate_window(
+    expr: sympy.Expr,
+    symbols: tuple,
+    values: tuple,
+    start_x: float,
+    end_x: float,
+    n_points: int,
+) -> np.array:
+    """Evaluate a compiled expression on a grid, see evaluate_window."""
+    logger.debug("Evaluating window %s with %s points.", expr, n_points)
+    t = np.linspace(start_x, end_x, n_points)
+    window = compile_expression(expr, symbols)(t, *values)
+    # If the expression does not depend on x, the compiled function returns a scalar
+    window = np.array(np.broadcast_to(window, t.shape), dtype=float)
+    # The window is shared by all callers, so it must not be changed in place.
+    window.setflags(write=False)
+    return window
+
+
+def preview_window(function: Function, duration: float) -> tuple[np.array, np.array]:
+    """Evaluate an apodization function for the preview of the apodization dialog.
+
+    The function is sampled with as many points as Function.evaluate uses for the duration, but the window comes from the cache of evaluate_window.
+
+    Args:
+        function (Function): The apodization function.
+        duration (float): Length of the time axis in seconds.
+
+    Returns:
+        tuple[np.array, np.array]: The time points in seconds and the window.
+    """
+    n_points = int(duration / function.resolution)
+    return function.get_time_points(duration), evaluate_window(function, n_points)
+
+
+@lru_cache(maxsize=WINDOW_CACHE_SIZE)
+def compile_expression(expr: sympy.Expr, symbols: tuple) -> Callable:
+    """Compile a sympy expression to a vectorized NumPy function.
+
+    Args:
+        expr (sympy.Expr): The expression in x.
+        symbols (tuple): Names of the parameters of the expression.
+
+    Returns:
+        Callable: Function that takes the x values followed by the parameter values.
+    """
+    logger.debug("Compiling %s.", expr)
+    arguments = [sympy.Symbol("x")] + [sympy.Symbol(symbol) for symbol in symbols]
+    return sympy.lambdify(arguments, expr, "numpy")
+
+
+class FIDFunction(Function):
+    """The exponetial FID function."""
+
+    name = "FID"
+
+    def __init__(self) -> None:
+        """Exponential FID function."""
+        expr = sympy.sympify("exp( -x / T2star )")
+        super().__init__(expr)
+        self.start_x = 0
+        self.end_x = 30
+
+        self.add_parameter(Function.Parameter("T2star (microseconds)", "T2star", 10))
+
+
+class DerivedMeasurement(Measurement):
+    """A measurement computed from another measurement by a processing step.
+
+    The time and frequency axes are shared with the source as read-only views and the metadata is taken over from the source, only the transformed data is owned by the derived measurement.
+    The frequency domain data is not computed up front, every dataset is transformed when it is first accessed (see storage.LazySpectrum).
+    The processing steps are recorded, so the measurement can be derived again from its source instead of being stored.
+
+    The source is only referenced weakly, so deleting it frees its data. Once the source is gone, the derived measurement has to be stored with its data.
+
+    Args:
+        source (Measurement): The measurement the data was derived from.
+        tdy (np.array): The transformed time domain data.
+        step (dict): JSON-compatible description of the processing step, see rederive.
+        lineage (list, optional): The processing steps from the original measurement to this one. Defaults to None, which appends the step to the lineage of the source.
+
+    Attributes:
+        step (dict): The processing step.
+    """
+
+    def __init__(
+        self,
+        source: Measurement,
+        tdy: np.array,
+        step: dict,
+        lineage: list | None = None,
+    ) -> None:
+        """Initializes the derived measurement."""
+        # Passing empty data keeps the base class from transforming all datasets.
+        super().__init__(
+            source.name,
+            read_only_view(source.tdx),
+            np.empty((0, 0)),
+            target_frequency=source.target_frequency,
+            frequency_shift=source.frequency_shift,
+            IF_frequency=source.IF_frequency,
+        )
+        self.tdy = tdy
+        self.step = step
+        self._source = weakref.ref(source)
+        if lineage is not None:
+            self._lineage = list(lineage)
+        elif isinstance(source, DerivedMeasurement):
+            self._lineage = source.lineage + [step]
+        else:
+            self._lineage = [step]
+
+        self.fdy = LazySpectrum(self)
+        # The frequency axis only depends on the time axis, so the one of the source is shared.
+        if source.fdx is not None and np.shape(source.fdx) == np.shape(self.fdy.fdx):
+            self.fdx = read_only_view(source.fdx)
+        else:
+            self.fdx = self.fdy.fdx
+
+    @property
+    def source(self) -> Measurement:
+        """The measurement the data was derived from, None if it no longer exists."""
+        return self._source()
+
+    @property
+    def lineage(self) -> list:
+        """The processing steps from the original measurement to this one."""
+        return list(self._lineage)
+
+    def add_dataset(self, tdy: np.array) -> None:
+        """Adds dataset to the measurement.
+
+        Args:
+            tdy (np.array): Time axis for the y axis of the measurement data.
+        """
+        self.tdy = np.concatenate((self.tdy, tdy), axis=1)
+        self.fdy = LazySpectrum(self)
+
+
+def read_only_view(array: np.array) -> np.array:
+    """Read-only view of an array that shares the memory of the array.
+
+    Args:
+        array (np.array): The array.
+
+    Returns:
+        np.array: The view.
+    """
+    view = np.asarray(array).view()
+    view.flags.writeable = False
+    return view
+
+
+def apodize(measurement: Measurement, function: Function) -> DerivedMeasurement:
+    """Apply an apodization function to all datasets of a measurement.
+
+    The window is evaluated once per length of the time axis and broadcast over all datasets.
+
+    Args:
+        measurement (Measurement): The measurement.
+        function (Function): The apodization function.
+
+    Returns:
+        DerivedMeasurement: The apodized measurement.
+    """
+    window = evaluate_window(function, len(measurement.tdx))
+    tdy = np.asarray(measurement.tdy) * window[:, None]
+
+    step = {"type": APODIZATION, "function": function.to_json()}
+    return DerivedMeasurement(measurement, tdy, step)
+
+
+def batch_apodization(measurements: list, function: Function) -> list:
+    """Apply the same apodization function to several measurements.
+
+    Args:
+        measurements (list): The measurements.
+        function (Function): The apodization function.
+
+    Returns:
+        list: The apodized measurements in the same order.
+    """
+    return [apodize(measurement, function) for measurement in measurements]
+
+
+def correct_baseline(
+    measurement: Measurement, fraction: float = BASELINE_FRACTION
+) -> DerivedMeasurement:
+    """Subtract the baseline (DC offset) from all datasets of a measurement.
+
+    The signal has decayed at the end of the FID, so the mean of the end is the offset of the dataset.
+
+    Args:
+        measurement (Measurement): The measurement.
+        fraction (float, optional): Fraction of the end of the FID the baseline is estimated from. Defaults to BASELINE_FRACTION.
+
+    Returns:
+        DerivedMeasurement: The corrected measurement.
+
+    Raises:
+        ValueError: If the fraction is not between 0 and 1.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"Invalid baseline fraction: {fraction}")
+
+    tdy = np.asarray(measurement.tdy)
+    n_points = max(int(len(tdy) * fraction), 1)
+    tdy = tdy - tdy[-n_points:].mean(axis=0)
+
+    step = {"type": BASELINE, "fraction": fraction}
+    return DerivedMeasurement(measurement, tdy, step)
+
+
+def rederive(source: Measurement, step: dict) -> DerivedMeasurement:
+    """Apply a recorded processing step to a measurement again.
+
+    Args:
+        source (Measurement): The measurement to process.
+        step (dict): The processing step of a DerivedMeasurement.
+
+    Returns:
+        DerivedMeasurement: The derived measurement.
+
+    Raises:
+        ValueError: If the type of the step is not known.
+    """
+    if step["type"] == APODIZATION:
+        return apodize(source, Function.from_json(step["function"]))
+    if step["type"] == BASELINE:
+        return correct_baseline(source, step["fraction"])
+
+    raise ValueError(f"Unknown processing step: {step['type']}")
+
+
+def restore_derived(measurement: Measurement, lineage: list) -> DerivedMeasurement:
+    """Turn a measurement that was stored with its data back into a derived measurement.
+
+    The source no longer exists, but the lineage is kept, so the processing can still be captured as pipeline.
+
+    Args:
+        measurement (Measurement): The stored measurement.
+        lineage (list): The processing steps from the original measurement to the stored one.
+
+    Returns:
+        DerivedMeasurement: The derived measurement with the fits of the stored measurement.
+    """
+    derived = DerivedMeasurement(measurement, measurement.tdy, lineage[-1], lineage)
+    derived.name = measurement.name
+    # The fits belong to the same data, so they are moved instead of being restored again.
+    for fit in measurement.fits:
+        fit.measurement = derived
+        derived.add_fit(fit)
+    return derived
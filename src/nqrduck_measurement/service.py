@@ -0,0 +1,472 @@
+"""Headless measurement service.
+
+The service offers the operations of the measurement module (setting the frequency and averages, measuring, loading and saving, apodization and fitting) without the Qt view.
+It talks to a quackseq spectrometer directly instead of going through the nqrduck signals, so it can be used from Python scripts and on acquisition nodes without a display.
+Neither Qt nor matplotlib is imported.
+
+The controller of the measurement module uses a service without a spectrometer for loading, saving and the bookkeeping of warm-started fits, so both share one implementation.
+
+Example:
+    >>> from nqrduck_measurement.service import MeasurementService, SyntheticSpectrometer
+    >>> service = MeasurementService(SyntheticSpectrometer(resonance_frequency=83.56e6))
+    >>> service.set_frequency(83.56)
+    >>> service.set_averages(100)
+    >>> measurement = service.start_measurement()
+    >>> fit = service.fit(measurement, "T2*")
+"""
+
+import logging
+import math
+from collections.abc import Callable
+
+import numpy as np
+from quackseq.functions import Function
+from quackseq.measurement import Fit, Measurement
+from quackseq.spectrometer.spectrometer import Spectrometer
+
+from . import processing, session, storage
+from .fitting import (
+    FitDescriptor,
+    FitGuessCache,
+    fit_all_datasets,
+    fit_class_of,
+    fit_descriptor,
+    fit_values,
+)
+
+logger = logging.getLogger(__name__)
+
+FILE_EXTENSION = "meas"
+SESSION_FILE_EXTENSION = "session"
+
+
+def sweep_frequencies(start: float, stop: float, step: float) -> list:
+    """Frequencies of a sweep from start to stop (both included).
+
+    Args:
+        start (float): First frequency.
+        stop (float): Last frequency.
+        step (float): Distance between two frequencies.
+
+    Returns:
+        list: The frequencies in the same unit as the arguments.
+
+    Raises:
+        ValueError: If the step is not positive.
+    """
+    if step <= 0:
+        raise ValueError("The step of a sweep has to be positive.")
+
+    n_points = math.floor(abs(stop - start) / step + 1e-9) + 1
+    direction = 1 if stop >= start else -1
+    return [float(start + direction * step * i) for i in range(n_points)]
+
+
+class MeasurementService:
+    """Measurement operations without a GUI.
+
+    Measurements are run synchronously: start_measurement returns once the spectrometer has delivered the data.
+    The measured, loaded and derived measurements are collected in the measurements list, or handed to on_measurement if it is given.
+
+    Args:
+        spectrometer (Spectrometer): The quackseq spectrometer that runs the measurements, None if the service is only used for processing.
+        sequence (optional): The pulse sequence passed to the spectrometer. Defaults to None.
+        on_measurement (Callable, optional): Called with every new measurement instead of collecting it. Defaults to None.
+
+    Attributes:
+        spectrometer (Spectrometer): The spectrometer.
+        sequence: The pulse sequence passed to the spectrometer.
+        measurements (list): The measurements of the service.
+        file_format (str): The file format measurements are saved in, see storage.
+        fit_guesses (FitGuessCache): Parameters of previous fits, used to warm-start later fits.
+    """
+
+    def __init__(
+        self,
+        spectrometer: Spectrometer,
+        sequence=None,
+        on_measurement: Callable | None = None,
+    ) -> None:
+        """Initializes the service."""
+        self.spectrometer = spectrometer
+        self.sequence = sequence
+        self.on_measurement = on_measurement
+        self.measurements = []
+        self.file_format = storage.JSON_FORMAT
+        self.fit_guesses = FitGuessCache()
+        self._measurement_frequency = None
+        self._averages = 1
+
+    def add_measurement(self, measurement: Measurement) -> None:
+        """Collect a new measurement, or hand it to on_measurement.
+
+        Args:
+            measurement (Measurement): The measurement.
+        """
+        if self.on_measurement is None:
+            self.measurements.append(measurement)
+        else:
+            self.on_measurement(measurement)
+
+    @property
+    def measurement_frequency(self) -> float:
+        """Measurement frequency in Hz, None if it has not been set."""
+        return self._measurement_frequency
+
+    @property
+    def averages(self) -> int:
+        """Number of averages."""
+        return self._averages
+
+    def set_frequency(self, value: float) -> None:
+        """Set the measurement frequency in MHz.
+
+        Args:
+            value (float): Frequency in MHz.
+
+        Raises:
+            ValueError: If the value is not a positive number.
+        """
+        value = float(value)
+        if not value > 0:
+            raise ValueError(f"Invalid frequency: {value} MHz")
+
+        self._measurement_frequency = value * 1e6
+        self.spectrometer.set_frequency(self._measurement_frequency)
+
+    def set_averages(self, value: int) -> None:
+        """Set the number of averages.
+
+        Args:
+            value (int): Number of averages.
+
+        Raises:
+            ValueError: If the value is not a positive integer.
+        """
+        if int(value) != float(value) or int(value) < 1:
+            raise ValueError(f"Invalid number of averages: {value}")
+
+        self._averages = int(value)
+        self.spectrometer.set_averages(self._averages)
+
+    def start_measurement(self) -> Measurement:
+        """Run a measurement with the current frequency and averages.
+
+        Returns:
+            Measurement: The measurement, which is also added to the measurements.
+
+        Raises:
+            ValueError: If the frequency has not been set.
+        """
+        if self._measurement_frequency is None:
+            raise ValueError("The measurement frequency has not been set.")
+
+        logger.debug("Measuring at %s Hz.", self._measurement_frequency)
+        measurement = self.spectrometer.run_sequence(self.sequence)
+        self.add_measurement(measurement)
+        return measurement
+
+    def start_sweep(self, start: float, stop: float, step: float) -> list:
+        """Run measurements at the frequencies of a sweep.
+
+        Args:
+            start (float): First frequency in MHz.
+            stop (float): Last frequency in MHz.
+            step (float): Distance between two frequencies in MHz.
+
+        Returns:
+            list: The measurements in the order of the frequencies.
+        """
+        measurements = []
+        for frequency in sweep_frequencies(start, stop, step):
+            self.set_frequency(frequency)
+            measurements.append(self.start_measurement())
+        return measurements
+
+    def save_measurement(
+        self, measurement: Measurement, file_name: str, file_format: str | None = None
+    ) -> None:
+        """Save a measurement.
+
+        Args:
+            measurement (Measurement): The measurement.
+            file_name (str): Path to the file.
+            file_format (str, optional): The file format, see storage. Defaults to None, which uses the file format of the service.
+        """
+        storage.save_measurement(
+            measurement, file_name, file_format or self.file_format
+        )
+
+    def load_measurement(self, file_name: str, lazy: bool = False) -> Measurement:
+        """Load a measurement file.
+
+        Args:
+            file_name (str): Path to the file.
+            lazy (bool, optional): Memory-map the data of binary files. Defaults to False.
+
+        Returns:
+            Measurement: The measurement, which is also added to the measurements.
+        """
+        measurement = storage.load_measurement(file_name, lazy=lazy)
+        self.add_measurement(measurement)
+        return measurement
+
+    def load_measurements(
+        self, file_names: list, lazy: bool = False, max_workers: int | None = None
+    ) -> tuple[list, list]:
+        """Load many measurement files in a worker pool, see storage.load_measurements.
+
+        Args:
+            file_names (list): Paths to the files.
+            lazy (bool, optional): Memory-map the data of binary files. Defaults to False.
+            max_workers (int, optional): Number of workers. Defaults to None.
+
+        Returns:
+            tuple[list, list]: The loaded measurements and the names of the files that could not be loaded.
+        """
+        measurements, failed = storage.load_measurements(
+            file_names, lazy=lazy, max_workers=max_workers
+        )
+        for measurement in measurements:
+            self.add_measurement(measurement)
+        return measurements, failed
+
+    def load_directory(self, directory: str, lazy: bool = False) -> tuple[list, list]:
+        """Load all measurement files of a directory.
+
+        Args:
+            directory (str): Path to the directory.
+            lazy (bool, optional): Memory-map the data of binary files. Defaults to False.
+
+        Returns:
+            tuple[list, list]: The loaded measurements and the names of the files that could not be loaded.
+        """
+        file_names = storage.list_measurement_files(directory, FILE_EXTENSION)
+        return self.load_measurements(file_names, lazy=lazy)
+
+    def save_session(
+        self,
+        file_name: str,
+        measurements: list | None = None,
+        displayed_index: int | None = None,
+    ) -> None:
+        """Save measurements to a session file.
+
+        Args:
+            file_name (str): Path to the session file.
+            measurements (list, optional): The measurements. Defaults to None, which saves the measurements of the service.
+            displayed_index (int, optional): Index of the displayed measurement. Defaults to None.
+        """
+        if measurements is None:
+            measurements = self.measurements
+        session.save_session(file_name, measurements, displayed_index)
+
+    def load_session(self, file_name: str) -> tuple[list, int]:
+        """Load the measurements of a session file.
+
+        Args:
+            file_name (str): Path to the session file.
+
+        Returns:
+            tuple[list, int]: The measurements, which are also added to the measurements, and the index of the displayed measurement.
+        """
+        measurements, displayed_index = session.load_session(file_name)
+        for measurement in measurements:
+            self.add_measurement(measurement)
+        return measurements, displayed_index
+
+    def apodize(self, measurement: Measurement, function: Function) -> Measurement:
+        """Apply an apodization function to a measurement.
+
+        Args:
+            measurement (Measurement): The measurement.
+            function (Function): The apodization function, e.g. processing.FIDFunction.
+
+        Returns:
+            Measurement: The apodized measurement, which is also added to the measurements.
+        """
+        apodized = processing.apodize(measurement, function)
+        self.add_measurement(apodized)
+        return apodized
+
+    def fit(
+        self, measurement: Measurement, fit_type: str, warm_start: bool = True
+    ) -> Fit:
+        """Fit the last dataset of a measurement and add the fit to the measurement.
+
+        Args:
+            measurement (Measurement): The measurement.
+            fit_type (str): The name of the fit type, see fitting.fit_descriptors.
+            warm_start (bool, optional): Use the parameters of a previous fit as initial guess. Defaults to True.
+
+        Returns:
+            Fit: The fit.
+        """
+        descriptor = self.fit_descriptor(fit_type)
+        initial_guess = None
+        if warm_start:
+            initial_guess = self.initial_guess(measurement, descriptor.fit_class)
+
+        fit = descriptor.create(measurement, initial_guess)
+        self.add_fit(measurement, fit)
+        return fit
+
+    def fit_all(
+        self,
+        measurement: Measurement,
+        fit_type: str,
+        warm_start: bool = True,
+        max_workers: int | None = None,
+    ) -> dict:
+        """Fit every dataset of a measurement, see fitting.fit_all_datasets.
+
+        Args:
+            measurement (Measurement): The measurement.
+            fit_type (str): The name of the fit type, see fitting.fit_descriptors.
+            warm_start (bool, optional): Use the parameters of a previous fit as initial guess. Defaults to True.
+            max_workers (int, optional): Number of worker processes. Defaults to None.
+
+        Returns:
+            dict: The table of the fits.
+        """
+        descriptor = self.fit_descriptor(fit_type)
+        initial_guess = None
+        if warm_start:
+            initial_guess = self.initial_guess(measurement, descriptor.fit_class, 0)
+
+        table = fit_all_datasets(
+            descriptor.fit_class,
+            measurement,
+            max_workers=max_workers,
+            initial_guess=initial_guess,
+        )
+        self.add_fit_table(measurement, descriptor.fit_class, table)
+        return table
+
+    def initial_guess(
+        self, measurement: Measurement, fit_class: type, dataset: int | None = None
+    ) -> list:
+        """The initial guess of a warm-started fit, see fitting.FitGuessCache.
+
+        Args:
+            measurement (Measurement): The measurement.
+            fit_class (type): The fit class.
+            dataset (int, optional): The index of the fitted dataset. Defaults to None, which is the last dataset that the fit classes fit.
+
+        Returns:
+            list: The initial guess, None if there is no previous fit to start from.
+        """
+        if dataset is None:
+            dataset = measurement.tdy.shape[1] - 1
+        return self.fit_guesses.get(measurement, dataset, fit_class)
+
+    def add_fit(self, measurement: Measurement, fit: Fit) -> None:
+        """Add a fit to its measurement and remember its parameters for later fits.
+
+        Args:
+            measurement (Measurement): The fitted measurement.
+            fit (Fit): The fit of the last dataset.
+        """
+        measurement.add_fit(fit)
+        self.fit_guesses.set(
+            measurement,
+            measurement.tdy.shape[1] - 1,
+            fit_class_of(fit),
+            fit_values(fit)[1],
+        )
+
+    def add_fit_table(
+        self, measurement: Measurement, fit_class: type, table: dict
+    ) -> None:
+        """Remember the parameters of the fits of all datasets for later fits.
+
+        Args:
+            measurement (Measurement): The fitted measurement.
+            fit_class (type): The fit class.
+            table (dict): The table of the fits, see fitting.fit_all_datasets.
+        """
+        self.fit_guesses.set_table(measurement, fit_class, table)
+
+    @staticmethod
+    def fit_descriptor(fit_type: str) -> FitDescriptor:
+        """Look up a fit type by its name, see fitting.fit_descriptor.
+
+        Args:
+            fit_type (str): The name of the fit type, e.g. "T2*".
+
+        Returns:
+            FitDescriptor: The descriptor of the fit type.
+        """
+        return fit_descriptor(fit_type)
+
+
+class SyntheticSpectrometer(Spectrometer):
+    """Stand-in spectrometer that synthesizes free induction decays.
+
+    The FID of a single line decays with T2* and oscillates with the offset between the resonance and the measurement frequency.
+    The noise decreases with the square root of the number of averages. It can be used to test and script the service without hardware.
+
+    Args:
+        resonance_frequency (float, optional): Frequency of the line in Hz. Defaults to 100 MHz.
+        t2_star (float, optional): T2* in microseconds. Defaults to 20.
+        n_points (int, optional): Number of points of the time axis. Defaults to 2048.
+        duration (float, optional): Length of the time axis in microseconds. Defaults to 100.
+        noise (float, optional): Standard deviation of the noise of a single scan. Defaults to 0.1.
+        seed (int, optional): Seed of the noise. Defaults to None.
+
+    Attributes:
+        frequency (float): The frequency set by the service in Hz.
+        averages (int): The number of averages set by the service.
+        runs (int): Number of measurements run so far.
+    """
+
+    def __init__(
+        self,
+        resonance_frequency: float = 100e6,
+        t2_star: float = 20,
+        n_points: int = 2048,
+        duration: float = 100,
+        noise: float = 0.1,
+        seed: int | None = None,
+    ) -> None:
+        """Initializes the spectrometer."""
+        self.resonance_frequency = resonance_frequency
+        self.t2_star = t2_star
+        self.tdx = np.linspace(0, duration, n_points)
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.frequency = resonance_frequency
+        self.averages = 1
+        self.runs = 0
+
+    def set_frequency(self, value: float) -> None:
+        """Sets the frequency in Hz."""
+        self.frequency = float(value)
+
+    def set_averages(self, value: int) -> None:
+        """Sets the number of averages."""
+        self.averages = int(value)
+
+    def run_sequence(self, sequence=None) -> Measurement:
+        """Synthesizes the averaged FID. The sequence is ignored.
+
+        Returns:
+            Measurement: The measurement.
+        """
+        self.runs += 1
+        # The time axis is in microseconds, so the offset is in MHz
+        offset = (self.resonance_frequency - self.frequency) * 1e-6
+        tdy = np.exp(-self.tdx / self.t2_star + 2j * np.pi * offset * self.tdx)
+
+        sigma = self.noise / np.sqrt(self.averages)
+        tdy = tdy + sigma * (
+            self.rng.standard_normal(len(self.tdx))
+            + 1j * self.rng.standard_normal(len(self.tdx))
+        )
+
+        return Measurement(
+            f"Synthetic {self.frequency * 1e-6:.4f} MHz",
+            self.tdx,
+            tdy,
+            target_frequency=self.frequency,
+        )
@@ -0,0 +1,171 @@
+"""Sessions store all measurements of the measurement module in one file.
+
+A session file is a zip archive with a ``session.json`` header and one compressed binary measurement (see storage) per measurement.
+The measurements are compressed and decompressed in a thread pool, the archive itself only stores the already compressed members.
+
+Derived measurements (see processing.DerivedMeasurement) whose source is stored before them can be stored as their processing step only. They are derived again from their source when the session is loaded.
+Derived measurements that are stored with their data keep their lineage, so their processing can still be captured as pipeline.
+"""
+
+import io
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from quackseq.measurement import Measurement
+
+from . import processing, storage
+from .fitting import fit_from_json, fit_to_json
+from .processing import DerivedMeasurement
+
+logger = logging.getLogger(__name__)
+
+# Version of the session header - increase this if the layout of the archive changes.
+SESSION_VERSION = 1
+SESSION_HEADER = "session.json"
+
+
+def measurement_to_bytes(measurement: Measurement) -> bytes:
+    """Serialize a measurement to a compressed binary measurement file.
+
+    Args:
+        measurement (Measurement): The measurement.
+
+    Returns:
+        bytes: The content of the file.
+    """
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **storage.measurement_to_arrays(measurement))
+    return buffer.getvalue()
+
+
+def measurement_from_bytes(data: bytes) -> Measurement:
+    """Deserialize a measurement from the content of a binary measurement file.
+
+    Args:
+        data (bytes): The content of the file.
+
+    Returns:
+        Measurement: The measurement.
+    """
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        return storage.measurement_from_arrays(arrays)
+
+
+def save_session(
+    file_name: str,
+    measurements: list,
+    displayed_index: int | None = None,
+    max_workers: int | None = None,
+    rederive: bool = True,
+) -> None:
+    """Save measurements to a session file.
+
+    The file is replaced only once the session has been written completely. If writing fails, the partially written file is removed.
+
+    Args:
+        file_name (str): Path to the session file.
+        measurements (list): The measurements.
+        displayed_index (int, optional): Index of the displayed measurement. Defaults to None.
+        max_workers (int, optional): Number of threads used for compression. Defaults to None, which lets the thread pool decide.
+        rederive (bool, optional): Store derived measurements as their processing step instead of their data. Defaults to True.
+
+    Raises:
+        OSError: If the file can not be written.
+    """
+    logger.debug("Saving %s measurements to %s.", len(measurements), file_name)
+    indices = {id(measurement): index for index, measurement in enumerate(measurements)}
+
+    entries = []
+    stored = []
+    for index, measurement in enumerate(measurements):
+        source_index = None
+        if rederive and isinstance(measurement, DerivedMeasurement):
+            source_index = indices.get(id(measurement.source))
+
+        if source_index is not None and source_index < index:
+            entries.append(
+                {
+                    "name": measurement.name,
+                    "source": source_index,
+                    "step": measurement.step,
+                    "fits": [fit_to_json(fit) for fit in measurement.fits],
+                }
+            )
+        else:
+            entry = {"file": f"measurements/{index:05d}.npz", "name": measurement.name}
+            if isinstance(measurement, DerivedMeasurement):
+                entry["lineage"] = measurement.lineage
+            entries.append(entry)
+            stored.append(measurement)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        members = list(executor.map(measurement_to_bytes, stored))
+
+    header = {
+        "version": SESSION_VERSION,
+        "displayed_index": displayed_index,
+        "measurements": entries,
+    }
+
+    temporary_file_name = f"{file_name}.part"
+    try:
+        # The members are compressed already, so they are stored as they are.
+        with zipfile.ZipFile(temporary_file_name, "w", zipfile.ZIP_STORED) as archive:
+            archive.writestr(SESSION_HEADER, json.dumps(header))
+            stored_entries = [entry for entry in entries if "file" in entry]
+            for entry, data in zip(stored_entries, members):
+                archive.writestr(entry["file"], data)
+
+        os.replace(temporary_file_name, file_name)
+    finally:
+        # Only left over if writing or replacing failed
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
+
+
+def load_session(file_name: str, max_workers: int | None = None) -> tuple[list, int]:
+    """Load the measurements of a session file.
+
+    Args:
+        file_name (str): Path to the session file.
+        max_workers (int, optional): Number of threads used for decompression. Defaults to None, which lets the thread pool decide.
+
+    Returns:
+        tuple[list, int]: The measurements and the index of the displayed measurement (None if no measurement was displayed).
+
+    Raises:
+        ValueError: If the file was written by a newer version of the session format.
+    """
+    logger.debug("Loading session from %s.", file_name)
+    with zipfile.ZipFile(file_name) as archive:
+        header = json.loads(archive.read(SESSION_HEADER))
+        if header["version"] > SESSION_VERSION:
+            raise ValueError(f"Unsupported session version: {header['version']}")
+
+        entries = header["measurements"]
+        members = [archive.read(entry["file"]) for entry in entries if "file" in entry]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        stored = iter(list(executor.map(measurement_from_bytes, members)))
+
+    # Sources are always stored before the measurements derived from them.
+    measurements = []
+    for entry in entries:
+        if "file" in entry:
+            measurement = next(stored)
+            if "lineage" in entry:
+                measurement = processing.restore_derived(measurement, entry["lineage"])
+            measurements.append(measurement)
+            continue
+
+        measurement = processing.rederive(measurements[entry["source"]], entry["step"])
+        measurement.name = entry["name"]
+        for fit_json in entry["fits"]:
+            measurement.add_fit(fit_from_json(fit_json, measurement))
+        measurements.append(measurement)
+
+    return measurements, header["displayed_index"]
@@ -1,31 +1,51 @@
 """Signal processing options."""
 
 import logging
-import sympy
-from quackseq.measurement import Measurement, Fit, T2StarFit, LorentzianFit
+from PyQt6.QtCore import pyqtSlot
+from PyQt6.QtWidgets import QLabel, QPushButton
+from quackseq.measurement import Measurement, Fit
 from quackseq.functions import Function, GaussianFunction, CustomFunction
+from nqrduck.contrib.mplwidget import MplWidget
 from nqrduck.helpers.formbuilder import (
     DuckFormBuilder,
+    DuckFormField,
     DuckFormFunctionSelectionField,
     DuckFormDropdownField,
+    DuckFormCheckboxField,
 )
 
+from .fitting import FitDescriptor, FitPreviewCache, fit_descriptors
+from .jobs import FitJob, start_in_thread
+
+from .processing import FIDFunction, preview_window
+
 logger = logging.getLogger(__name__)
 
 
-class FIDFunction(Function):
-    """The exponetial FID function."""
+class WindowSelectionField(DuckFormFunctionSelectionField):
+    """Function selection field whose preview reuses the cached windows of the apodization, see processing.evaluate_window.
+
+    Replotting a function with unchanged parameters does not evaluate it again.
+    """
+
+    def time_domain_plot(self, function: Function, pulse_length: float) -> MplWidget:
+        """Plots the window of the function for the given duration.
 
-    name = "FID"
+        Args:
+            function (Function): The function to plot.
+            pulse_length (float): The duration in seconds.
 
-    def __init__(self) -> None:
-        """Exponential FID function."""
-        expr = sympy.sympify("exp( -x / T2star )")
-        super().__init__(expr)
-        self.start_x = 0
-        self.end_x = 30
+        Returns:
+            MplWidget: The matplotlib widget containing the plot.
+        """
+        mpl_widget = MplWidget()
+        td, window = preview_window(function, pulse_length)
+        mpl_widget.canvas.ax.plot(td, abs(window))
+        mpl_widget.canvas.ax.set_xlabel("Time in s")
+        mpl_widget.canvas.ax.set_ylabel("Magnitude")
+        mpl_widget.canvas.ax.grid(True)
+        return mpl_widget
 
-        self.add_parameter(Function.Parameter("T2star (microseconds)", "T2star", 10))
 
 class Apodization(DuckFormBuilder):
     """Apodization parameter.
@@ -47,7 +67,7 @@ class Apodization(DuckFormBuilder):
 
         self.duration = (self.measurement.tdx[-1] - self.measurement.tdx[0]) * 1e-6
 
-        function_selection_field = DuckFormFunctionSelectionField(
+        function_selection_field = WindowSelectionField(
             text=None,
             tooltip=None,
             functions=functions,
@@ -60,6 +80,14 @@ class Apodization(DuckFormBuilder):
 
         self.add_field(function_selection_field)
 
+        apply_to_selected_field = DuckFormCheckboxField(
+            text="Apply to selected measurements",
+            tooltip="Apply the apodization to the measurements selected in the measurements list (Ctrl or Shift click) instead of only the displayed one.",
+            default=False,
+        )
+
+        self.add_field(apply_to_selected_field)
+
     def get_function(self) -> Function:
         """Get the selected function.
 
@@ -68,23 +96,147 @@ class Apodization(DuckFormBuilder):
         """
         return self.get_values()[0]
 
+    def get_apply_to_selected(self) -> bool:
+        """Get whether the apodization should be applied to the selected measurements.
+
+        Returns:
+            bool: True if the selected measurements should be apodized.
+        """
+        return self.get_values()[1]
+
+
+class FitPreviewField(DuckFormField):
+    """Shows the fitted parameters of the selected fit type.
+
+    Memoized previews are shown right away, otherwise the measurement is only fitted when the preview button is clicked.
+    The preview fit runs in a FitJob, so the dialog stays responsive.
+
+    Args:
+        measurement (Measurement): The measurement to fit.
+        selection_field (DuckFormDropdownField): The field with the fit descriptors.
+        previews (FitPreviewCache): The memoized previews.
+    """
+
+    def __init__(
+        self,
+        measurement: Measurement,
+        selection_field: DuckFormDropdownField,
+        previews: FitPreviewCache,
+    ) -> None:
+        """Initializes the preview field."""
+        super().__init__(None, None)
+        self.measurement = measurement
+        self.selection_field = selection_field
+        self.previews = previews
+        self.preview_job = None
+
+        self.preview_label = QLabel()
+        self.layout.addWidget(self.preview_label)
+        self.layout.addStretch(1)
+
+        self.preview_button = QPushButton("Preview")
+        self.preview_button.clicked.connect(self.on_preview_button_clicked)
+        self.layout.addWidget(self.preview_button)
+
+        self.selection_field.widget.currentIndexChanged.connect(self.update_preview)
+        self.update_preview()
+
+    @property
+    def descriptor(self) -> FitDescriptor:
+        """The selected fit descriptor."""
+        return self.selection_field.return_value()[1]
+
+    def update_preview(self) -> None:
+        """Show the memoized preview of the selected fit type."""
+        result = self.previews.get(self.measurement, self.descriptor.fit_class)
+        self.preview_button.setEnabled(result is None and self.preview_job is None)
+        self.preview_label.setToolTip(self.descriptor.description)
+        if result is None:
+            self.preview_label.setText("No preview")
+            return
+
+        names, values, _ = result
+        self.preview_label.setText(
+            ", ".join(f"{name} = {value:.4g}" for name, value in zip(names, values))
+        )
+
+    @pyqtSlot()
+    def on_preview_button_clicked(self) -> None:
+        """Fit the measurement with the selected fit type in the background."""
+        logger.debug("Computing %s preview.", self.descriptor.name)
+        job = FitJob(self.descriptor.fit_class, self.measurement)
+        job.result_ready.connect(self.on_preview_result)
+        job.error.connect(self.on_preview_error)
+        job.done.connect(self.on_preview_done)
+
+        self.preview_job = job
+        self.preview_button.setEnabled(False)
+        self.preview_label.setText("Fitting...")
+        start_in_thread(job)
+
+    @pyqtSlot(object, object)
+    def on_preview_result(self, measurement: Measurement, fit: Fit) -> None:
+        """Memoize the preview fit.
+
+        Args:
+            measurement (Measurement): The fitted measurement.
+            fit (Fit): The fit.
+        """
+        self.previews.set(measurement, fit)
+
+    @pyqtSlot(str)
+    def on_preview_error(self, message: str) -> None:
+        """Show that the preview fit failed.
+
+        Args:
+            message (str): The error message.
+        """
+        logger.debug("Preview fit failed: %s", message)
+        self.preview_job = None
+        self.preview_label.setText("Fit failed")
+        self.preview_button.setEnabled(True)
+
+    @pyqtSlot()
+    def on_preview_done(self) -> None:
+        """Show the preview of the selected fit type once the preview fit is over."""
+        if self.preview_job is None:
+            return
+
+        self.preview_job = None
+        self.update_preview()
+
+    def return_value(self):
+        """Returns the preview of the selected fit type, None if there is none."""
+        return self.previews.get(self.measurement, self.descriptor.fit_class)
+
 
 class Fitting(DuckFormBuilder):
     """Fitting parameter.
 
     This parameter is used to apply fitting functions to the signal.
     The fitting functions are used to reduce the noise in the signal.
+    The dropdown only holds fit descriptors, the fit itself is only performed after the dialog has been accepted or a preview has been requested.
+
+    Args:
+        measurement (Measurement): The measurement to fit.
+        previews (FitPreviewCache, optional): Memoized previews of fits. Defaults to None, which uses a new cache.
+        parent (QWidget, optional): The parent widget. Defaults to None.
     """
 
-    def __init__(self, measurement: Measurement, parent=None) -> None:
+    def __init__(
+        self,
+        measurement: Measurement,
+        previews: FitPreviewCache = None,
+        parent=None,
+    ) -> None:
         """Fitting parameter."""
         super().__init__("Fitting", parent=parent)
 
         self.measurement = measurement
+        if previews is None:
+            previews = FitPreviewCache()
 
-        fits = {}
-        fits["T2*"] = T2StarFit(self.measurement)
-        fits["Lorentzian"] = LorentzianFit(self.measurement)
+        fits = {descriptor.name: descriptor for descriptor in fit_descriptors()}
 
         selection_field = DuckFormDropdownField(
             text=None,
@@ -95,10 +247,54 @@ class Fitting(DuckFormBuilder):
 
         self.add_field(selection_field)
 
-    def get_fit(self) -> Fit:
+        fit_all_field = DuckFormCheckboxField(
+            text="Fit every dataset",
+            tooltip="Fit all datasets of the measurement and show a table of the fit parameters.",
+            default=False,
+        )
+
+        self.add_field(fit_all_field)
+
+        warm_start_field = DuckFormCheckboxField(
+            text="Warm start",
+            tooltip="Use the parameters of the previous fit as initial guess.",
+            default=True,
+        )
+
+        self.add_field(warm_start_field)
+
+        preview_field = FitPreviewField(measurement, selection_field, previews)
+
+        self.add_field(preview_field)
+
+    def get_fit(self) -> list:
         """Get the selected fit.
 
         Returns:
-            Fit: The selected fit.
+            list: The name and the descriptor of the selected fit.
         """
         return self.get_values()[0]
+
+    def get_fit_all(self) -> bool:
+        """Get whether every dataset should be fitted.
+
+        Returns:
+            bool: True if all datasets should be fitted.
+        """
+        return self.get_values()[1]
+
+    def get_warm_start(self) -> bool:
+        """Get whether the fit should be warm-started.
+
+        Returns:
+            bool: True if the parameters of the previous fit should be used as initial guess.
+        """
+        return self.get_values()[2]
+
+    def get_preview(self) -> tuple:
+        """Get the preview of the selected fit.
+
+        Returns:
+            tuple: The names, values and covariance of the fitted parameters, None if there is no preview.
+        """
+        return self.get_values()[3]
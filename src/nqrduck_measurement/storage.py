@@ -0,0 +1,506 @@
+"""File formats for saving and loading measurements.
+
+Two formats are supported:
+
+- The JSON format stores the complete measurement as text. This is the original format of the module.
+- The binary format is a NumPy ``.npz`` container. The raw ``tdx`` and complex ``tdy`` arrays are stored as they are, next to a small JSON header with the metadata (name, frequencies, fits with their parameters, see fitting.fit_to_json). Stored fits are restored without fitting the data again.
+
+Both formats use the same file extension. The format of a file is detected when it is loaded.
+
+Binary files can also be loaded lazily. The time domain data is then memory-mapped and only the datasets that are actually accessed are read from disk.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import zipfile
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+from quackseq.measurement import Measurement
+from quackseq.signalprocessing import SignalProcessing as sp
+
+from .fitting import fit_from_json, fit_to_json
+
+logger = logging.getLogger(__name__)
+
+JSON_FORMAT = "json"
+BINARY_FORMAT = "binary"
+FILE_FORMATS = [JSON_FORMAT, BINARY_FORMAT]
+
+# Version of the binary header - increase this if the layout of the container changes.
+BINARY_VERSION = 1
+# .npz files are zip archives, so they start with the zip local file header signature.
+BINARY_MAGIC = b"PK\x03\x04"
+# Size of the fixed part of a zip local file header.
+_ZIP_LOCAL_HEADER_SIZE = 30
+
+
+def detect_format(file_name: str) -> str:
+    """Detect the format of a measurement file.
+
+    Args:
+        file_name (str): Path to the file.
+
+    Returns:
+        str: Either JSON_FORMAT or BINARY_FORMAT.
+    """
+    with open(file_name, "rb") as f:
+        magic = f.read(len(BINARY_MAGIC))
+
+    if magic == BINARY_MAGIC:
+        return BINARY_FORMAT
+    return JSON_FORMAT
+
+
+def save_measurement(
+    measurement: Measurement, file_name: str, file_format: str = JSON_FORMAT
+) -> None:
+    """Save a measurement to a file.
+
+    Args:
+        measurement (Measurement): The measurement to save.
+        file_name (str): Path to the file.
+        file_format (str, optional): Either JSON_FORMAT or BINARY_FORMAT. Defaults to JSON_FORMAT.
+
+    Raises:
+        ValueError: If the file format is not known.
+    """
+    logger.debug("Saving measurement to %s in %s format.", file_name, file_format)
+    # Overwriting the file a lazy measurement is mapped from would pull the data away underneath it.
+    if isinstance(measurement, LazyMeasurement) and measurement.is_backed_by(file_name):
+        measurement.load_into_memory()
+
+    if file_format == JSON_FORMAT:
+        with open(file_name, "w") as f:
+            json.dump(measurement.to_json(), f)
+    elif file_format == BINARY_FORMAT:
+        # A file object is passed so numpy does not append the .npz extension.
+        with open(file_name, "wb") as f:
+            np.savez(f, **measurement_to_arrays(measurement))
+    else:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+
+def load_measurement(file_name: str, lazy: bool = False) -> Measurement:
+    """Load a measurement from a file.
+
+    The format of the file is detected automatically.
+
+    Args:
+        file_name (str): Path to the file.
+        lazy (bool, optional): Memory-map the time domain data of binary files instead of reading it. Defaults to False.
+
+    Returns:
+        Measurement: The loaded measurement.
+    """
+    file_format = detect_format(file_name)
+    logger.debug("Loading measurement from %s in %s format.", file_name, file_format)
+
+    if file_format == BINARY_FORMAT:
+        if lazy:
+            return load_lazy_measurement(file_name)
+
+        with np.load(file_name, allow_pickle=False) as arrays:
+            return measurement_from_arrays(arrays)
+
+    if lazy:
+        logger.debug("Lazy loading is only supported for binary files.")
+
+    with open(file_name) as f:
+        return Measurement.from_json(json.load(f))
+
+
+def load_measurements(
+    file_names: list,
+    lazy: bool = False,
+    max_workers: int | None = None,
+    progress: Callable | None = None,
+    is_cancelled: Callable | None = None,
+) -> tuple[list, list]:
+    """Load many measurement files in a worker pool.
+
+    The files are parsed in a process pool. Lazy loading memory-maps the files, which only works in the loading process, so a thread pool is used instead.
+
+    Args:
+        file_names (list): Paths to the files.
+        lazy (bool, optional): Memory-map the time domain data of binary files instead of reading it. Defaults to False.
+        max_workers (int, optional): Number of workers. Defaults to None, which uses the number of cores.
+        progress (Callable, optional): Called with the number of loaded and the total number of files. Defaults to None.
+        is_cancelled (Callable, optional): Returns True if the remaining files should be skipped. Defaults to None.
+
+    Returns:
+        tuple[list, list]: The loaded measurements in the order of the file names and the names of the files that could not be loaded.
+    """
+    if not file_names:
+        return [], []
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(file_names))
+
+    if lazy:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        # Forking the multithreaded GUI process (Qt, BLAS) can deadlock the workers, so they are spawned.
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    results = [None] * len(file_names)
+    logger.debug("Loading %s files with %s workers.", len(file_names), max_workers)
+    with executor:
+        futures = {
+            executor.submit(_try_load_measurement, file_name, lazy): index
+            for index, file_name in enumerate(file_names)
+        }
+        for finished, future in enumerate(as_completed(futures), start=1):
+            if is_cancelled is not None and is_cancelled():
+                executor.shutdown(wait=False, cancel_futures=True)
+                return [], []
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(finished, len(file_names))
+
+    measurements = [result for result in results if result is not None]
+    failed = [
+        file_name for file_name, result in zip(file_names, results) if result is None
+    ]
+    return measurements, failed
+
+
+def _try_load_measurement(file_name: str, lazy: bool) -> Measurement:
+    """Load a measurement, returning None if the file is not a valid measurement file."""
+    try:
+        return load_measurement(file_name, lazy=lazy)
+    except (
+        OSError,
+        json.JSONDecodeError,
+        KeyError,
+        ValueError,
+        zipfile.BadZipFile,
+    ) as e:
+        logger.debug("Could not load %s: %s", file_name, e)
+        return None
+
+
+def list_measurement_files(directory: str, extension: str) -> list:
+    """List the measurement files in a directory.
+
+    Args:
+        directory (str): Path to the directory.
+        extension (str): File extension of the measurement files, without the dot.
+
+    Returns:
+        list: Sorted paths of the files with the extension.
+    """
+    return sorted(
+        entry.path
+        for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.endswith(f".{extension}")
+    )
+
+
+def load_lazy_measurement(file_name: str) -> "LazyMeasurement":
+    """Load a binary measurement file with memory-mapped time domain data.
+
+    Args:
+        file_name (str): Path to the binary file.
+
+    Returns:
+        LazyMeasurement: The measurement.
+    """
+    with np.load(file_name, allow_pickle=False) as arrays:
+        header = read_header(arrays)
+        tdx = arrays["tdx"]
+
+    tdy = memmap_member(file_name, "tdy")
+
+    measurement = LazyMeasurement(
+        header["name"],
+        tdx,
+        tdy,
+        target_frequency=header["target_frequency"],
+        frequency_shift=header["frequency_shift"],
+        IF_frequency=header["IF_frequency"],
+        file_name=file_name,
+    )
+
+    for fit_json in header["fits"]:
+        measurement.add_fit(fit_from_json(fit_json, measurement))
+
+    return measurement
+
+
+def memmap_member(file_name: str, name: str) -> np.ndarray:
+    """Memory-map an array stored in a binary measurement file.
+
+    This only works for uncompressed members, which is what save_measurement writes. Compressed members are read into memory instead.
+
+    Args:
+        file_name (str): Path to the binary file.
+        name (str): Name of the array, e.g. 'tdy'.
+
+    Returns:
+        np.ndarray: The (read-only) memory-mapped array.
+    """
+    with zipfile.ZipFile(file_name) as archive:
+        info = archive.getinfo(f"{name}.npy")
+
+    if info.compress_type != zipfile.ZIP_STORED:
+        logger.debug("Member %s is compressed, it can not be memory-mapped.", name)
+        with np.load(file_name, allow_pickle=False) as arrays:
+            return arrays[name]
+
+    with open(file_name, "rb") as f:
+        # The local header has a variable length name and extra field in front of the data.
+        f.seek(info.header_offset)
+        local_header = f.read(_ZIP_LOCAL_HEADER_SIZE)
+        name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+        f.seek(info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_length + extra_length)
+
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    return np.memmap(
+        file_name,
+        dtype=dtype,
+        mode="r",
+        offset=offset,
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+
+def measurement_to_arrays(measurement: Measurement) -> dict:
+    """Convert a measurement to the arrays of the binary format.
+
+    Args:
+        measurement (Measurement): The measurement to convert.
+
+    Returns:
+        dict: The arrays 'header', 'tdx' and 'tdy'.
+    """
+    header = {
+        "version": BINARY_VERSION,
+        "name": measurement.name,
+        "target_frequency": measurement.target_frequency,
+        "IF_frequency": measurement.IF_frequency,
+        "frequency_shift": measurement.frequency_shift,
+        "fits": [fit_to_json(fit) for fit in measurement.fits],
+    }
+
+    return {
+        "header": np.frombuffer(json.dumps(header).encode(), dtype=np.uint8),
+        "tdx": np.asarray(measurement.tdx),
+        # Column-major order keeps every dataset contiguous on disk, so a single dataset can be read on its own.
+        "tdy": np.asfortranarray(measurement.tdy),
+    }
+
+
+def read_header(arrays) -> dict:
+    """Read the JSON header of the binary format.
+
+    Args:
+        arrays (NpzFile): The opened binary file.
+
+    Returns:
+        dict: The metadata of the measurement.
+
+    Raises:
+        KeyError: If the file has no header.
+        ValueError: If the file was written by a newer version of the format.
+    """
+    header = json.loads(arrays["header"].tobytes().decode())
+    if header["version"] > BINARY_VERSION:
+        raise ValueError(f"Unsupported binary format version: {header['version']}")
+    return header
+
+
+def measurement_from_arrays(arrays) -> Measurement:
+    """Create a measurement from the arrays of the binary format.
+
+    Args:
+        arrays (NpzFile): The opened binary file.
+
+    Returns:
+        Measurement: The measurement.
+    """
+    header = read_header(arrays)
+
+    measurement = Measurement(
+        header["name"],
+        arrays["tdx"],
+        arrays["tdy"],
+        target_frequency=header["target_frequency"],
+        frequency_shift=header["frequency_shift"],
+        IF_frequency=header["IF_frequency"],
+    )
+
+    for fit_json in header["fits"]:
+        measurement.add_fit(fit_from_json(fit_json, measurement))
+
+    return measurement
+
+
+class LazyMeasurement(Measurement):
+    """A measurement whose time domain data is memory-mapped from a binary file.
+
+    The frequency domain data is not computed up front. Instead every dataset is transformed when it is first accessed.
+
+    Args:
+        name (str): Name of the measurement.
+        tdx (np.array): Time axis of the measurement data.
+        tdy (np.array): Memory-mapped time domain data.
+        target_frequency (float): Target frequency of the measurement.
+        frequency_shift (float, optional): Frequency shift of the measurement. Defaults to 0.
+        IF_frequency (float, optional): Intermediate frequency of the measurement. Defaults to 0.
+        file_name (str, optional): Path to the file the data is mapped from. Defaults to None.
+
+    Attributes:
+        file_name (str): Path to the file the data is mapped from.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        tdx: np.array,
+        tdy: np.array,
+        target_frequency: float,
+        frequency_shift: float = 0,
+        IF_frequency: float = 0,
+        file_name: str | None = None,
+    ) -> None:
+        """Initializes the lazy measurement."""
+        # Passing empty data keeps the base class from transforming all datasets.
+        super().__init__(
+            name,
+            tdx,
+            np.empty((0, 0)),
+            target_frequency,
+            frequency_shift=frequency_shift,
+            IF_frequency=IF_frequency,
+        )
+        self.file_name = file_name
+        self.tdy = tdy
+        self.fdy = LazySpectrum(self)
+        self.fdx = self.fdy.fdx
+
+    def add_dataset(self, tdy: np.array) -> None:
+        """Adds dataset to the measurement.
+
+        Args:
+            tdy (np.array): Time axis for the y axis of the measurement data.
+        """
+        self.tdy = np.concatenate((self.tdy, tdy), axis=1)
+        self.fdy = LazySpectrum(self)
+
+    def is_backed_by(self, file_name: str) -> bool:
+        """Check if the data of the measurement is mapped from the given file.
+
+        Args:
+            file_name (str): Path to a file.
+
+        Returns:
+            bool: True if the measurement data is mapped from the file.
+        """
+        if self.file_name is None or not os.path.exists(file_name):
+            return False
+        return os.path.samefile(self.file_name, file_name)
+
+    def load_into_memory(self) -> None:
+        """Read the complete time domain data into memory and detach it from the file."""
+        logger.debug("Loading data of %s into memory.", self.name)
+        self.tdy = np.array(self.tdy)
+        self.file_name = None
+
+
+class LazySpectrum:
+    """Frequency domain data of a lazy or derived measurement.
+
+    Indexing a single dataset (e.g. ``fdy[:, index]``) only transforms that dataset. Any other access transforms all datasets.
+
+    Args:
+        measurement (Measurement): The measurement the spectrum belongs to.
+
+    Attributes:
+        fdx (np.array): Frequency axis of the measurement.
+        shape (tuple): Shape of the frequency domain data.
+    """
+
+    # Number of transformed datasets that are kept.
+    CACHE_SIZE = 16
+
+    def __init__(self, measurement: Measurement) -> None:
+        """Initializes the lazy spectrum."""
+        self.measurement = measurement
+        self._columns = {}
+        self.fdx = None
+        # The frequency axis does not depend on the dataset, so the first one is used to get it.
+        first = self.column(0)
+        self.shape = (len(first), measurement.tdy.shape[1])
+        self.dtype = first.dtype
+        self.ndim = 2
+
+    def column(self, index: int) -> np.array:
+        """Frequency domain data of a single dataset.
+
+        Args:
+            index (int): Index of the dataset.
+
+        Returns:
+            np.array: The transformed dataset.
+        """
+        index = range(self.measurement.tdy.shape[1])[index]
+        # The cache may be cleared by the store while a fit job reads the spectrum
+        column = self._columns.get(index)
+        if column is None:
+            if len(self._columns) >= self.CACHE_SIZE:
+                self._columns.pop(next(iter(self._columns)), None)
+
+            tdy = np.asarray(self.measurement.tdy[:, index : index + 1])
+            fdx, fdy = sp.fft(
+                self.measurement.tdx, tdy, self.measurement.frequency_shift
+            )
+            self.fdx = fdx
+            column = fdy[:, 0]
+            self._columns[index] = column
+
+        return column
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes of the transformed datasets that are kept."""
+        return sum(column.nbytes for column in list(self._columns.values()))
+
+    def clear(self) -> None:
+        """Drop the transformed datasets, they are transformed again when they are accessed."""
+        self._columns.clear()
+
+    def __getitem__(self, key):
+        """Index the frequency domain data, transforming as few datasets as possible."""
+        if (
+            isinstance(key, tuple)
+            and len(key) == 2
+            and isinstance(key[1], (int, np.integer))
+        ):
+            return self.column(key[1])[key[0]]
+
+        return np.asarray(self)[key]
+
+    def __array__(self, dtype=None, copy=None):
+        """Transform all datasets."""
+        array = np.stack([self.column(i) for i in range(self.shape[1])], axis=1)
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+    def __len__(self) -> int:
+        """Number of frequency points."""
+        return self.shape[0]
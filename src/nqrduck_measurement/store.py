@@ -0,0 +1,282 @@
+"""Bounded in-memory store for the data of the measurements."""
+
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+from quackseq.measurement import Measurement
+
+from .storage import LazySpectrum, memmap_member
+
+logger = logging.getLogger(__name__)
+
+
+def resident_bytes(array) -> int:
+    """Number of bytes an array occupies in memory.
+
+    Memory-mapped arrays are backed by a file, so they do not count. Of a lazy spectrum, the transformed datasets it keeps count.
+
+    Args:
+        array: The array.
+
+    Returns:
+        int: The number of bytes.
+    """
+    if isinstance(array, LazySpectrum):
+        return array.nbytes
+    if not isinstance(array, np.ndarray) or isinstance(array, np.memmap):
+        return 0
+    return array.nbytes
+
+
+def write_cache_file(file_name: str, tdy: np.array, fdy: np.array = None) -> None:
+    """Write the data of a measurement to a cache file.
+
+    This runs in a worker thread if the store has a spill handler.
+
+    Args:
+        file_name (str): Path to the cache file.
+        tdy (np.array): The time domain data.
+        fdy (np.array, optional): The frequency domain data. Defaults to None, which does not store it.
+    """
+    arrays = {"tdy": np.asfortranarray(tdy)}
+    if fdy is not None:
+        arrays["fdy"] = np.asfortranarray(fdy)
+
+    # A file object is passed so numpy does not append the .npz extension.
+    with open(file_name, "wb") as f:
+        np.savez(f, **arrays)
+
+
+class MeasurementStore:
+    """Keeps the data of the most recently displayed measurements in memory.
+
+    If the data of all measurements exceeds the memory budget, the time and frequency domain data of the least recently displayed measurements is spilled to a cache file and replaced by memory-mapped arrays.
+    The transformed datasets of lazy spectra (see storage.LazySpectrum) are dropped instead, they are transformed again when they are accessed.
+    The metadata and fits of the measurements stay in memory. Spilled data is read back into memory when the measurement is displayed again.
+
+    Spilling writes the data to disk. With a spill handler, the cache files are written outside of the store (e.g. in a worker thread) and handed back with finish_spill.
+
+    Args:
+        memory_budget (int, optional): Memory budget in bytes. Defaults to None, which never spills data.
+
+    Attributes:
+        memory_budget (int): Memory budget in bytes, None if there is no limit.
+        spill_handler (Callable): Called with a list of (measurement, file name, tdy, fdy) tuples to spill. The handler writes the cache files with write_cache_file and calls finish_spill for every tuple. None spills synchronously.
+    """
+
+    def __init__(self, memory_budget: int | None = None) -> None:
+        """Initializes the store."""
+        self.memory_budget = memory_budget
+        # Measurements by id in the order they were displayed, the most recent one last.
+        self._measurements = OrderedDict()
+        self._cache_files = {}
+        # Measurements by id whose data is being written by the spill handler.
+        self._pending = {}
+        self._cache_directory = None
+        self.spill_handler = None
+
+    @property
+    def resident_bytes(self) -> int:
+        """Number of bytes of measurement data in memory."""
+        return sum(
+            self.measurement_bytes(measurement)
+            for measurement in self._measurements.values()
+        )
+
+    @staticmethod
+    def measurement_bytes(measurement: Measurement) -> int:
+        """Number of bytes of the data of a measurement in memory.
+
+        Args:
+            measurement (Measurement): The measurement.
+
+        Returns:
+            int: The number of bytes.
+        """
+        return resident_bytes(measurement.tdy) + resident_bytes(measurement.fdy)
+
+    def is_spilled(self, measurement: Measurement) -> bool:
+        """Check if the data of a measurement has been spilled to disk.
+
+        Measurements whose cache file is still being written are not spilled yet.
+
+        Args:
+            measurement (Measurement): The measurement.
+
+        Returns:
+            bool: True if the data is memory-mapped from the cache.
+        """
+        return id(measurement) in self._cache_files
+
+    def touch(self, measurement: Measurement) -> None:
+        """Mark a measurement as displayed.
+
+        Its data is read back into memory if it was spilled, then the data of other measurements is spilled until the memory budget is met.
+
+        Args:
+            measurement (Measurement): The displayed measurement.
+        """
+        self._measurements[id(measurement)] = measurement
+        self._measurements.move_to_end(id(measurement))
+
+        if self.is_spilled(measurement):
+            self.load(measurement)
+
+        self.enforce_budget()
+
+    def discard(self, measurement: Measurement) -> None:
+        """Forget a measurement and remove its cache file.
+
+        Args:
+            measurement (Measurement): The measurement.
+        """
+        self._measurements.pop(id(measurement), None)
+        # A pending cache file is removed by finish_spill
+        self._pending.pop(id(measurement), None)
+        file_name = self._cache_files.pop(id(measurement), None)
+        if file_name is not None:
+            self._remove_file(file_name)
+
+    def enforce_budget(self) -> None:
+        """Spill the data of the least recently displayed measurements until the memory budget is met.
+
+        The most recently displayed measurement is never spilled. Data that is being spilled by the spill handler already counts as spilled.
+        """
+        if self.memory_budget is None:
+            return
+
+        resident = self.resident_bytes - sum(
+            self.measurement_bytes(measurement)
+            for measurement in self._pending.values()
+        )
+        spills = []
+        for measurement in list(self._measurements.values())[:-1]:
+            if resident <= self.memory_budget:
+                break
+            if id(measurement) in self._pending:
+                continue
+
+            size = self.measurement_bytes(measurement)
+            if not size:
+                continue
+
+            if resident_bytes(measurement.tdy) or isinstance(
+                measurement.fdy, np.ndarray
+            ):
+                spills.append(self._prepare_spill(measurement))
+            else:
+                # Only transformed datasets of a memory-mapped measurement are in memory
+                measurement.fdy.clear()
+            resident -= size
+
+        if not spills:
+            return
+
+        if self.spill_handler is None:
+            for spill in spills:
+                self._write_spill(*spill)
+        else:
+            for spill in spills:
+                self._pending[id(spill[0])] = spill[0]
+            self.spill_handler(spills)
+
+    def spill(self, measurement: Measurement) -> None:
+        """Write the data of a measurement to the cache and memory-map it.
+
+        Args:
+            measurement (Measurement): The measurement.
+        """
+        self._write_spill(*self._prepare_spill(measurement))
+
+    def finish_spill(
+        self, measurement: Measurement, file_name: str, tdy: np.array, fdy: np.array
+    ) -> bool:
+        """Memory-map the data of a measurement once the spill handler has written its cache file.
+
+        The cache file is discarded if the measurement has been removed, displayed or changed in the meantime.
+
+        Args:
+            measurement (Measurement): The measurement.
+            file_name (str): Path to the cache file.
+            tdy (np.array): The time domain data that was written.
+            fdy (np.array): The frequency domain data that was written, None if it was not written.
+
+        Returns:
+            bool: True if the data of the measurement has been replaced by the cache file.
+        """
+        pending = self._pending.pop(id(measurement), None) is measurement
+        displayed = next(reversed(self._measurements), None) == id(measurement)
+        changed = measurement.tdy is not tdy or (
+            fdy is not None and measurement.fdy is not fdy
+        )
+        if not pending or displayed or changed:
+            logger.debug("Discarding cache file of %s.", measurement.name)
+            self._remove_file(file_name)
+            return False
+
+        self._map_cache_file(measurement, file_name, fdy is not None)
+        return True
+
+    def abort_spill(self, measurement: Measurement, file_name: str) -> None:
+        """Keep the data of a measurement in memory because its cache file could not be written.
+
+        Args:
+            measurement (Measurement): The measurement.
+            file_name (str): Path to the cache file.
+        """
+        self._pending.pop(id(measurement), None)
+        self._remove_file(file_name)
+
+    def _prepare_spill(self, measurement: Measurement) -> tuple:
+        """The measurement, the name of its cache file and the arrays to write."""
+        logger.debug("Spilling data of %s to disk.", measurement.name)
+        if self._cache_directory is None:
+            self._cache_directory = tempfile.TemporaryDirectory(
+                prefix="nqrduck-measurement-"
+            )
+
+        file_name = os.path.join(self._cache_directory.name, f"{id(measurement)}.npz")
+        if isinstance(measurement.fdy, LazySpectrum):
+            measurement.fdy.clear()
+        fdy = measurement.fdy if resident_bytes(measurement.fdy) else None
+        return measurement, file_name, measurement.tdy, fdy
+
+    def _write_spill(
+        self, measurement: Measurement, file_name: str, tdy: np.array, fdy: np.array
+    ) -> None:
+        """Write the cache file of a measurement and memory-map it."""
+        write_cache_file(file_name, tdy, fdy)
+        self._map_cache_file(measurement, file_name, fdy is not None)
+
+    def _map_cache_file(
+        self, measurement: Measurement, file_name: str, has_fdy: bool
+    ) -> None:
+        """Replace the data of a measurement by the arrays of its cache file."""
+        measurement.tdy = memmap_member(file_name, "tdy")
+        if has_fdy:
+            measurement.fdy = memmap_member(file_name, "fdy")
+        self._cache_files[id(measurement)] = file_name
+
+    def load(self, measurement: Measurement) -> None:
+        """Read the spilled data of a measurement back into memory.
+
+        Args:
+            measurement (Measurement): The measurement.
+        """
+        logger.debug("Loading data of %s from disk.", measurement.name)
+        file_name = self._cache_files.pop(id(measurement))
+        measurement.tdy = np.array(measurement.tdy)
+        if isinstance(measurement.fdy, np.memmap):
+            measurement.fdy = np.array(measurement.fdy)
+        self._remove_file(file_name)
+
+    @staticmethod
+    def _remove_file(file_name: str) -> None:
+        """Remove a cache file."""
+        try:
+            os.remove(file_name)
+        except OSError as e:
+            logger.debug("Could not remove cache file %s: %s", file_name, e)
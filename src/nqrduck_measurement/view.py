@@ -1,8 +1,8 @@
 """View for the measurement module."""
 
 import logging
-import numpy as np
 from functools import partial
+import numpy as np
 from PyQt6.QtWidgets import (
     QWidget,
     QDialog,
@@ -10,17 +10,22 @@ from PyQt6.QtWidgets import (
     QVBoxLayout,
     QHBoxLayout,
     QPushButton,
-    QListWidgetItem,
     QSizePolicy,
-    QApplication,
     QLineEdit,
+    QProgressBar,
+    QProgressDialog,
+    QTableWidget,
+    QTableWidgetItem,
+    QFileDialog,
 )
-from PyQt6.QtGui import QFontMetrics
-from PyQt6.QtCore import pyqtSlot, Qt
+from PyQt6.QtCore import pyqtSlot, Qt, QTimer, QItemSelectionModel
 from nqrduck.module.module_view import ModuleView
 from nqrduck.assets.icons import Logos
 from nqrduck.assets.animations import DuckAnimations
 from .widget import Ui_Form
+from .storage import FILE_FORMATS
+from .plotting import PlotDataCache, compute_plot_data, decimate
+from .measurement_list import MeasurementListModel, MeasurementItemDelegate
 
 logger = logging.getLogger(__name__)
 
@@ -34,11 +39,19 @@ class MeasurementView(ModuleView):
         module (Module): The module instance.
 
     Attributes:
+        PARTIAL_UPDATE_INTERVAL (int): Minimum time between two plot updates of a running measurement in milliseconds.
+
         widget (QWidget): The widget of the view.
         _ui_form (Ui_Form): The form of the widget.
         measurement_dialog (MeasurementDialog): The dialog shown when the measurement is started.
+        partial_update_timer (QTimer): Timer that throttles the plot updates of a running measurement.
+        plot_cache (PlotDataCache): Cache of the plotted arrays per measurement, dataset and view mode.
+        measurement_list_model (MeasurementListModel): Model of the measurements list.
+        measurement_list_delegate (MeasurementItemDelegate): Delegate that paints the items of the measurements list.
     """
 
+    PARTIAL_UPDATE_INTERVAL = 250
+
     def __init__(self, module):
         """Initialize the measurement view."""
         super().__init__(module)
@@ -49,6 +62,7 @@ class MeasurementView(ModuleView):
         self.widget = widget
 
         # Initialize plotter
+        self.plot_cache = PlotDataCache()
         self.init_plotter()
         logger.debug(
             f"Facecolor {str(self._ui_form.plotter.canvas.ax.get_facecolor())}"
@@ -56,6 +70,21 @@ class MeasurementView(ModuleView):
 
         # Measurement dialog
         self.measurement_dialog = self.MeasurementDialog(self)
+        self.measurement_dialog.stop_button.clicked.connect(
+            self.module.controller.stop_measurement
+        )
+        self.measurement_dialog.cancel_button.clicked.connect(
+            self.module.controller.cancel_measurement
+        )
+
+        # Partial results of a running measurement are plotted at most once per interval
+        self.partial_update_timer = QTimer(self)
+        self.partial_update_timer.setInterval(self.PARTIAL_UPDATE_INTERVAL)
+        self.partial_update_timer.timeout.connect(self.update_running_average)
+        self._running_average_outdated = False
+        self.module.model.running_average_changed.connect(
+            self.on_running_average_changed
+        )
 
         # Connect signals
         self.module.model.displayed_measurement_changed.connect(
@@ -65,9 +94,26 @@ class MeasurementView(ModuleView):
 
         self.module.model.measurements_changed.connect(self.on_measurements_changed)
 
+        # Measurements list
+        self.measurement_list_model = MeasurementListModel(self)
+        self.measurement_list_delegate = MeasurementItemDelegate(self)
+        self._ui_form.measurementsList.setModel(self.measurement_list_model)
+        self._ui_form.measurementsList.setItemDelegate(self.measurement_list_delegate)
+        self._ui_form.measurementsList.setUniformItemSizes(True)
+        self.measurement_list_delegate.display_clicked.connect(
+            self.module.controller.change_displayed_measurement
+        )
+        self.measurement_list_delegate.edit_clicked.connect(self.show_measurement_edit)
+        self.measurement_list_delegate.delete_clicked.connect(
+            self.module.controller.delete_measurement
+        )
+
         self._ui_form.buttonStart.clicked.connect(
             self.on_measurement_start_button_clicked
         )
+        self._ui_form.sweepButton.clicked.connect(
+            self.module.controller.show_sweep_dialog
+        )
         self._ui_form.fftButton.clicked.connect(self.module.controller.change_view_mode)
 
         # Measurement settings controller
@@ -93,10 +139,32 @@ class MeasurementView(ModuleView):
             self.module.controller.show_fitting_dialog
         )
 
+        self._ui_form.baselineButton.clicked.connect(
+            self.module.controller.apply_baseline_correction
+        )
+
+        # Processing pipeline
+        self._ui_form.capturePipelineButton.clicked.connect(
+            self.module.controller.capture_pipeline
+        )
+        self._ui_form.savePipelineButton.clicked.connect(
+            self.on_pipeline_save_button_clicked
+        )
+        self._ui_form.loadPipelineButton.clicked.connect(
+            self.on_pipeline_load_button_clicked
+        )
+        self._ui_form.autoProcessBox.setChecked(self.module.model.auto_process)
+        self._ui_form.autoProcessBox.toggled.connect(
+            self.module.controller.set_auto_process
+        )
+        self._ui_form.keepRawBox.setChecked(self.module.model.keep_raw)
+        self._ui_form.keepRawBox.toggled.connect(self.module.controller.set_keep_raw)
+
         # Add logos
         self._ui_form.buttonStart.setIcon(Logos.Play_16x16())
         self._ui_form.buttonStart.setIconSize(self._ui_form.buttonStart.size())
         self._ui_form.buttonStart.setEnabled(False)
+        self._ui_form.sweepButton.setEnabled(False)
 
         self._ui_form.exportButton.setIcon(Logos.Save16x16())
         self._ui_form.exportButton.setIconSize(self._ui_form.exportButton.size())
@@ -111,6 +179,37 @@ class MeasurementView(ModuleView):
         self._ui_form.importButton.clicked.connect(
             self.on_measurement_load_button_clicked
         )
+        self._ui_form.importDirectoryButton.setIcon(Logos.Load16x16())
+        self._ui_form.importDirectoryButton.clicked.connect(
+            self.on_directory_load_button_clicked
+        )
+
+        # Connect session save and load buttons
+        self._ui_form.saveSessionButton.setIcon(Logos.Save16x16())
+        self._ui_form.saveSessionButton.clicked.connect(
+            self.on_session_save_button_clicked
+        )
+        self._ui_form.loadSessionButton.setIcon(Logos.Load16x16())
+        self._ui_form.loadSessionButton.clicked.connect(
+            self.on_session_load_button_clicked
+        )
+
+        # File format used when exporting measurements
+        self._ui_form.formatBox.addItems(FILE_FORMATS)
+        self._ui_form.formatBox.setCurrentText(self.module.model.file_format)
+        self._ui_form.formatBox.currentTextChanged.connect(
+            self.module.controller.set_file_format
+        )
+
+        self._ui_form.lazyBox.setChecked(self.module.model.lazy_loading)
+        self._ui_form.lazyBox.toggled.connect(self.module.controller.set_lazy_loading)
+        memory_budget = self.module.model.memory_budget
+        self._ui_form.budgetBox.setValue(
+            memory_budget // 1024**2 if memory_budget else 0
+        )
+        self._ui_form.budgetBox.valueChanged.connect(
+            self.module.controller.set_memory_budget
+        )
 
         # Make title label bold
         self._ui_form.titleLabel.setStyleSheet("font-weight: bold;")
@@ -130,16 +229,38 @@ class MeasurementView(ModuleView):
         )
 
     def init_plotter(self) -> None:
-        """Initialize plotter with the according units for time domain."""
+        """Initialize plotter with the according units for time domain.
+
+        The line artists created here are kept and only get new data when the displayed measurement changes.
+        """
         plotter = self._ui_form.plotter
         plotter.canvas.ax.clear()
         plotter.canvas.ax.set_xlim(0, 100)
         plotter.canvas.ax.set_ylim(0, 1)
-        plotter.canvas.ax.set_xlabel("Time (µs)")
-        plotter.canvas.ax.set_ylabel("Amplitude (a.u.)")
-        plotter.canvas.ax.set_title("Measurement data - Time domain")
         plotter.canvas.ax.grid()
 
+        (self.real_line,) = plotter.canvas.ax.plot(
+            [], [], label="Real", linestyle="-", alpha=0.35, color="red"
+        )
+        (self.imag_line,) = plotter.canvas.ax.plot(
+            [], [], label="Imaginary", linestyle="-", alpha=0.35, color="green"
+        )
+        (self.magnitude_line,) = plotter.canvas.ax.plot(
+            [], [], label="Magnitude", color="blue"
+        )
+        self.fit_artists = []
+        self.legend = None
+        self._legend_labels = None
+
+        # Full resolution data of the plotted dataset, the lines only show a decimated version of it
+        self._plot_data = None
+        self._decimating = False
+        plotter.canvas.ax.callbacks.connect("xlim_changed", self.on_xlim_changed)
+
+        # Axis labels are only set again when the view mode changes
+        self._axes_view_mode = None
+        self.change_to_time_view()
+
     @pyqtSlot()
     def on_settings_changed(self) -> None:
         """Redraw the plots in case the according settings have changed."""
@@ -147,29 +268,34 @@ class MeasurementView(ModuleView):
 
     def change_to_time_view(self) -> None:
         """Change plotter to time domain view."""
+        if self._axes_view_mode == self.module.model.TIME_VIEW:
+            return
+
         plotter = self._ui_form.plotter
         self._ui_form.fftButton.setText("FFT")
-        plotter.canvas.ax.clear()
         plotter.canvas.ax.set_xlabel("Time (µs)")
         plotter.canvas.ax.set_ylabel("Amplitude (a.u.)")
         plotter.canvas.ax.set_title("Measurement data - Time domain")
-        plotter.canvas.ax.grid()
+        self._axes_view_mode = self.module.model.TIME_VIEW
 
     def change_to_fft_view(self) -> None:
         """Change plotter to frequency domain view."""
+        if self._axes_view_mode == self.module.model.FFT_VIEW:
+            return
+
         plotter = self._ui_form.plotter
         self._ui_form.fftButton.setText("iFFT")
-        plotter.canvas.ax.clear()
         plotter.canvas.ax.set_xlabel("Frequency (MHz)")
         plotter.canvas.ax.set_ylabel("Amplitude (a.u.)")
         plotter.canvas.ax.set_title("Measurement data - Frequency domain")
-        plotter.canvas.ax.grid()
+        self._axes_view_mode = self.module.model.FFT_VIEW
 
     def update_displayed_measurement(self) -> None:
-        """Update displayed measurement data."""
+        """Update displayed measurement data.
+
+        Only the data of the existing artists is replaced and the canvas is redrawn when the GUI is idle.
+        """
         logger.debug("Updating displayed measurement view.")
-        plotter = self._ui_form.plotter
-        plotter.canvas.ax.clear()
         try:
             if self.module.model.displayed_measurement is None:
                 logger.debug("No measurement data to display. Clearing plotter.")
@@ -179,66 +305,166 @@ class MeasurementView(ModuleView):
                 else:
                     self.change_to_time_view()
 
-                self._ui_form.plotter.canvas.draw()
+                self.clear_plot()
+                self._ui_form.plotter.canvas.draw_idle()
 
                 return
 
             index = self.module.model.dataset_index
             logger.debug(f"Displaying dataset index {index}.")
-            if self.module.model.view_mode == self.module.model.FFT_VIEW:
-                self.change_to_fft_view()
-                y = self.module.model.displayed_measurement.fdy[:, index]
-                x = (
-                    self.module.model.displayed_measurement.fdx
-                    + float(
-                        self.module.model.displayed_measurement.target_frequency
-                        - self.module.model.displayed_measurement.IF_frequency
-                    )
-                    * 1e-6
-                )
-            else:
-                self.change_to_time_view()
-                x = self.module.model.displayed_measurement.tdx
-                y = self.module.model.displayed_measurement.tdy[:, index]
-
-            self._ui_form.plotter.canvas.ax.plot(
-                x, y.real, label="Real", linestyle="-", alpha=0.35, color="red"
-            )
-            self._ui_form.plotter.canvas.ax.plot(
-                x, y.imag, label="Imaginary", linestyle="-", alpha=0.35, color="green"
-            )
-            # Magnitude
-            self._ui_form.plotter.canvas.ax.plot(
-                x, np.abs(y), label="Magnitude", color="blue"
-            )
+            self.plot_measurement(self.module.model.displayed_measurement, index)
 
             # Plot fits
             self.plot_fits()
 
+            self.rescale()
+
             # Add legend
-            self._ui_form.plotter.canvas.ax.legend()
+            self.update_legend()
 
             # Highlight the displayed measurement in the measurementsList
-            for i in range(self._ui_form.measurementsList.count()):
-                item = self._ui_form.measurementsList.item(i)
-                widget = self._ui_form.measurementsList.itemWidget(item)
-                button = widget.layout().itemAt(0).widget()
-                # Get the measurement by accessing measurement property
-                measurement = button.property("measurement")
-                if measurement == self.module.model.displayed_measurement:
-                    item.setSelected(True)
-                else:
-                    item.setSelected(False)
+            self.select_measurement(self.module.model.displayed_measurement)
 
         except AttributeError as e:
             logger.debug(f"No measurement data to display: {e}")
             # Reset the plotter
             self.init_plotter()
 
-        self._ui_form.plotter.canvas.draw()
+        self._ui_form.plotter.canvas.draw_idle()
+
+    def clear_plot(self) -> None:
+        """Remove the data from the plot while keeping the artists."""
+        self._plot_data = None
+        for line in (self.real_line, self.imag_line, self.magnitude_line):
+            line.set_data([], [])
+        self.remove_fit_artists()
+        if self.legend is not None:
+            self.legend.set_visible(False)
+
+    def rescale(self) -> None:
+        """Fit the axis limits to the plotted data."""
+        ax = self._ui_form.plotter.canvas.ax
+        ax.relim()
+        ax.autoscale()
+
+    def update_legend(self) -> None:
+        """Show the legend. It is only created again if the plotted lines changed."""
+        ax = self._ui_form.plotter.canvas.ax
+        labels = tuple(line.get_label() for line in ax.get_lines())
+        if self.legend is None or labels != self._legend_labels:
+            self.legend = ax.legend()
+            self._legend_labels = labels
+        self.legend.set_visible(True)
+
+    def plot_measurement(self, measurement, index: int, cached: bool = True) -> None:
+        """Plot real part, imaginary part and magnitude of one dataset of a measurement.
+
+        Args:
+            measurement (Measurement): The measurement to plot.
+            index (int): The index of the dataset.
+            cached (bool, optional): Use the plot data cache. Defaults to True.
+        """
+        domain = self.module.model.view_mode
+        if domain == self.module.model.FFT_VIEW:
+            self.change_to_fft_view()
+        else:
+            self.change_to_time_view()
+
+        if cached:
+            data = self.plot_cache.get(measurement, index, domain)
+        else:
+            data = compute_plot_data(measurement, index, domain)
+
+        self._plot_data = data
+        self.update_decimated_lines()
+
+    def update_decimated_lines(self, x_range: tuple | None = None) -> None:
+        """Set the data of the lines to a min/max decimated version of the plotted dataset.
+
+        The data is reduced to about two points per pixel of the plot width, so the rendering cost does not depend on the length of the measurement.
+
+        Args:
+            x_range (tuple, optional): Only the data in this x range is decimated. Defaults to None, which uses all data.
+        """
+        data = self._plot_data
+        if data is None:
+            return
+
+        n_bins = max(self._ui_form.plotter.canvas.width(), 100)
+        lines = (
+            (self.real_line, data.real),
+            (self.imag_line, data.imag),
+            (self.magnitude_line, data.magnitude),
+        )
+        for line, y in lines:
+            line.set_data(*decimate(data.x, y, n_bins, x_range))
+
+    def on_xlim_changed(self, ax) -> None:
+        """Decimate the plotted data again for the new x limits after zooming or panning.
+
+        Args:
+            ax (Axes): The axes whose limits changed.
+        """
+        # Setting the data must not trigger another decimation
+        if self._decimating or self._plot_data is None:
+            return
+
+        self._decimating = True
+        try:
+            self.update_decimated_lines(ax.get_xlim())
+        finally:
+            self._decimating = False
+        self._ui_form.plotter.canvas.draw_idle()
+
+    @pyqtSlot()
+    def on_running_average_changed(self) -> None:
+        """Slot for when a partial measurement has been received.
+
+        The first partial result is plotted right away, further updates are throttled by the timer.
+        """
+        self._running_average_outdated = True
+        if not self.partial_update_timer.isActive():
+            self.update_running_average()
+            self.partial_update_timer.start()
+
+    @pyqtSlot()
+    def update_running_average(self) -> None:
+        """Plot the running average of the current measurement if it has changed."""
+        running_average = self.module.model.running_average
+        if not self._running_average_outdated or running_average is None:
+            self.partial_update_timer.stop()
+            return
+
+        self._running_average_outdated = False
+        logger.debug(
+            "Plotting running average of %s averages.",
+            self.module.model.running_average_count,
+        )
+
+        # Partial results always show the last dataset, which is the one that is currently averaged.
+        # The running average is a new measurement every time, so caching would not help.
+        self.remove_fit_artists()
+        self.plot_measurement(
+            running_average, running_average.tdy.shape[1] - 1, cached=False
+        )
+        self.rescale()
+        self._ui_form.plotter.canvas.ax.set_title(
+            f"Running average - {self.module.model.running_average_count} averages"
+        )
+        # The title has to be set again once a regular measurement is displayed
+        self._axes_view_mode = None
+        self.update_legend()
+        self._ui_form.plotter.canvas.draw_idle()
+
+    def remove_fit_artists(self) -> None:
+        """Remove the lines and texts of previously plotted fits."""
+        for artist in self.fit_artists:
+            artist.remove()
+        self.fit_artists = []
 
     def plot_fits(self):
         """Plots the according fits to the displayed measurement if there are any and if the view mode is correct."""
+        self.remove_fit_artists()
         measurement = self.module.model.displayed_measurement
 
         if not measurement.fits:
@@ -256,8 +482,10 @@ class MeasurementView(ModuleView):
                         measurement.target_frequency - measurement.IF_frequency
                     ) * 1e-6
 
-                self._ui_form.plotter.canvas.ax.plot(
-                    x, y, label=f"{fit.name} Fit", linestyle="--"
+                self.fit_artists.extend(
+                    self._ui_form.plotter.canvas.ax.plot(
+                        x, y, label=f"{fit.name} Fit", linestyle="--"
+                    )
                 )
 
                 # Add the parameters to the plot
@@ -269,10 +497,12 @@ class MeasurementView(ModuleView):
                     # Only two digits after the comma
                     value = round(value, 2)
 
-                    self._ui_form.plotter.canvas.ax.text(
-                        max(x) / 90,
-                        max(y) / 2 + offset,
-                        f"{name}: {value}",
+                    self.fit_artists.append(
+                        self._ui_form.plotter.canvas.ax.text(
+                            max(x) / 90,
+                            max(y) / 2 + offset,
+                            f"{name}: {value}",
+                        )
                     )
                     offset += max(y) / 10
 
@@ -308,86 +538,164 @@ class MeasurementView(ModuleView):
 
     @pyqtSlot()
     def on_measurement_load_button_clicked(self) -> None:
-        """Slot for when the measurement load button is clicked."""
+        """Slot for when the measurement load button is clicked.
+
+        Several files can be selected at once.
+        """
         logger.debug("Measurement load button clicked.")
 
+        extension = self.module.model.FILE_EXTENSION
+        file_names, _ = QFileDialog.getOpenFileNames(
+            self,
+            f"Open .{extension} Files",
+            "",
+            f"{extension.upper()} Files (*.{extension});;All Files (*)",
+            options=QFileDialog.Option.DontUseNativeDialog,
+        )
+        if len(file_names) == 1:
+            self.module.controller.load_measurement(file_names[0])
+        elif file_names:
+            self.module.controller.load_measurements(file_names)
+
+    @pyqtSlot()
+    def on_directory_load_button_clicked(self) -> None:
+        """Slot for when the directory load button is clicked."""
+        logger.debug("Directory load button clicked.")
+
+        directory = QFileDialog.getExistingDirectory(
+            self,
+            "Open Directory",
+            "",
+            options=QFileDialog.Option.DontUseNativeDialog,
+        )
+        if directory:
+            self.module.controller.load_directory(directory)
+
+    @pyqtSlot()
+    def on_session_save_button_clicked(self) -> None:
+        """Slot for when the session save button is clicked."""
+        logger.debug("Session save button clicked.")
+
         file_manager = self.FileManager(
-            self.module.model.FILE_EXTENSION, parent=self
+            self.module.model.SESSION_FILE_EXTENSION, parent=self
+        )
+        file_name = file_manager.saveFileDialog()
+        if file_name:
+            self.module.controller.save_session(file_name)
+
+    @pyqtSlot()
+    def on_pipeline_save_button_clicked(self) -> None:
+        """Slot for when the pipeline save button is clicked."""
+        logger.debug("Pipeline save button clicked.")
+
+        file_manager = self.FileManager(
+            self.module.model.PIPELINE_FILE_EXTENSION, parent=self
+        )
+        file_name = file_manager.saveFileDialog()
+        if file_name:
+            self.module.controller.save_pipeline(file_name)
+
+    @pyqtSlot()
+    def on_pipeline_load_button_clicked(self) -> None:
+        """Slot for when the pipeline load button is clicked."""
+        logger.debug("Pipeline load button clicked.")
+
+        file_manager = self.FileManager(
+            self.module.model.PIPELINE_FILE_EXTENSION, parent=self
+        )
+        file_name = file_manager.loadFileDialog()
+        if file_name:
+            self.module.controller.load_pipeline(file_name)
+
+    @pyqtSlot()
+    def on_session_load_button_clicked(self) -> None:
+        """Slot for when the session load button is clicked."""
+        logger.debug("Session load button clicked.")
+
+        file_manager = self.FileManager(
+            self.module.model.SESSION_FILE_EXTENSION, parent=self
         )
         file_name = file_manager.loadFileDialog()
         if file_name:
-            self.module.controller.load_measurement(file_name)
+            self.module.controller.load_session(file_name)
 
     @pyqtSlot()
     def on_measurements_changed(self) -> None:
-        """Slot for when a measurement is added."""
+        """Slot for when a measurement is added or removed.
+
+        Only the changed rows of the measurements list are updated.
+        """
         logger.debug("Measurement changed.")
 
-        # Clear the measurements list
-        self._ui_form.measurementsList.clear()
+        self.measurement_list_model.set_measurements(self.module.model.measurements)
 
-        for measurement in self.module.model.measurements:
-            measurement_widget = QWidget()
-            layout = QHBoxLayout()
-            measurement_widget.setLayout(layout)
+    def select_measurement(self, measurement) -> None:
+        """Highlight a measurement in the measurements list.
 
-            delete_button = QPushButton()
-            delete_button.setIcon(Logos.Garbage12x12())
-            delete_button.setFixedWidth(delete_button.iconSize().width())
-            delete_button.clicked.connect(
-                lambda: self.module.controller.delete_measurement(measurement)
-            )
+        If the measurement is already selected, the other selected measurements stay selected.
 
-            edit_button = QPushButton()
-            edit_button.setIcon(Logos.Pen12x12())
-            edit_button.setFixedWidth(edit_button.iconSize().width())
-            edit_button.clicked.connect(lambda: self.show_measurement_edit(measurement))
+        Args:
+            measurement (Measurement): The measurement to highlight.
+        """
+        row = self.measurement_list_model.row_of(measurement)
+        measurements_list = self._ui_form.measurementsList
+        if row < 0:
+            measurements_list.clearSelection()
+            return
 
-            name_button = QPushButton()
-            name_button.clicked.connect(
-                partial(
-                    self.module.controller.change_displayed_measurement, measurement
-                )
-            )
+        index = self.measurement_list_model.index(row)
+        selection_model = measurements_list.selectionModel()
+        if selection_model.isSelected(index):
+            flag = QItemSelectionModel.SelectionFlag.NoUpdate
+        else:
+            flag = QItemSelectionModel.SelectionFlag.ClearAndSelect
+        selection_model.setCurrentIndex(index, flag)
+        measurements_list.scrollTo(index)
 
-            # Not sure if this is pretty
-            name_button.setProperty("measurement", measurement)
-            name_button.setSizePolicy(
-                QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred
-            )  # Set size policy
+    def selected_measurements(self) -> list:
+        """Measurements selected in the measurements list.
 
-            layout.addWidget(edit_button)
-            layout.addWidget(name_button)
-            layout.addWidget(delete_button)
-            layout.addStretch()  # Add stretch after delete button to ensure name button takes up space
+        Returns:
+            list: The selected measurements in the order of the list.
+        """
+        rows = sorted(
+            index.row()
+            for index in self._ui_form.measurementsList.selectionModel().selectedRows()
+        )
+        return [self.measurement_list_model.measurement(row) for row in rows]
 
-            item = QListWidgetItem()
-            item.setSizeHint(measurement_widget.sizeHint())
+    def create_progress_dialog(
+        self, title: str, text: str, maximum: int = 0
+    ) -> QProgressDialog:
+        """Create the progress dialog of a background job.
 
-            self._ui_form.measurementsList.addItem(item)
-            self._ui_form.measurementsList.setItemWidget(item, measurement_widget)
+        The dialog is not modal, so other measurements can be viewed while the job is running.
 
-            # Wait for the layout to be updated
-            QApplication.processEvents()
+        Args:
+            title (str): The window title.
+            text (str): The text shown above the progress bar.
+            maximum (int, optional): Number of steps. Defaults to 0, which shows a busy indicator.
 
-            # Get the contents margins (left, top, right, bottom)
-            content_margins = layout.contentsMargins()
+        Returns:
+            QProgressDialog: The progress dialog.
+        """
+        progress_dialog = QProgressDialog(text, "Cancel", 0, maximum, self)
+        progress_dialog.setWindowTitle(title)
+        progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
+        progress_dialog.setAutoClose(True)
+        progress_dialog.setMinimumDuration(500)
+        return progress_dialog
 
-            # Include the margins and spacing in the maxWidth calculation
-            maxWidth = (
-                self._ui_form.measurementsList.width()
-                - delete_button.width()
-                - content_margins.left()
-                - content_margins.right()
-                - layout.spacing()
-            )
+    def show_fit_table(self, name: str, table: dict) -> None:
+        """Show the fit parameters of all datasets of a measurement.
 
-            fontMetrics = QFontMetrics(name_button.font())
-            elidedText = fontMetrics.elidedText(
-                measurement.name, Qt.TextElideMode.ElideRight, maxWidth
-            )
-            name_button.setText(elidedText)
-            name_button.setToolTip(measurement.name)
+        Args:
+            name (str): The name of the fitted measurement.
+            table (dict): The table of the fits, see fitting.fit_all_datasets.
+        """
+        dialog = self.FitTableDialog(name, table, parent=self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
 
     def show_measurement_edit(self, measurement) -> None:
         """Show the measurement dialog.
@@ -404,6 +712,53 @@ class MeasurementView(ModuleView):
         else:
             logger.debug("Measurement edit canceled.")
 
+    class FitTableDialog(QDialog):
+        """Dialog that shows the fit parameters of all datasets of a measurement.
+
+        Every row is a dataset. Every fit parameter has a column with its value and one with its standard deviation.
+
+        Args:
+            name (str): The name of the fitted measurement.
+            table (dict): The table of the fits, see fitting.fit_all_datasets.
+            parent (QWidget, optional): The parent widget. Defaults to None.
+        """
+
+        def __init__(self, name: str, table: dict, parent=None) -> None:
+            """Initialize the dialog."""
+            super().__init__(parent)
+            self.setWindowTitle(f"Fits of {name}")
+            self.resize(500, 400)
+
+            names = [key for key in table if key not in ("dataset", "covariance")]
+            errors = np.sqrt(np.diagonal(table["covariance"], axis1=1, axis2=2))
+
+            headers = ["Dataset"]
+            for parameter in names:
+                headers += [parameter, f"σ {parameter}"]
+
+            self.table_widget = QTableWidget(len(table["dataset"]), len(headers))
+            self.table_widget.setHorizontalHeaderLabels(headers)
+            self.table_widget.verticalHeader().setVisible(False)
+            self.table_widget.setEditTriggers(
+                QTableWidget.EditTrigger.NoEditTriggers
+            )
+
+            for row, dataset in enumerate(table["dataset"]):
+                self.table_widget.setItem(row, 0, QTableWidgetItem(str(dataset)))
+                for i, parameter in enumerate(names):
+                    value = QTableWidgetItem(f"{table[parameter][row]:.6g}")
+                    error = QTableWidgetItem(f"{errors[row, i]:.3g}")
+                    self.table_widget.setItem(row, 1 + 2 * i, value)
+                    self.table_widget.setItem(row, 2 + 2 * i, error)
+
+            close_button = QPushButton("Close")
+            close_button.clicked.connect(self.close)
+
+            layout = QVBoxLayout()
+            layout.addWidget(self.table_widget)
+            layout.addWidget(close_button)
+            self.setLayout(layout)
+
     class MeasurementDialog(QDialog):
         """This Dialog is shown when the measurement is started and therefore blocks the main window.
 
@@ -437,9 +792,22 @@ class MeasurementView(ModuleView):
             # Make spinner label
             self.spinner_label.setMovie(self.spinner_movie)
 
+            self.progress_bar = QProgressBar()
+
+            # Stops the measurement and keeps the running average
+            self.stop_button = QPushButton("Stop")
+            # Stops the measurement and discards all data
+            self.cancel_button = QPushButton("Cancel")
+
+            button_layout = QHBoxLayout()
+            button_layout.addWidget(self.stop_button)
+            button_layout.addWidget(self.cancel_button)
+
             self.layout = QVBoxLayout(self)
             self.layout.addWidget(self.message_label)
             self.layout.addWidget(self.spinner_label)
+            self.layout.addWidget(self.progress_bar)
+            self.layout.addLayout(button_layout)
 
             self.spinner_movie.finished.connect(self.on_movie_finished)
 
@@ -450,6 +818,22 @@ class MeasurementView(ModuleView):
             self.activateWindow()  # Give the dialog focus
             self.spinner_movie.start()  # Ensure the movie starts playing
 
+        @pyqtSlot(int, int)
+        def set_progress(self, finished: int, total: int) -> None:
+            """Show the progress of the measurement.
+
+            As long as no averages have been reported, the progress bar shows a busy indicator.
+
+            Args:
+                finished (int): Number of finished averages.
+                total (int): Total number of averages.
+            """
+            if finished == 0:
+                self.progress_bar.setRange(0, 0)
+            else:
+                self.progress_bar.setRange(0, total)
+                self.progress_bar.setValue(finished)
+
         def on_movie_finished(self) -> None:
             """Called when the spinner movie is finished."""
             self.finished = True
@@ -58,6 +58,9 @@ class Ui_Form(object):
         self.buttonStart = QtWidgets.QPushButton(parent=Form)
         self.buttonStart.setObjectName("buttonStart")
         self.settingsLayout.addWidget(self.buttonStart)
+        self.sweepButton = QtWidgets.QPushButton(parent=Form)
+        self.sweepButton.setObjectName("sweepButton")
+        self.settingsLayout.addWidget(self.sweepButton)
         spacerItem = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Policy.Minimum, QtWidgets.QSizePolicy.Policy.Expanding)
         self.settingsLayout.addItem(spacerItem)
         self.spLabel = QtWidgets.QLabel(parent=Form)
@@ -80,6 +83,24 @@ class Ui_Form(object):
         self.fittingButton = QtWidgets.QPushButton(parent=Form)
         self.fittingButton.setObjectName("fittingButton")
         self.settingsLayout.addWidget(self.fittingButton)
+        self.pipelineLayout = QtWidgets.QHBoxLayout()
+        self.pipelineLayout.setObjectName("pipelineLayout")
+        self.capturePipelineButton = QtWidgets.QPushButton(parent=Form)
+        self.capturePipelineButton.setObjectName("capturePipelineButton")
+        self.pipelineLayout.addWidget(self.capturePipelineButton)
+        self.savePipelineButton = QtWidgets.QPushButton(parent=Form)
+        self.savePipelineButton.setObjectName("savePipelineButton")
+        self.pipelineLayout.addWidget(self.savePipelineButton)
+        self.loadPipelineButton = QtWidgets.QPushButton(parent=Form)
+        self.loadPipelineButton.setObjectName("loadPipelineButton")
+        self.pipelineLayout.addWidget(self.loadPipelineButton)
+        self.settingsLayout.addLayout(self.pipelineLayout)
+        self.autoProcessBox = QtWidgets.QCheckBox(parent=Form)
+        self.autoProcessBox.setObjectName("autoProcessBox")
+        self.settingsLayout.addWidget(self.autoProcessBox)
+        self.keepRawBox = QtWidgets.QCheckBox(parent=Form)
+        self.keepRawBox.setObjectName("keepRawBox")
+        self.settingsLayout.addWidget(self.keepRawBox)
         self.spsettingsButton = QtWidgets.QPushButton(parent=Form)
         self.spsettingsButton.setObjectName("spsettingsButton")
         self.settingsLayout.addWidget(self.spsettingsButton)
@@ -90,19 +111,52 @@ class Ui_Form(object):
         self.label.setFont(font)
         self.label.setObjectName("label")
         self.settingsLayout.addWidget(self.label)
-        self.measurementsList = QtWidgets.QListWidget(parent=Form)
+        self.measurementsList = QtWidgets.QListView(parent=Form)
+        self.measurementsList.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
         self.measurementsList.setObjectName("measurementsList")
         self.settingsLayout.addWidget(self.measurementsList)
         spacerItem1 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Policy.Minimum, QtWidgets.QSizePolicy.Policy.Expanding)
         self.settingsLayout.addItem(spacerItem1)
         self.dataLayout = QtWidgets.QVBoxLayout()
         self.dataLayout.setObjectName("dataLayout")
+        self.formatLayout = QtWidgets.QHBoxLayout()
+        self.formatLayout.setObjectName("formatLayout")
+        self.formatLabel = QtWidgets.QLabel(parent=Form)
+        self.formatLabel.setObjectName("formatLabel")
+        self.formatLayout.addWidget(self.formatLabel)
+        self.formatBox = QtWidgets.QComboBox(parent=Form)
+        self.formatBox.setObjectName("formatBox")
+        self.formatLayout.addWidget(self.formatBox)
+        self.dataLayout.addLayout(self.formatLayout)
         self.exportButton = QtWidgets.QPushButton(parent=Form)
         self.exportButton.setObjectName("exportButton")
         self.dataLayout.addWidget(self.exportButton)
         self.importButton = QtWidgets.QPushButton(parent=Form)
         self.importButton.setObjectName("importButton")
         self.dataLayout.addWidget(self.importButton)
+        self.importDirectoryButton = QtWidgets.QPushButton(parent=Form)
+        self.importDirectoryButton.setObjectName("importDirectoryButton")
+        self.dataLayout.addWidget(self.importDirectoryButton)
+        self.lazyBox = QtWidgets.QCheckBox(parent=Form)
+        self.lazyBox.setObjectName("lazyBox")
+        self.dataLayout.addWidget(self.lazyBox)
+        self.budgetLayout = QtWidgets.QHBoxLayout()
+        self.budgetLayout.setObjectName("budgetLayout")
+        self.budgetLabel = QtWidgets.QLabel(parent=Form)
+        self.budgetLabel.setObjectName("budgetLabel")
+        self.budgetLayout.addWidget(self.budgetLabel)
+        self.budgetBox = QtWidgets.QSpinBox(parent=Form)
+        self.budgetBox.setMaximum(1048576)
+        self.budgetBox.setSingleStep(256)
+        self.budgetBox.setObjectName("budgetBox")
+        self.budgetLayout.addWidget(self.budgetBox)
+        self.dataLayout.addLayout(self.budgetLayout)
+        self.saveSessionButton = QtWidgets.QPushButton(parent=Form)
+        self.saveSessionButton.setObjectName("saveSessionButton")
+        self.dataLayout.addWidget(self.saveSessionButton)
+        self.loadSessionButton = QtWidgets.QPushButton(parent=Form)
+        self.loadSessionButton.setObjectName("loadSessionButton")
+        self.dataLayout.addWidget(self.loadSessionButton)
         self.settingsLayout.addLayout(self.dataLayout)
         self.horizontalLayout_2.addLayout(self.settingsLayout)
         self.plotterLayout = QtWidgets.QVBoxLayout()
@@ -149,15 +203,37 @@ class Ui_Form(object):
         self.frequencyLabel.setText(_translate("Form", "Target Frequency"))
         self.frequencyunitLabel.setText(_translate("Form", "MHz"))
         self.buttonStart.setText(_translate("Form", "Start Measurement"))
+        self.sweepButton.setText(_translate("Form", "Frequency Sweep"))
         self.spLabel.setText(_translate("Form", "Signal Processing"))
         self.apodizationButton.setText(_translate("Form", "Apodization"))
         self.baselineButton.setText(_translate("Form", "Baseline Correction"))
         self.peakButton.setText(_translate("Form", "Peak-Picking"))
         self.fittingButton.setText(_translate("Form", "Fitting"))
+        self.capturePipelineButton.setToolTip(_translate("Form", "Record the processing steps and fits of the displayed measurement"))
+        self.capturePipelineButton.setText(_translate("Form", "Capture Pipeline"))
+        self.savePipelineButton.setText(_translate("Form", "Save"))
+        self.loadPipelineButton.setText(_translate("Form", "Load"))
+        self.autoProcessBox.setToolTip(_translate("Form", "Run the pipeline on every new measurement"))
+        self.autoProcessBox.setText(_translate("Form", "Process new measurements"))
+        self.keepRawBox.setToolTip(_translate("Form", "Keep the unprocessed measurements next to the processed ones"))
+        self.keepRawBox.setText(_translate("Form", "Keep raw measurements"))
         self.spsettingsButton.setText(_translate("Form", "Settings"))
         self.label.setText(_translate("Form", "Measurements:"))
+        self.formatLabel.setText(_translate("Form", "Export Format"))
         self.exportButton.setText(_translate("Form", "Export Measurement"))
         self.importButton.setText(_translate("Form", "Import Measurement"))
+        self.importDirectoryButton.setToolTip(_translate("Form", "Import all measurement files of a directory."))
+        self.importDirectoryButton.setText(_translate("Form", "Import Directory"))
+        self.lazyBox.setToolTip(_translate("Form", "Memory-map the data of imported binary files instead of reading it into memory."))
+        self.lazyBox.setText(_translate("Form", "Lazy Import"))
+        self.budgetLabel.setText(_translate("Form", "Memory Budget"))
+        self.budgetBox.setToolTip(_translate("Form", "Spill the data of the least recently displayed measurements to disk if all measurements take more memory."))
+        self.budgetBox.setSpecialValueText(_translate("Form", "No limit"))
+        self.budgetBox.setSuffix(_translate("Form", " MB"))
+        self.saveSessionButton.setToolTip(_translate("Form", "Save all measurements with their fits to one session file."))
+        self.saveSessionButton.setText(_translate("Form", "Save Session"))
+        self.loadSessionButton.setToolTip(_translate("Form", "Load all measurements of a session file."))
+        self.loadSessionButton.setText(_translate("Form", "Load Session"))
         self.fftButton.setText(_translate("Form", "FFT"))
 from nqrduck.contrib.mplwidget import MplWidget
 from nqrduck.helpers.duckwidgets import DuckFloatEdit, DuckIntEdit
@@ -0,0 +1,15 @@
+"""Shared fixtures of the tests."""
+
+import numpy as np
+import pytest
+from quackseq.measurement import Measurement
+
+
+@pytest.fixture
+def measurement() -> Measurement:
+    """A measurement of two decaying datasets."""
+    tdx = np.linspace(0, 100, 256)
+    dataset = np.exp(-tdx / 20) * np.exp(2j * np.pi * 0.05 * tdx)
+    measurement = Measurement("Test", tdx, dataset, target_frequency=83.56e6)
+    measurement.add_dataset((0.5 * dataset)[:, None])
+    return measurement
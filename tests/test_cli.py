@@ -0,0 +1,98 @@
+"""Tests of the command-line batch processing."""
+
+import io
+import json
+
+import pytest
+
+from nqrduck_measurement import cli, storage
+
+
+def parse(*argv) -> dict:
+    """Build the recipe of command-line arguments."""
+    return cli.build_recipe(cli.build_parser().parse_args(["file.meas", *argv]))
+
+
+@pytest.fixture
+def file_name(tmp_path, measurement) -> str:
+    """A binary measurement file."""
+    file_name = str(tmp_path / "data" / "test.meas")
+    (tmp_path / "data").mkdir()
+    storage.save_measurement(measurement, file_name, storage.BINARY_FORMAT)
+    return file_name
+
+
+def test_empty_recipe():
+    assert parse() == {"apodization": None, "fit": None, "fit_all": False}
+
+
+def test_recipe_parameters():
+    recipe = parse("--apodization", "fid", "--parameter", "T2star=20", "--fit", "T2*")
+
+    assert recipe["apodization"]["class"] == "FIDFunction"
+    assert recipe["apodization"]["parameters"][0]["value"] == 20
+    assert recipe["fit"] == "T2*"
+
+
+def test_recipe_file_is_overridden(tmp_path):
+    recipe_file = tmp_path / "recipe.json"
+    recipe_file.write_text(json.dumps({"fit": "Lorentzian", "fit_all": True}))
+
+    recipe = parse("--recipe", str(recipe_file), "--fit", "T2*")
+
+    assert recipe["fit"] == "T2*"
+    assert recipe["fit_all"]
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--parameter", "T2star=20"],
+        ["--apodization", "fid", "--parameter", "unknown=1"],
+        ["--apodization", "fid", "--parameter", "T2star="],
+    ],
+)
+def test_invalid_parameters(argv):
+    with pytest.raises(ValueError):
+        parse(*argv)
+
+
+def test_process_file(tmp_path, file_name):
+    recipe = parse("--apodization", "fid", "--parameter", "T2star=20", "--fit", "T2*")
+    output_file = str(tmp_path / "out" / "test.meas")
+
+    result = cli.process_file(file_name, recipe, output_file)
+
+    assert result["error"] is None
+    assert [row["dataset"] for row in result["rows"]] == [1]
+    assert "T2Star" in result["rows"][0]
+    assert storage.load_measurement(output_file).tdy.shape[1] == 2
+
+
+def test_process_file_fit_all(file_name):
+    result = cli.process_file(file_name, parse("--fit", "T2*", "--fit-all"))
+
+    assert result["error"] is None
+    assert [row["dataset"] for row in result["rows"]] == [0, 1]
+
+
+def test_process_invalid_file(tmp_path):
+    file_name = tmp_path / "invalid.meas"
+    file_name.write_text("not a measurement")
+
+    result = cli.process_file(str(file_name), parse("--fit", "T2*"))
+
+    assert result["error"] is not None
+    assert result["rows"] == []
+    assert result["seconds"] >= 0
+
+
+def test_write_results(file_name):
+    results = cli.run([file_name], parse("--fit", "T2*", "--fit-all"), max_workers=1)
+    f = io.StringIO()
+
+    cli.write_results(results, f)
+
+    lines = f.getvalue().splitlines()
+    assert lines[0].split(",")[:2] == ["file", "dataset"]
+    assert len(lines) == 3
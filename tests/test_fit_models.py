@@ -0,0 +1,72 @@
+"""Tests of the fit models."""
+
+import pickle
+
+import numpy as np
+import pytest
+from quackseq.measurement import Fit, Measurement
+
+from nqrduck_measurement import fit_models
+
+PARAMETERS = {
+    "Gaussian": [2.0, 0.3, 0.7],
+    "Voigt": [1.5, -0.2, 0.4, 0.3],
+    "2-exponential": [1.0, 5.0, 0.5, 30.0],
+    "3-exponential": [1.0, 3.0, 0.5, 12.0, 0.2, 40.0],
+    "2-Lorentzian multiplet": [1.0, -0.5, 0.2, 0.6, 0.4, 0.3],
+    "3-Lorentzian multiplet": [1.0, -1.0, 0.2, 0.6, 0.0, 0.3, 0.3, 1.0, 0.1],
+}
+
+
+def axis(model: fit_models.FitModel) -> np.array:
+    if model.domain == "time":
+        return np.linspace(0, 100, 200)
+    return np.linspace(-3, 3, 200)
+
+
+@pytest.mark.parametrize(
+    "model", fit_models.BUILTIN_FIT_MODELS, ids=lambda model: model.name
+)
+def test_jacobian_matches_finite_differences(model):
+    x = axis(model)
+    parameters = np.array(PARAMETERS[model.name])
+
+    jacobian = model.jacobian(x, *parameters)
+    assert jacobian.shape == (len(x), len(parameters))
+
+    for i in range(len(parameters)):
+        step = 1e-6 * max(abs(parameters[i]), 1)
+        upper, lower = parameters.copy(), parameters.copy()
+        upper[i] += step
+        lower[i] -= step
+        derivative = (model.function(x, *upper) - model.function(x, *lower)) / (
+            2 * step
+        )
+        np.testing.assert_allclose(jacobian[:, i], derivative, rtol=1e-5, atol=1e-7)
+
+
+def test_gaussian_fit_recovers_parameters():
+    model = fit_models.GaussianModel()
+    tdx = np.linspace(0, 100, 512)
+    measurement = Measurement("Gaussian", tdx, np.exp(-tdx / 30), 1e6)
+    x = measurement.fdx
+    measurement.fdy = model.function(x, 3.0, x[300], 5 * (x[1] - x[0]))[:, None]
+
+    fit = model.fit_class(measurement)
+    assert fit.parameters["A"] == pytest.approx(3.0)
+    assert fit.parameters["x0"] == pytest.approx(x[300])
+
+    restored = Fit.from_json(fit.to_json(), measurement)
+    assert type(restored) is model.fit_class
+
+
+def test_fit_classes_can_be_pickled():
+    for model in fit_models.BUILTIN_FIT_MODELS:
+        assert pickle.loads(pickle.dumps(model.fit_class)) is model.fit_class
+
+
+def test_registered_fit_models():
+    models = fit_models.registered_fit_models()
+    assert [model.name for model in fit_models.BUILTIN_FIT_MODELS] == list(models)[
+        : len(fit_models.BUILTIN_FIT_MODELS)
+    ]
@@ -0,0 +1,69 @@
+"""Tests of the fitting helpers."""
+
+import numpy as np
+from quackseq.measurement import Fit, Measurement, T2StarFit
+
+from nqrduck_measurement import processing
+from nqrduck_measurement.fitting import (
+    FitGuessCache,
+    create_fit,
+    fit_all_datasets,
+    fit_class_of,
+    fit_from_json,
+    fit_to_json,
+    fit_values,
+)
+
+
+def test_warm_started_fit(measurement):
+    cold = create_fit(T2StarFit, measurement)
+    warm = create_fit(T2StarFit, measurement, fit_values(cold)[1])
+
+    assert fit_class_of(warm) is T2StarFit
+    assert isinstance(warm, T2StarFit)
+    np.testing.assert_allclose(fit_values(warm)[1], fit_values(cold)[1], rtol=1e-6)
+    # The guess is passed per fit, the fit class keeps its default initial guess.
+    assert "initial_guess" not in vars(warm)
+    assert T2StarFit(measurement).parameters is not None
+
+
+def test_warm_started_fit_is_restored_as_fit_class(measurement):
+    fit = create_fit(T2StarFit, measurement, [1, 20])
+    restored = Fit.from_json(fit.to_json(), measurement)
+    assert type(restored) is T2StarFit
+
+
+def test_guesses_are_restricted_to_the_lineage(measurement):
+    cache = FitGuessCache()
+    cache.set(measurement, 0, T2StarFit, [1, 20, 0])
+
+    assert cache.get(measurement, 0, T2StarFit) == [1, 20, 0]
+    # The closest fitted dataset of the same measurement
+    assert cache.get(measurement, 1, T2StarFit) == [1, 20, 0]
+    # Measurements derived from the fitted one
+    derived = processing.apodize(measurement, processing.FIDFunction())
+    assert cache.get(derived, 1, T2StarFit) == [1, 20, 0]
+
+    other = Measurement("Other", measurement.tdx, measurement.tdy[:, 0], 1e6)
+    assert cache.get(other, 0, T2StarFit) is None
+
+
+def test_fit_all_datasets_in_spawned_workers(measurement):
+    serial = fit_all_datasets(T2StarFit, measurement, max_workers=1)
+    parallel = fit_all_datasets(
+        T2StarFit, measurement, max_workers=2, initial_guess=[1, 20]
+    )
+
+    assert list(parallel["dataset"]) == [0, 1]
+    np.testing.assert_allclose(parallel["T2Star"], serial["T2Star"], rtol=1e-5)
+
+
+def test_fit_json_restores_parameters(measurement):
+    fit = T2StarFit(measurement)
+    restored = fit_from_json(fit_to_json(fit), measurement)
+    # Fits saved without their parameters are fitted again.
+    refitted = fit_from_json(fit.to_json(), measurement)
+
+    assert restored.to_json() == fit.to_json()
+    np.testing.assert_array_equal(fit_values(restored)[1], fit_values(fit)[1])
+    assert type(refitted) is T2StarFit
@@ -0,0 +1,57 @@
+"""Tests of the processing pipelines."""
+
+import numpy as np
+import pytest
+from quackseq.measurement import LorentzianFit, T2StarFit
+
+from nqrduck_measurement import processing
+from nqrduck_measurement.pipeline import FIT, Pipeline
+
+
+@pytest.fixture
+def processed(measurement):
+    """The measurement after baseline correction, apodization and a T2* fit."""
+    corrected = processing.correct_baseline(measurement)
+    apodized = processing.apodize(corrected, processing.FIDFunction())
+    apodized.add_fit(T2StarFit(apodized))
+    return apodized
+
+
+def test_from_measurement(processed):
+    pipeline = Pipeline.from_measurement(processed)
+
+    assert [step["type"] for step in pipeline.steps] == [
+        processing.BASELINE,
+        processing.APODIZATION,
+        FIT,
+    ]
+    assert pipeline.fit_types == ["T2*"]
+
+
+def test_from_unprocessed_measurement(measurement):
+    assert len(Pipeline.from_measurement(measurement)) == 0
+
+
+def test_unknown_step():
+    with pytest.raises(ValueError):
+        Pipeline([{"type": "unknown"}])
+
+
+def test_save_and_load(tmp_path, processed):
+    pipeline = Pipeline.from_measurement(processed)
+    file_name = str(tmp_path / "test.pipeline")
+
+    pipeline.save(file_name)
+
+    assert Pipeline.load(file_name).steps == pipeline.steps
+
+
+def test_run(measurement, processed):
+    pipeline = Pipeline.from_measurement(processed)
+    pipeline.append({"type": FIT, "fit": "Lorentzian"})
+
+    result = pipeline.run(measurement)
+
+    np.testing.assert_allclose(result.tdy, processed.tdy)
+    assert result.lineage == processed.lineage
+    assert [type(fit) for fit in result.fits] == [T2StarFit, LorentzianFit]
@@ -0,0 +1,118 @@
+"""Tests of the vectorized processing of measurement data."""
+
+import gc
+
+import numpy as np
+import pytest
+from quackseq.functions import CustomFunction, Function, GaussianFunction
+
+from nqrduck_measurement import processing
+
+
+def test_apodize_all_datasets(measurement):
+    function = processing.FIDFunction()
+    window = np.exp(-np.linspace(0, 30, len(measurement.tdx)) / 10)
+
+    apodized = processing.apodize(measurement, function)
+    np.testing.assert_allclose(apodized.tdy, measurement.tdy * window[:, None])
+    assert apodized.tdy.shape == measurement.tdy.shape
+    assert apodized.name == measurement.name
+    assert apodized.target_frequency == measurement.target_frequency
+
+
+def test_apodize_keeps_source(measurement):
+    tdy = measurement.tdy.copy()
+    processing.apodize(measurement, processing.FIDFunction())
+    np.testing.assert_array_equal(measurement.tdy, tdy)
+
+
+def test_batch_apodization(measurement):
+    function = processing.FIDFunction()
+    other = processing.apodize(measurement, processing.FIDFunction())
+
+    apodized = processing.batch_apodization([measurement, other], function)
+    assert len(apodized) == 2
+    np.testing.assert_allclose(apodized[1].tdy, processing.apodize(other, function).tdy)
+
+
+def test_window_is_cached_and_read_only():
+    function = processing.FIDFunction()
+    window = processing.evaluate_window(function, 128)
+    assert processing.evaluate_window(processing.FIDFunction(), 128) is window
+    assert not window.flags.writeable
+
+
+def test_preview_hits_window_cache():
+    function = processing.FIDFunction()
+    td, window = processing.preview_window(function, 1e-4)
+    hits = processing._evaluate_window.cache_info().hits
+
+    _, again = processing.preview_window(processing.FIDFunction(), 1e-4)
+
+    assert again is window
+    assert processing._evaluate_window.cache_info().hits == hits + 1
+    assert len(td) == len(window) == len(function.evaluate(1e-4))
+    np.testing.assert_allclose(window, function.evaluate(1e-4))
+
+
+def test_constant_window():
+    function = CustomFunction()
+    function.expr = "2"
+    np.testing.assert_array_equal(processing.evaluate_window(function, 16), 2)
+
+
+def test_apodization_functions_round_trip():
+    for function in (processing.FIDFunction(), GaussianFunction(), CustomFunction()):
+        restored = Function.from_json(function.to_json())
+        assert type(restored) is type(function)
+        np.testing.assert_array_equal(
+            processing.evaluate_window(restored, 32),
+            processing.evaluate_window(function, 32),
+        )
+
+
+def test_derived_spectrum_is_computed_lazily(measurement):
+    apodized = processing.apodize(measurement, processing.FIDFunction())
+    expected = processing.Measurement(
+        "expected", measurement.tdx, apodized.tdy, measurement.target_frequency
+    )
+
+    assert not isinstance(apodized.fdy, np.ndarray)
+    np.testing.assert_allclose(apodized.fdy[:, 1], expected.fdy[:, 1])
+    np.testing.assert_allclose(np.asarray(apodized.fdy), expected.fdy)
+    np.testing.assert_array_equal(apodized.fdx, measurement.fdx)
+    assert not apodized.fdx.flags.writeable
+
+
+def test_rederive(measurement):
+    function = processing.FIDFunction()
+    function.parameters[0].value = 5
+    apodized = processing.apodize(measurement, function)
+    corrected = processing.correct_baseline(apodized)
+
+    for derived in (apodized, corrected):
+        source = derived.source
+        rederived = processing.rederive(source, derived.step)
+        np.testing.assert_allclose(rederived.tdy, derived.tdy)
+        assert rederived.lineage == derived.lineage
+
+    assert [step["type"] for step in corrected.lineage] == [
+        processing.APODIZATION,
+        processing.BASELINE,
+    ]
+
+
+def test_rederive_unknown_step(measurement):
+    with pytest.raises(ValueError):
+        processing.rederive(measurement, {"type": "unknown"})
+
+
+def test_source_is_weak(measurement):
+    apodized = processing.apodize(measurement, processing.FIDFunction())
+    corrected = processing.correct_baseline(apodized)
+    lineage = corrected.lineage
+
+    del apodized
+    gc.collect()
+    assert corrected.source is None
+    assert corrected.lineage == lineage
@@ -0,0 +1,131 @@
+"""Tests of the measurement service with the synthetic spectrometer."""
+
+import numpy as np
+import pytest
+from quackseq.measurement import T2StarFit
+
+from nqrduck_measurement import processing
+from nqrduck_measurement.fitting import fit_values
+from nqrduck_measurement.service import (
+    MeasurementService,
+    SyntheticSpectrometer,
+    sweep_frequencies,
+)
+
+
+@pytest.fixture
+def service() -> MeasurementService:
+    """A service measuring a line at 100 MHz with little noise."""
+    spectrometer = SyntheticSpectrometer(n_points=512, noise=0.01, seed=0)
+    return MeasurementService(spectrometer)
+
+
+def test_measure(service):
+    service.set_frequency(100)
+    service.set_averages(4)
+    measurement = service.start_measurement()
+
+    assert service.spectrometer.frequency == 100e6
+    assert service.spectrometer.averages == 4
+    assert measurement.target_frequency == 100e6
+    assert service.measurements == [measurement]
+
+
+def test_measure_requires_frequency(service):
+    with pytest.raises(ValueError):
+        service.start_measurement()
+
+
+def test_sweep(service):
+    measurements = service.start_sweep(99.9, 100.1, 0.1)
+
+    frequencies = [measurement.target_frequency for measurement in measurements]
+    np.testing.assert_allclose(frequencies, [99.9e6, 100e6, 100.1e6])
+    assert service.spectrometer.runs == 3
+    assert service.measurements == measurements
+
+
+def test_sweep_frequencies():
+    assert sweep_frequencies(1, 2, 0.5) == [1, 1.5, 2]
+    assert sweep_frequencies(2, 1, 0.5) == [2, 1.5, 1]
+    with pytest.raises(ValueError):
+        sweep_frequencies(1, 2, 0)
+
+
+def test_save_and_load_measurement(tmp_path, service):
+    service.set_frequency(100)
+    measurement = service.start_measurement()
+    file_name = str(tmp_path / "test.meas")
+
+    service.save_measurement(measurement, file_name)
+    loaded = service.load_measurement(file_name)
+
+    np.testing.assert_allclose(loaded.tdy, measurement.tdy)
+    assert loaded.target_frequency == measurement.target_frequency
+    assert service.measurements[-1] is loaded
+
+
+def test_save_and_load_session(tmp_path, service):
+    service.start_sweep(99.9, 100, 0.1)
+    file_name = str(tmp_path / "test.session")
+
+    service.save_session(file_name, displayed_index=1)
+    other = MeasurementService(None)
+    measurements, displayed_index = other.load_session(file_name)
+
+    assert displayed_index == 1
+    assert other.measurements == measurements
+    for loaded, measurement in zip(measurements, service.measurements):
+        np.testing.assert_allclose(loaded.tdy, measurement.tdy)
+
+
+def test_on_measurement(service):
+    received = []
+    service.on_measurement = received.append
+    service.set_frequency(100)
+    measurement = service.start_measurement()
+
+    assert received == [measurement]
+    assert service.measurements == []
+
+
+def test_fit(service):
+    service.set_frequency(100)
+    measurement = service.start_measurement()
+
+    fit = service.fit(measurement, "T2*")
+
+    assert measurement.fits == [fit]
+    assert fit.parameters["T2Star"] == pytest.approx(
+        service.spectrometer.t2_star, rel=0.05
+    )
+
+
+def test_fit_warm_starts_from_source(service):
+    service.set_frequency(100)
+    measurement = service.start_measurement()
+    fit = service.fit(measurement, "T2*")
+
+    apodized = service.apodize(measurement, processing.FIDFunction())
+    guess = service.initial_guess(apodized, T2StarFit)
+
+    np.testing.assert_allclose(guess, fit_values(fit)[1])
+    assert service.fit(apodized, "T2*") in apodized.fits
+
+
+def test_fit_all(service):
+    service.set_frequency(100)
+    measurement = service.start_measurement()
+    measurement.add_dataset(service.start_measurement().tdy)
+
+    table = service.fit_all(measurement, "T2*", max_workers=1)
+
+    assert list(table["dataset"]) == [0, 1]
+
+
+def test_unknown_fit_type(service):
+    service.set_frequency(100)
+    measurement = service.start_measurement()
+
+    with pytest.raises(ValueError):
+        service.fit(measurement, "Unknown")
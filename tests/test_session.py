@@ -0,0 +1,85 @@
+"""Tests of the session files."""
+
+import gc
+
+import numpy as np
+import pytest
+from quackseq.measurement import LorentzianFit, T2StarFit
+
+from nqrduck_measurement import processing, session
+from nqrduck_measurement.fitting import fit_class_of, fit_values
+
+
+def test_round_trip(tmp_path, measurement):
+    apodized = processing.apodize(measurement, processing.FIDFunction())
+    file_name = str(tmp_path / "test.session")
+
+    session.save_session(file_name, [measurement, apodized], displayed_index=1)
+    measurements, displayed_index = session.load_session(file_name)
+
+    assert displayed_index == 1
+    assert len(measurements) == 2
+    np.testing.assert_allclose(measurements[0].tdy, measurement.tdy)
+    np.testing.assert_allclose(measurements[1].tdy, apodized.tdy)
+    assert measurements[1].lineage == apodized.lineage
+
+
+def test_failed_save_removes_partial_file(tmp_path, measurement):
+    # Replacing a directory with the session file fails after the session has been written.
+    file_name = tmp_path / "test.session"
+    file_name.mkdir()
+
+    with pytest.raises(OSError):
+        session.save_session(str(file_name), [measurement])
+    assert not (tmp_path / "test.session.part").exists()
+
+
+def test_derived_measurement_without_source_is_stored_with_data(tmp_path, measurement):
+    source = processing.correct_baseline(measurement)
+    apodized = processing.apodize(source, processing.FIDFunction())
+    tdy = np.array(apodized.tdy)
+    file_name = str(tmp_path / "test.session")
+
+    del source
+    gc.collect()
+    assert apodized.source is None
+    session.save_session(file_name, [apodized])
+    measurements, _ = session.load_session(file_name)
+    np.testing.assert_allclose(measurements[0].tdy, tdy)
+
+
+def test_stored_derived_measurement_keeps_lineage(tmp_path, measurement):
+    apodized = processing.apodize(measurement, processing.FIDFunction())
+    apodized.add_fit(T2StarFit(apodized))
+    file_name = str(tmp_path / "test.session")
+
+    session.save_session(file_name, [apodized])
+    measurements, _ = session.load_session(file_name)
+
+    assert isinstance(measurements[0], processing.DerivedMeasurement)
+    assert measurements[0].lineage == apodized.lineage
+    assert measurements[0].source is None
+    assert [fit.measurement for fit in measurements[0].fits] == [measurements[0]]
+
+
+def test_fits_are_restored_without_fitting(tmp_path, measurement, monkeypatch):
+    apodized = processing.apodize(measurement, processing.FIDFunction())
+    measurement.add_fit(T2StarFit(measurement))
+    apodized.add_fit(LorentzianFit(apodized))
+    file_name = str(tmp_path / "test.session")
+    session.save_session(file_name, [measurement, apodized])
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The fit was run again.")
+
+    monkeypatch.setattr("quackseq.measurement.curve_fit", fail)
+    measurements, _ = session.load_session(file_name)
+
+    for loaded, saved in zip(measurements, [measurement, apodized]):
+        (fit,) = loaded.fits
+        (saved_fit,) = saved.fits
+        assert fit_class_of(fit) is fit_class_of(saved_fit)
+        assert fit.measurement is loaded
+        for values, saved_values in zip(fit_values(fit), fit_values(saved_fit)):
+            np.testing.assert_array_equal(values, saved_values)
+        np.testing.assert_allclose(fit.y, saved_fit.y)
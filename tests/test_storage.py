@@ -0,0 +1,77 @@
+"""Tests of the measurement file formats."""
+
+import numpy as np
+import pytest
+
+from nqrduck_measurement import storage
+
+
+@pytest.mark.parametrize("file_format", storage.FILE_FORMATS)
+def test_round_trip(tmp_path, measurement, file_format):
+    file_name = str(tmp_path / "test.meas")
+    storage.save_measurement(measurement, file_name, file_format)
+
+    assert storage.detect_format(file_name) == file_format
+    loaded = storage.load_measurement(file_name)
+    assert loaded.name == measurement.name
+    assert loaded.target_frequency == measurement.target_frequency
+    np.testing.assert_allclose(loaded.tdx, measurement.tdx)
+    np.testing.assert_allclose(loaded.tdy, measurement.tdy)
+    np.testing.assert_allclose(loaded.fdy, measurement.fdy)
+
+
+def test_lazy_round_trip(tmp_path, measurement):
+    file_name = str(tmp_path / "test.meas")
+    storage.save_measurement(measurement, file_name, storage.BINARY_FORMAT)
+
+    loaded = storage.load_measurement(file_name, lazy=True)
+    assert isinstance(loaded, storage.LazyMeasurement)
+    assert loaded.is_backed_by(file_name)
+    np.testing.assert_allclose(loaded.tdy, measurement.tdy)
+    np.testing.assert_allclose(np.asarray(loaded.fdy), measurement.fdy)
+
+
+def test_lazy_json_falls_back_to_eager(tmp_path, measurement):
+    file_name = str(tmp_path / "test.meas")
+    storage.save_measurement(measurement, file_name, storage.JSON_FORMAT)
+
+    loaded = storage.load_measurement(file_name, lazy=True)
+    assert not isinstance(loaded, storage.LazyMeasurement)
+    np.testing.assert_allclose(loaded.tdy, measurement.tdy)
+
+
+def test_overwrite_lazy_source(tmp_path, measurement):
+    file_name = str(tmp_path / "test.meas")
+    storage.save_measurement(measurement, file_name, storage.BINARY_FORMAT)
+
+    loaded = storage.load_measurement(file_name, lazy=True)
+    storage.save_measurement(loaded, file_name, storage.BINARY_FORMAT)
+    np.testing.assert_allclose(storage.load_measurement(file_name).tdy, measurement.tdy)
+
+
+def test_unknown_format(tmp_path, measurement):
+    with pytest.raises(ValueError):
+        storage.save_measurement(measurement, str(tmp_path / "test.meas"), "xml")
+
+
+def test_load_measurements_reports_failures(tmp_path, measurement):
+    good = str(tmp_path / "good.meas")
+    bad = str(tmp_path / "bad.meas")
+    storage.save_measurement(measurement, good, storage.BINARY_FORMAT)
+    with open(bad, "w") as f:
+        f.write("not a measurement")
+
+    measurements, failed = storage.load_measurements([good, bad], max_workers=1)
+    assert len(measurements) == 1
+    assert failed == [bad]
+    assert storage.list_measurement_files(str(tmp_path), "meas") == [bad, good]
+
+
+def test_load_measurements_in_spawned_workers(tmp_path, measurement):
+    file_names = [str(tmp_path / f"{index}.meas") for index in range(2)]
+    for file_name in file_names:
+        storage.save_measurement(measurement, file_name, storage.BINARY_FORMAT)
+
+    measurements, failed = storage.load_measurements(file_names, max_workers=2)
+    assert failed == []
+    np.testing.assert_allclose(measurements[1].tdy, measurement.tdy)
@@ -0,0 +1,89 @@
+"""Tests of the bounded measurement store."""
+
+import numpy as np
+
+from nqrduck_measurement import processing
+from nqrduck_measurement.store import MeasurementStore, write_cache_file
+
+
+def test_spills_least_recently_displayed(measurement):
+    other = processing.apodize(measurement, processing.FIDFunction())
+    tdy = np.array(measurement.tdy)
+    store = MeasurementStore(MeasurementStore.measurement_bytes(other))
+
+    store.touch(measurement)
+    store.touch(other)
+    assert store.is_spilled(measurement)
+    assert not store.is_spilled(other)
+    assert isinstance(measurement.tdy, np.memmap)
+    np.testing.assert_array_equal(measurement.tdy, tdy)
+
+    store.touch(measurement)
+    assert not store.is_spilled(measurement)
+    assert store.is_spilled(other)
+    np.testing.assert_array_equal(measurement.tdy, tdy)
+
+
+def test_spill_handler(measurement):
+    other = processing.apodize(measurement, processing.FIDFunction())
+    store = MeasurementStore(MeasurementStore.measurement_bytes(other))
+    handled = []
+    store.spill_handler = handled.extend
+
+    store.touch(measurement)
+    store.touch(other)
+    assert len(handled) == 1
+    assert not store.is_spilled(measurement)
+    # Pending data counts as spilled, so it is not handed to the handler again
+    store.enforce_budget()
+    assert len(handled) == 1
+
+    spill = handled[0]
+    write_cache_file(*spill[1:])
+    assert store.finish_spill(*spill)
+    assert store.is_spilled(measurement)
+
+
+def test_pending_spill_of_displayed_measurement_is_discarded(measurement):
+    other = processing.apodize(measurement, processing.FIDFunction())
+    store = MeasurementStore(MeasurementStore.measurement_bytes(other))
+    handled = []
+    store.spill_handler = handled.extend
+
+    store.touch(measurement)
+    store.touch(other)
+    store.touch(measurement)
+
+    spill = handled[0]
+    write_cache_file(*spill[1:])
+    assert not store.finish_spill(*spill)
+    assert not store.is_spilled(measurement)
+    assert not isinstance(measurement.tdy, np.memmap)
+
+
+def test_counts_transformed_datasets(measurement):
+    apodized = processing.apodize(measurement, processing.FIDFunction())
+    apodized.fdy.clear()
+    size = MeasurementStore.measurement_bytes(apodized)
+
+    apodized.fdy.column(0)
+
+    assert (
+        MeasurementStore.measurement_bytes(apodized)
+        == size + apodized.fdy.column(0).nbytes
+    )
+
+
+def test_drops_transformed_datasets(measurement):
+    apodized = processing.apodize(measurement, processing.FIDFunction())
+    store = MeasurementStore(0)
+    store.touch(apodized)
+    store.touch(measurement)
+    assert store.is_spilled(apodized)
+
+    spectrum = np.array(apodized.fdy.column(0))
+    assert MeasurementStore.measurement_bytes(apodized)
+    store.enforce_budget()
+
+    assert MeasurementStore.measurement_bytes(apodized) == 0
+    np.testing.assert_allclose(apodized.fdy.column(0), spectrum)